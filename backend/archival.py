@@ -0,0 +1,69 @@
+import logging
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from . import background, feeds
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+# New announcements expire after this many days unless pinned or given expires_at; 0 = never
+ANNOUNCEMENT_TTL_DAYS = float(os.environ.get("ANNOUNCEMENT_TTL_DAYS", "90"))
+SWEEP_INTERVAL = float(os.environ.get("ARCHIVE_SWEEP_INTERVAL", "3600"))   # 0 disables the sweeper
+BATCH_SIZE = 500
+
+_COLUMNS = "id, title, content, type, course_code, section, posted_by, created_at, expires_at, pinned"
+
+
+def default_expiry(created_at: int, pinned: bool) -> Optional[int]:
+    if pinned or ANNOUNCEMENT_TTL_DAYS <= 0:
+        return None
+    return created_at + int(ANNOUNCEMENT_TTL_DAYS * 86400)
+
+
+def sweep(db, now: Optional[int] = None, batch_size: int = BATCH_SIZE) -> int:
+    """Moves expired announcements into announcements_archive, committing every
+    batch_size rows so the writer lock is only held briefly. Returns rows moved."""
+    now = int(now or time.time())
+    moved = 0
+    while True:
+        ids = [r for (r,) in db.execute(text(
+            "SELECT id FROM announcements WHERE expires_at <= :now ORDER BY id LIMIT :n"
+        ), {"now": now, "n": batch_size})]
+        if not ids:
+            break
+        params = {f"i{n}": i for n, i in enumerate(ids)}
+        in_list = ", ".join(f":{k}" for k in params)
+        # INSERT OR IGNORE: a batch half-copied by a concurrent sweeper in another worker is harmless
+        db.execute(text(
+            f"INSERT OR IGNORE INTO announcements_archive ({_COLUMNS}, archived_at) "
+            f"SELECT {_COLUMNS}, :now FROM announcements WHERE id IN ({in_list})"
+        ), dict(params, now=now))
+        db.execute(text(f"DELETE FROM announcements WHERE id IN ({in_list})"), params)
+        db.commit()
+        moved += len(ids)
+    return moved
+
+
+def run() -> int:
+    db = SessionLocal()
+    try:
+        moved = sweep(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    # Every worker runs this, so each one drops ring-buffer ids that may now be gone
+    feeds.announcements.reset()
+    if moved:
+        logger.info(f"Archived {moved} expired announcements")
+    return moved
+
+
+if SWEEP_INTERVAL > 0:
+    background.register(background.PeriodicTask("announcement-archive", run, SWEEP_INTERVAL, run_at_start=True))
@@ -0,0 +1,141 @@
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.sql.elements import ColumnElement
+
+from . import background, models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+ATTENDANCE_THRESHOLD = float(os.environ.get("AT_RISK_ATTENDANCE", "75"))
+CIA_PASS_MARK = float(os.environ.get("AT_RISK_CIA_PASS_MARK", "25"))   # CIAs are out of 50
+CIA_DECLINE = float(os.environ.get("AT_RISK_CIA_DECLINE", "10"))       # CIA2 this much below CIA1
+# Seconds between scans; 0 disables the scheduled job (POST /admin/at-risk/run still works)
+INTERVAL = float(os.environ.get("AT_RISK_INTERVAL", "21600"))
+INSERT_BATCH = 5000
+
+last_run: Dict[str, object] = {}
+
+
+# --- RULES ---
+# Each rule maps the enrolment's columns (NULLs read as 0) to SQL expressions
+# (condition, value that triggered it), so the database evaluates it for every
+# row in one pass. held1/held2 say whether the CIA has been held for that
+# course/section yet: an unheld test reads as 0 for everyone, so the CIA rules
+# wait until someone in the section has a mark.
+Rule = Callable[[dict], Tuple[ColumnElement, ColumnElement]]
+
+
+def _low_attendance(c):
+    # 0% with no sessions recorded usually means nothing was entered yet
+    return (or_(c["sessions_held"] != 0, c["attendance"] != 0) & (c["attendance"] < ATTENDANCE_THRESHOLD),
+            c["attendance"])
+
+
+def _cia_fail(c):
+    fail1 = c["held1"] & (c["best1"] < CIA_PASS_MARK)
+    fail2 = c["held2"] & (c["best2"] < CIA_PASS_MARK)
+    value = case((fail1 & fail2, func.min(c["best1"], c["best2"])), (fail1, c["best1"]), else_=c["best2"])
+    return or_(fail1, fail2), value
+
+
+def _cia_decline(c):
+    drop = c["cia1"] - c["cia2"]
+    return c["held1"] & c["held2"] & (drop >= CIA_DECLINE), drop
+
+
+RULES: Dict[str, Rule] = {
+    "low_attendance": _low_attendance,
+    "cia_fail": _cia_fail,
+    "cia_decline": _cia_decline,
+}
+
+
+# --- SCAN ---
+def _flag_query():
+    """One SELECT (a UNION ALL of the rules) returning every flag to store."""
+    table = models.AcademicData.__table__
+    pursuing = table.c.status == "Pursuing"
+
+    def best(marks, retest):
+        return func.max(func.coalesce(marks, 0), func.coalesce(retest, 0))
+
+    held = (
+        select(table.c.course_code, table.c.section,
+               (func.max(best(table.c.cia1_marks, table.c.cia1_retest)) > 0).label("held1"),
+               (func.max(best(table.c.cia2_marks, table.c.cia2_retest)) > 0).label("held2"))
+        .where(pursuing).group_by(table.c.course_code, table.c.section).cte("held")
+    )
+    columns = {
+        "attendance": func.coalesce(table.c.subject_attendance, 0),
+        "sessions_held": func.coalesce(table.c.sessions_held, 0),
+        "cia1": func.coalesce(table.c.cia1_marks, 0),
+        "cia2": func.coalesce(table.c.cia2_marks, 0),
+        "best1": best(table.c.cia1_marks, table.c.cia1_retest),
+        "best2": best(table.c.cia2_marks, table.c.cia2_retest),
+        "held1": held.c.held1,
+        "held2": held.c.held2,
+    }
+    source = table.join(held, and_(held.c.course_code == table.c.course_code, held.c.section == table.c.section))
+    selects = []
+    for name, rule in RULES.items():
+        condition, value = rule(columns)
+        selects.append(
+            select(table.c.student_roll_no, table.c.course_code, table.c.section,
+                   literal(name).label("rule"), value.label("value"))
+            .select_from(source).where(pursuing, condition)
+        )
+    return union_all(*selects)
+
+
+def scan(db) -> Dict[str, int]:
+    """Re-evaluates every current enrolment and replaces the stored flags.
+
+    The rules run as a read-only query; only the replacement (one DELETE and
+    batched INSERTs) holds the write lock, in a transaction short enough not to
+    stall marks saves and logins. Readers see either the previous report or
+    the new one.
+    """
+    scanned = db.execute(select(func.count(models.AcademicData.id)).where(models.AcademicData.status == "Pursuing")).scalar()
+    now = int(time.time())
+    counts = {name: 0 for name in RULES}
+    flags: List[dict] = []
+    for roll, course_code, section, rule, value in db.execute(_flag_query()):
+        counts[rule] += 1
+        flags.append({"student_roll_no": roll, "course_code": course_code, "section": section,
+                      "rule": rule, "value": value, "flagged_at": now})
+    # Ends the read transaction before taking the write lock
+    db.rollback()
+
+    db.execute(delete(models.AtRiskFlag))
+    for start in range(0, len(flags), INSERT_BATCH):
+        db.execute(insert(models.AtRiskFlag), flags[start:start + INSERT_BATCH])
+    last_run.update({"finished_at": now, "rows_scanned": scanned, "flags": counts})
+    return counts
+
+
+def run() -> Dict[str, int]:
+    """Entry point for the scheduler and the admin trigger; owns its session."""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        counts = scan(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    logger.info(f"At-risk scan flagged {counts} in {time.perf_counter() - started:.2f}s")
+    return counts
+
+
+# Not run at start: the flags table survives restarts, and every worker would
+# otherwise repeat the full scan at boot
+if INTERVAL > 0:
+    background.register(background.PeriodicTask("at-risk", run, INTERVAL))
@@ -0,0 +1,159 @@
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+# --- BITMAPS ---
+# Bit i (byte i // 8, bit i % 8) is session ordinal i. A term of ~60 sessions
+# per course is 8 bytes per student per bitmap.
+def get_bit(bits: Optional[bytes], index: int) -> bool:
+    return bool(bits) and index // 8 < len(bits) and bool(bits[index // 8] >> (index % 8) & 1)
+
+
+def set_bit(bits: Optional[bytes], index: int, value: bool) -> bytes:
+    data = bytearray(bits or b"")
+    if len(data) <= index // 8:
+        data.extend(b"\0" * (index // 8 + 1 - len(data)))
+    if value:
+        data[index // 8] |= 1 << (index % 8)
+    else:
+        data[index // 8] &= ~(1 << (index % 8)) & 0xFF
+    return bytes(data)
+
+
+def popcount(bits: Optional[bytes]) -> int:
+    return int.from_bytes(bits or b"", "little").bit_count()
+
+
+def percentage(present: int, held: int) -> float:
+    return round(100.0 * present / held, 2) if held else 0.0
+
+
+# --- RECORDING ---
+def _ledger_update():
+    table = models.AcademicData.__table__
+    return update(table).where(table.c.id == bindparam("_id")).values(
+        attendance_marked=bindparam("marked"),
+        attendance_present=bindparam("present"),
+        sessions_held=bindparam("held"),
+        sessions_present=bindparam("attended"),
+        subject_attendance=bindparam("pct"),
+        version=table.c.version + 1,
+    )
+
+
+def _refresh_overall(db: Session, course_code: str, section: str):
+    """Recomputes Student.attendance_percentage for everyone in one course/section
+    from the per-course counters, in a single statement."""
+    db.execute(text("""
+        UPDATE students SET attendance_percentage = (
+            SELECT ROUND(100.0 * SUM(a.sessions_present) / SUM(a.sessions_held), 2)
+            FROM academic_data a
+            WHERE a.student_roll_no = students.roll_no AND a.sessions_held > 0
+        )
+        WHERE roll_no IN (
+            SELECT student_roll_no FROM academic_data
+            WHERE course_code = :course_code AND section = :section AND sessions_held > 0
+        )
+    """), {"course_code": course_code, "section": section})
+
+
+def record_session(db: Session, course_code: str, section: str, day: str, period: int,
+                   default_present: bool = True, absent: Iterable[str] = (),
+                   present: Iterable[str] = (), taken_by: Optional[str] = None,
+                   log=None) -> Optional[dict]:
+    """Marks one session for a whole section. Re-recording the same session
+    overwrites it. None when nobody is enrolled in the course/section. Caller
+    commits (after log.flush()).
+
+    Three statements whatever the section size: read the section's ledger
+    rows, write them back with one executemany, refresh the overall percentages.
+    """
+    absent, present = set(absent), set(present)
+    table = models.AcademicData.__table__
+    rows = db.execute(
+        select(table.c.id, table.c.student_roll_no, table.c.attendance_marked, table.c.attendance_present,
+               table.c.subject_attendance)
+        .where(table.c.course_code == course_code, table.c.section == section)
+    ).all()
+    if not rows:
+        return None
+
+    session = db.query(models.AttendanceSession).filter(
+        models.AttendanceSession.course_code == course_code,
+        models.AttendanceSession.section == section,
+        models.AttendanceSession.date == day,
+        models.AttendanceSession.period == period,
+    ).first()
+    if session is None:
+        ordinal = db.query(func.coalesce(func.max(models.AttendanceSession.ordinal) + 1, 0)).filter(
+            models.AttendanceSession.course_code == course_code,
+            models.AttendanceSession.section == section,
+        ).scalar()
+        session = models.AttendanceSession(course_code=course_code, section=section, date=day,
+                                           period=period, ordinal=ordinal)
+        db.add(session)
+    session.taken_by = taken_by
+
+    params, seen, present_count = [], set(), 0
+    for row in rows:
+        seen.add(row.student_roll_no)
+        is_present = row.student_roll_no in present or (default_present and row.student_roll_no not in absent)
+        present_count += is_present
+        marked = set_bit(row.attendance_marked, session.ordinal, True)
+        attended = set_bit(row.attendance_present, session.ordinal, is_present)
+        held, count = popcount(marked), popcount(attended)
+        pct = percentage(count, held)
+        if log is not None:
+            log.record(row.student_roll_no, course_code, "subject_attendance", row.subject_attendance, pct)
+        params.append({"_id": row.id, "marked": marked, "present": attended,
+                       "held": held, "attended": count, "pct": pct})
+    db.execute(_ledger_update(), params)
+    _refresh_overall(db, course_code, section)
+
+    session.present_count = present_count
+    session.absent_count = len(params) - present_count
+    db.flush()
+    return {
+        "session_id": session.id,
+        "ordinal": session.ordinal,
+        "present": session.present_count,
+        "absent": session.absent_count,
+        "unknown": sorted((absent | present) - seen),
+    }
+
+
+# --- READING ---
+def session_roll(db: Session, session: models.AttendanceSession) -> List[dict]:
+    """Present/absent per student for one session."""
+    rows = db.query(models.AcademicData.student_roll_no, models.AcademicData.attendance_marked,
+                    models.AcademicData.attendance_present).filter(
+        models.AcademicData.course_code == session.course_code,
+        models.AcademicData.section == session.section,
+    ).order_by(models.AcademicData.student_roll_no)
+    return [{"roll_no": roll, "present": get_bit(attended, session.ordinal)}
+            for roll, marked, attended in rows if get_bit(marked, session.ordinal)]
+
+
+def student_history(db: Session, roll_no: str, course_code: str) -> Optional[dict]:
+    record = db.query(models.AcademicData).filter(
+        models.AcademicData.student_roll_no == roll_no,
+        models.AcademicData.course_code == course_code,
+    ).first()
+    if record is None:
+        return None
+    sessions = db.query(models.AttendanceSession).filter(
+        models.AttendanceSession.course_code == course_code,
+        models.AttendanceSession.section == record.section,
+    ).order_by(models.AttendanceSession.ordinal)
+    return {
+        "roll_no": roll_no,
+        "course_code": course_code,
+        "held": record.sessions_held,
+        "present": record.sessions_present,
+        "percentage": percentage(record.sessions_present, record.sessions_held),
+        "sessions": [{"date": s.date, "period": s.period, "present": get_bit(record.attendance_present, s.ordinal)}
+                     for s in sessions if get_bit(record.attendance_marked, s.ordinal)],
+    }
@@ -0,0 +1,78 @@
+import time
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Stored as a small integer per row instead of the column name. Append new
+# fields at the end; existing codes must never change.
+FIELD_CODES = {
+    "cia1_marks": 1,
+    "cia1_retest": 2,
+    "cia2_marks": 3,
+    "cia2_retest": 4,
+    "subject_attendance": 5,
+    "end_sem_marks": 6,
+}
+FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+
+FLUSH_ROWS = 500
+
+
+class AuditBuffer:
+    """Collects field changes for one request and writes them with executemany
+    inserts on the caller's session, so they commit or roll back together with
+    the marks update they describe.
+
+    Call flush() before committing.
+    """
+
+    def __init__(self, db: Session, editor: Optional[str]):
+        self.db = db
+        self.editor = editor
+        self.changed_at = int(time.time())
+        self.rows: List[dict] = []
+        self.written = 0
+
+    def record(self, roll_no: str, course_code: str, field: str, old, new):
+        if old == new:
+            return
+        self.rows.append({
+            "student_roll_no": roll_no,
+            "course_code": course_code,
+            "field": FIELD_CODES[field],
+            "old_value": old,
+            "new_value": new,
+            "editor": self.editor,
+            "changed_at": self.changed_at,
+        })
+        if len(self.rows) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self) -> int:
+        if self.rows:
+            self.db.execute(insert(models.MarkAudit), self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+        return self.written
+
+
+def history(db: Session, roll_no: str, course_code: Optional[str] = None,
+            before_id: Optional[int] = None, limit: int = 100) -> List[dict]:
+    """Newest first. Page with before_id = the smallest id of the previous page."""
+    query = db.query(models.MarkAudit).filter(models.MarkAudit.student_roll_no == roll_no)
+    if course_code:
+        query = query.filter(models.MarkAudit.course_code == course_code)
+    if before_id:
+        query = query.filter(models.MarkAudit.id < before_id)
+    return [{
+        "id": row.id,
+        "course_code": row.course_code,
+        "field": FIELD_NAMES.get(row.field, str(row.field)),
+        "old": row.old_value,
+        "new": row.new_value,
+        "editor": row.editor,
+        "changed_at": row.changed_at,
+    } for row in query.order_by(models.MarkAudit.id.desc()).limit(limit)]
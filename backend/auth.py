@@ -0,0 +1,121 @@
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+# Every worker must share the secret, so it comes from the environment.
+# Without one, each process signs with a random key of its own: nothing can
+# forge tokens, but they stop working on restart and in other workers.
+SECRET_KEY = os.environ.get("JWT_SECRET") or secrets.token_urlsafe(32)
+ALGORITHM = "HS256"
+ACCESS_TOKEN_SECONDS = int(os.environ.get("ACCESS_TOKEN_MINUTES", "60")) * 60
+REFRESH_TOKEN_SECONDS = int(os.environ.get("REFRESH_TOKEN_DAYS", "7")) * 86400
+CACHE_SIZE = 10000
+
+if not os.environ.get("JWT_SECRET"):
+    logger.warning("JWT_SECRET is not set; signing tokens with a random per-process key "
+                   "(they will not survive a restart or work across workers)")
+
+
+class TokenUser(NamedTuple):
+    id: str
+    role: str
+    expires: int
+
+
+# --- ISSUING ---
+def _encode(user_id: str, role: str, kind: str, lifetime: int) -> str:
+    now = int(time.time())
+    claims = {"sub": user_id, "role": role, "type": kind, "iat": now, "exp": now + lifetime}
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def create_access_token(user_id: str, role: str) -> str:
+    return _encode(user_id, role, "access", ACCESS_TOKEN_SECONDS)
+
+
+def create_refresh_token(user_id: str, role: str) -> str:
+    return _encode(user_id, role, "refresh", REFRESH_TOKEN_SECONDS)
+
+
+def issue_tokens(user_id: str, role: str) -> dict:
+    return {
+        "access_token": create_access_token(user_id, role),
+        "refresh_token": create_refresh_token(user_id, role),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_SECONDS,
+        "role": role,
+        "user_id": user_id,
+    }
+
+
+# --- VERIFICATION ---
+# Verified access tokens are cached until they expire, so a repeat request
+# costs a dict lookup instead of an HMAC check and JSON decode.
+_verified: "OrderedDict[str, TokenUser]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def decode_token(token: str, kind: str = "access") -> Optional[TokenUser]:
+    """Returns the token's user, or None if it is forged, expired or the wrong kind."""
+    now = time.time()
+    if kind == "access":
+        with _lock:
+            cached = _verified.get(token)
+            if cached is not None:
+                if cached.expires > now:
+                    _verified.move_to_end(token)
+                    return cached
+                del _verified[token]
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if claims.get("type") != kind or "sub" not in claims:
+        return None
+    user = TokenUser(claims["sub"], claims.get("role", ""), int(claims["exp"]))
+    if kind == "access":
+        with _lock:
+            _verified[token] = user
+            if len(_verified) > CACHE_SIZE:
+                _verified.popitem(last=False)
+    return user
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> TokenUser:
+    """Resolves the caller from the bearer token without touching the database."""
+    user = decode_token(credentials.credentials) if credentials else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[TokenUser]:
+    """Like get_current_user, but None instead of 401 for anonymous callers."""
+    return decode_token(credentials.credentials) if credentials else None
+
+
+def require_roles(*roles: str):
+    """Dependency factory: `Depends(require_roles("Admin", "HOD"))`."""
+    def checker(user: TokenUser = Depends(get_current_user)) -> TokenUser:
+        if user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed for this role")
+        return user
+    return checker
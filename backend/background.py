@@ -0,0 +1,79 @@
+import logging
+import threading
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs `func()` every `interval` seconds on a daemon thread until stopped.
+
+    Jobs are plain sync functions that open their own DB session; a failing
+    run is logged and retried on the next tick rather than killing the thread.
+    """
+
+    def __init__(self, name: str, func: Callable[[], object], interval: float, run_at_start: bool = False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_at_start = run_at_start
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._run, name=f"bg-{self.name}", daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """Runs the job now instead of at the next tick."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _sleep(self) -> bool:
+        """Waits for the next tick or a trigger(); False once stopped."""
+        self._wake.wait(self.interval)
+        self._wake.clear()
+        return not self._stop.is_set()
+
+    def _run(self):
+        if not self.run_at_start and not self._sleep():
+            return
+        while True:
+            try:
+                self.func()
+            except Exception as e:
+                logger.error(f"Background task {self.name} failed: {e}")
+            if not self._sleep():
+                return
+
+
+# Tasks registered at import time; the app lifespan starts them once per
+# worker process and stops them on shutdown.
+_tasks: List[PeriodicTask] = []
+
+
+def register(task: PeriodicTask) -> PeriodicTask:
+    _tasks.append(task)
+    return task
+
+
+def start_all():
+    for task in _tasks:
+        task.start()
+        logger.info(f"Started background task {task.name} (every {task.interval}s)")
+
+
+def stop_all():
+    for task in reversed(_tasks):
+        task.stop()
@@ -0,0 +1,312 @@
+"""API benchmark suite.
+
+Builds a synthetic college-scale database, then drives the hot endpoints
+in-process (httpx over ASGI, no network) at several concurrency levels and
+prints p50/p95/p99 latency and throughput as JSON.
+
+    python -m backend.bench                          # default sweep
+    python -m backend.bench --concurrency 1,16,64 --out bench.json
+    python -m backend.bench --baseline bench.json    # compare against a saved run
+    python -m backend.bench --micro                  # call the handlers directly, no HTTP
+    python -m backend.bench --startup                # worker cold-start time vs target
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DEFAULT_ENDPOINTS = [
+    "login", "marks_cia", "marks_section", "marks_sync", "announcements",
+    "admin_students", "toppers_overall", "toppers_classwise", "student_course",
+]
+
+
+def load_targets(session_factory):
+    """Ids the request generators pick from, read back from whatever database is in use."""
+    from . import models
+    from .seed import SYNTHETIC_PASSWORD
+
+    db = session_factory()
+    try:
+        students = [(uid, SYNTHETIC_PASSWORD) for (uid,) in
+                    db.query(models.User.id).filter(models.User.role == "Student").limit(5000)]
+        sections = db.query(models.AcademicData.course_code, models.AcademicData.section).distinct().limit(2000).all()
+        enrolments = db.query(models.AcademicData.student_roll_no, models.AcademicData.course_code).limit(5000).all()
+        years = db.query(models.Student.year, models.Student.section).distinct().all()
+    finally:
+        db.close()
+    if not students or not sections:
+        raise SystemExit("Benchmark database has no students/enrolments; build it first")
+    return {"students": students, "sections": sections, "enrolments": enrolments, "years": years}
+
+
+# --- REQUEST GENERATORS ---
+def make_request(endpoint, targets, rng):
+    """Returns (method, url, params, json) for one call to the named endpoint."""
+    roll, password = rng.choice(targets["students"])
+    code, section = rng.choice(targets["sections"])
+    year, year_section = rng.choice(targets["years"])
+    if endpoint == "login":
+        return "POST", "/login", None, {"username": roll, "password": password}
+    if endpoint == "marks_cia":
+        return "GET", "/marks/cia", {"student_id": roll}, None
+    if endpoint == "marks_section":
+        return "GET", "/marks/section", {"course_code": code, "section": section}, None
+    if endpoint == "marks_sync":
+        enrolled_roll, enrolled_code = rng.choice(targets["enrolments"])
+        return "POST", "/marks/sync", None, {
+            "student_roll_no": enrolled_roll, "course_code": enrolled_code,
+            "cia1_marks": rng.randint(0, 50), "cia1_retest": 0, "cia2_marks": rng.randint(0, 50),
+            "cia2_retest": 0, "subject_attendance": rng.randint(50, 100),
+        }
+    if endpoint == "announcements":
+        return "GET", "/announcements", {"student_id": roll}, None
+    if endpoint == "admin_students":
+        return "GET", "/admin/students", {"year": year, "section": year_section}, None
+    if endpoint == "toppers_overall":
+        return "GET", "/admin/toppers/overall", {"year": year}, None
+    if endpoint == "toppers_classwise":
+        return "GET", "/admin/toppers/classwise", {"year": year, "section": year_section}, None
+    if endpoint == "student_course":
+        enrolled_roll, enrolled_code = rng.choice(targets["enrolments"])
+        return "GET", f"/student/{enrolled_roll}/course/{enrolled_code}", None, None
+    raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def summarize(latencies, errors, wall):
+    latencies = sorted(latencies)
+    n = len(latencies)
+
+    def pct(p):
+        return round(latencies[min(n - 1, int(p / 100 * n))] * 1000, 3) if n else None
+
+    return {
+        "requests": n + errors, "errors": errors,
+        "throughput_rps": round(n / wall, 1) if wall else None,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if n else None,
+        "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+        "max_ms": round(latencies[-1] * 1000, 3) if n else None,
+    }
+
+
+# --- LOAD DRIVER ---
+async def run_load(app, endpoint, targets, concurrency, requests, seed):
+    import httpx
+
+    rng = random.Random(seed)
+    calls = [make_request(endpoint, targets, rng) for _ in range(requests)]
+    latencies, errors = [], 0
+    queue = iter(calls)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for method, url, params, body in queue:
+                started = time.perf_counter()
+                resp = await client.request(method, url, params=params, json=body)
+                elapsed = time.perf_counter() - started
+                if resp.status_code >= 400:
+                    errors += 1
+                else:
+                    latencies.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return summarize(latencies, errors, wall)
+
+
+async def run_sweep(app, endpoints, levels, targets, requests, seed):
+    # httpx's ASGI transport doesn't send lifespan events, so run startup ourselves
+    results = {}
+    async with app.router.lifespan_context(app):
+        for endpoint in endpoints:
+            results[endpoint] = {}
+            for level in levels:
+                stats = await run_load(app, endpoint, targets, level, requests, seed)
+                results[endpoint][f"c{level}"] = stats
+                print(f"{endpoint:18} c={level:<3} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                      f"p99={stats['p99_ms']}ms {stats['throughput_rps']} rps errors={stats['errors']}",
+                      file=sys.stderr)
+    return results
+
+
+def run_micro(targets, requests, seed):
+    """Calls the handler functions directly with a session: isolates query/serialisation
+    cost from HTTP, validation and threadpool overhead."""
+    from . import main, schemas
+    from .database import SessionLocal
+
+    from .passwords import hash_password, verify_password
+
+    rng = random.Random(seed)
+    stored = hash_password("college123")
+    cases = {
+        "password_verify": lambda db: verify_password("college123", stored),
+        "marks_cia": lambda db: main.get_student_marks(rng.choice(targets["students"])[0], db=db),
+        "marks_section": lambda db: main.get_section_marks(*rng.choice(targets["sections"]), db=db),
+        "announcements": lambda db: main.get_announcements(student_id=rng.choice(targets["students"])[0], db=db),
+        "admin_students": lambda db: main.get_all_students(*rng.choice(targets["years"])[:1], db=db),
+        "toppers_classwise": lambda db: main.get_classwise_toppers(*rng.choice(targets["years"]), db=db),
+    }
+    results = {}
+    for name, call in cases.items():
+        latencies = []
+        db = SessionLocal()
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                call(db)
+                latencies.append(time.perf_counter() - started)
+                db.expunge_all()
+        finally:
+            db.close()
+        results[name] = summarize(latencies, 0, sum(latencies))
+    return results
+
+
+# --- COLD START ---
+STARTUP_TARGET_MS = float(os.environ.get("STARTUP_TARGET_MS", "1500"))
+
+_STARTUP_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+from backend.main import create_app
+app = create_app()
+imported = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(boot())
+booted = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "lifespan_ms": (booted - imported) * 1000}))
+"""
+
+
+def measure_startup(db_path, runs=5, target_ms=STARTUP_TARGET_MS):
+    """Boots a worker in fresh interpreters (import + create_app + lifespan) against
+    an already-migrated database and checks the median against target_ms."""
+    import subprocess
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.abspath(db_path)}", PYTHONPATH=root)
+    workdir = tempfile.mkdtemp(prefix="college_boot_")
+    samples = []
+    for _ in range(runs + 1):
+        out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], env=env, cwd=workdir,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    samples = samples[1:]  # first run pays for bytecode compilation and migrations
+    totals = sorted(s["import_ms"] + s["lifespan_ms"] for s in samples)
+    median = totals[len(totals) // 2]
+    return {
+        "runs": runs, "target_ms": target_ms, "passed": median <= target_ms,
+        "median_ms": round(median, 1), "max_ms": round(totals[-1], 1),
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "lifespan_ms": round(statistics.median(s["lifespan_ms"] for s in samples), 1),
+    }
+
+
+def compare(results, baseline):
+    """Adds the p95/throughput change against a previous JSON report."""
+    for key, current in results.items():
+        if not isinstance(current, dict):
+            continue
+        for level, stats in current.items():
+            before = baseline.get("results", {}).get(key, {}).get(level)
+            if not isinstance(stats, dict) or not before or not before.get("p95_ms"):
+                continue
+            stats["p95_change_pct"] = round((stats["p95_ms"] / before["p95_ms"] - 1) * 100, 1)
+            if before.get("throughput_rps") and stats.get("throughput_rps"):
+                stats["throughput_change_pct"] = round((stats["throughput_rps"] / before["throughput_rps"] - 1) * 100, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the college API in-process")
+    parser.add_argument("--db", help="SQLite file to use (built if missing); default is a temp file")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=300)
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS))
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per endpoint per level")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--micro", action="store_true", help="Time handler functions directly instead of HTTP")
+    parser.add_argument("--startup", action="store_true",
+                        help=f"Measure worker cold start; exits 1 above STARTUP_TARGET_MS ({STARTUP_TARGET_MS:.0f} ms)")
+    parser.add_argument("--out", help="Write the JSON report here as well as stdout")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="college_bench_"), "bench.db")
+    fresh = not os.path.exists(db_path)
+    # Must be set before the app (and its engine) is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    # All load comes from one client; set RATE_LIMIT_ENABLED=1 to include the limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    # Keep scheduled jobs from competing with measured requests
+    os.environ.setdefault("AT_RISK_INTERVAL", "0")
+    os.environ.setdefault("ARCHIVE_SWEEP_INTERVAL", "0")
+    os.environ.setdefault("UPLOAD_SESSION_TTL", "0")
+    os.environ.setdefault("MATERIAL_INDEX_INTERVAL", "0")
+    os.environ.setdefault("STORAGE_GC_INTERVAL", "0")
+
+    from .database import engine, SessionLocal
+    from .seed import generate
+
+    dataset = None
+    if fresh:
+        started = time.perf_counter()
+        dataset = generate(engine, students=args.students, courses=args.courses, seed=args.seed)
+        dataset["build_seconds"] = round(time.perf_counter() - started, 2)
+        print(f"Built benchmark database {db_path}: {dataset}", file=sys.stderr)
+
+    if args.startup:
+        result = measure_startup(db_path)
+        print(json.dumps({"database": db_path, "startup": result}, indent=2))
+        if not result["passed"]:
+            raise SystemExit(1)
+        return
+
+    from .main import app
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    targets = load_targets(SessionLocal)
+    from .passwords import BCRYPT_ROUNDS, HASH_WORKERS
+
+    report = {
+        "database": db_path, "dataset": dataset, "seed": args.seed,
+        "bcrypt_rounds": BCRYPT_ROUNDS, "hash_workers": HASH_WORKERS,
+        "requests_per_level": args.requests, "mode": "micro" if args.micro else "http", "results": {},
+    }
+
+    if args.micro:
+        from .migrations import ensure_schema
+        ensure_schema(engine)
+        report["results"] = {"micro": run_micro(targets, args.requests, args.seed)}
+    else:
+        levels = [int(c) for c in args.concurrency.split(",") if c]
+        endpoints = [e for e in args.endpoints.split(",") if e]
+        report["results"] = asyncio.run(run_sweep(app, endpoints, levels, targets, args.requests, args.seed))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report["results"], json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
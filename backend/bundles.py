@@ -0,0 +1,88 @@
+import contextlib
+import hashlib
+import os
+import re
+import zipfile
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from . import storage
+from .streaming import StreamBuffer
+
+# Already compressed: deflating them again costs CPU and saves next to nothing
+STORED_EXTENSIONS = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".docx", ".pptx", ".xlsx", ".odt", ".odp", ".ods", ".epub", ".pdf",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".mp3", ".m4a", ".aac", ".ogg", ".mp4", ".m4v", ".mkv", ".webm", ".mov", ".avi",
+}
+STORED_TYPE_PREFIXES = ("image/", "video/", "audio/")
+# Fixed entry timestamp: the same materials always produce the same archive bytes
+ENTRY_DATE = (1980, 1, 1, 0, 0, 0)
+
+Entry = Tuple[str, str, bool, Optional[int]]   # (storage key, name in archive, store uncompressed, size)
+
+_UNSAFE = re.compile(r"[^\w.() -]+")
+
+
+def _clean(part: str) -> str:
+    return _UNSAFE.sub("_", part).strip(" .") or "file"
+
+
+def plan(materials: Sequence) -> List[Entry]:
+    """Archive entries for the file-backed materials, grouped in folders by type."""
+    entries, used = [], set()
+    for m in materials:
+        key = storage.key_for(m.file_link)
+        if key is None:
+            continue
+        # Keys are "<course>_<timestamp>_<original name>"; keep the original
+        original = key.split("_", 2)[-1]
+        stem, ext = os.path.splitext(original)
+        name = f"{_clean(m.type or 'Materials')}/{_clean(stem)}{ext.lower()}"
+        n = 1
+        while name in used:
+            n += 1
+            name = f"{_clean(m.type or 'Materials')}/{_clean(stem)} ({n}){ext.lower()}"
+        used.add(name)
+        store = ext.lower() in STORED_EXTENSIONS or (m.content_type or "").startswith(STORED_TYPE_PREFIXES)
+        entries.append((key, name, store, m.size))
+    return entries
+
+
+def etag_for(materials: Sequence) -> str:
+    """Changes whenever a material is added, removed, renamed or its content changes.
+    Weak, since the archive bytes also depend on the zlib build."""
+    digest = hashlib.sha256()
+    for m in sorted(materials, key=lambda m: m.id):
+        digest.update(f"{m.id}\0{m.type}\0{m.file_link}\0{m.etag}\n".encode("utf-8"))
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def zip_stream(entries: Sequence[Entry]) -> Iterator[bytes]:
+    """Yields a ZIP of the entries as it is written: one read buffer and one
+    compressor at a time, no temp files, whatever the total size."""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", allowZip64=True) as zf:
+        for key, name, store, size in entries:
+            try:
+                src = storage.backend.open(key)
+            except FileNotFoundError:
+                continue   # Deleted since the listing; leave it out
+            with contextlib.closing(src):
+                info = zipfile.ZipInfo(name, date_time=ENTRY_DATE)
+                info.compress_type = zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                # force_zip64: zipfile cannot know the size up front in streaming mode
+                with zf.open(info, "w", force_zip64=size is None or size >= 2 ** 31) as dest:
+                    while True:
+                        chunk = src.read(storage.COPY_CHUNK)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
@@ -1,12 +1,24 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./college_app.db"
+# Overridable so benchmarks and scripts can point at a scratch database
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./college_app.db")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def configure(url):
+    """Points the module engine and SessionLocal at another database."""
+    global engine, SQLALCHEMY_DATABASE_URL
+    engine.dispose()
+    SQLALCHEMY_DATABASE_URL = url
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    SessionLocal.configure(bind=engine)
+    return engine
+
 Base = declarative_base()
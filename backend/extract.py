@@ -0,0 +1,120 @@
+"""Plain-text extraction from uploaded materials, one entry per page or slide.
+
+Runs inside the indexer's worker processes, so it imports nothing from the app
+(workers start quickly and never touch the database). DOCX and PPTX are read
+straight from their XML with zipfile; PDF needs the optional ``pypdf`` package.
+"""
+import hashlib
+import os
+import re
+import zipfile
+from typing import List, Optional, Tuple
+from xml.etree import ElementTree
+
+try:
+    import pypdf
+except ImportError:   # PDFs are skipped until it is installed
+    pypdf = None
+
+MAX_CHARS = 1_000_000          # Text kept per material; the rest of a huge file is not indexed
+HASH_CHUNK = 1024 * 1024
+
+Page = Tuple[int, str]         # (1-based page or slide number, text)
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_SLIDE = re.compile(r"ppt/slides/slide(\d+)\.xml$")
+
+
+def supported_extensions() -> set:
+    return {".docx", ".pptx"} | ({".pdf"} if pypdf else set())
+
+
+def capabilities() -> str:
+    """Changes when the set of readable formats does, so skipped files are retried."""
+    return ",".join(sorted(supported_extensions()))
+
+
+def _docx(path: str) -> List[Page]:
+    pages, parts, page = [], [], 1
+    with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as xml:
+        # iterparse + clear keeps memory flat on long documents
+        for event, el in ElementTree.iterparse(xml, events=("start", "end")):
+            tag = el.tag
+            if event == "start":
+                # Word records where it last broke pages; explicit breaks count too
+                if tag == _W + "lastRenderedPageBreak" or (tag == _W + "br" and el.get(_W + "type") == "page"):
+                    if parts:
+                        pages.append((page, "".join(parts)))
+                        parts = []
+                    page += 1
+                continue
+            if tag == _W + "t" and el.text:
+                parts.append(el.text)
+            elif tag == _W + "tab":
+                parts.append("\t")
+            elif tag in (_W + "p", _W + "br", _W + "cr"):
+                parts.append("\n")
+            if tag == _W + "p":
+                el.clear()
+    if parts:
+        pages.append((page, "".join(parts)))
+    return pages
+
+
+def _pptx(path: str) -> List[Page]:
+    pages = []
+    with zipfile.ZipFile(path) as zf:
+        slides = sorted((int(m.group(1)), name) for name in zf.namelist() if (m := _SLIDE.match(name)))
+        for number, name in slides:
+            parts = []
+            with zf.open(name) as xml:
+                for _, el in ElementTree.iterparse(xml):
+                    if el.tag == _A + "t" and el.text:
+                        parts.append(el.text)
+                    elif el.tag == _A + "p":
+                        parts.append("\n")
+            pages.append((number, "".join(parts)))
+    return pages
+
+
+def _pdf(path: str) -> List[Page]:
+    reader = pypdf.PdfReader(path)
+    return [(i, page.extract_text() or "") for i, page in enumerate(reader.pages, 1)]
+
+
+_EXTRACTORS = {".docx": _docx, ".pptx": _pptx, ".pdf": _pdf}
+
+
+def _sha256(path: str) -> Tuple[int, str]:
+    digest, size = hashlib.sha256(), 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def extract(path: str) -> Tuple[int, str, Optional[List[Page]]]:
+    """Returns (size, sha256 hex, pages); pages is None for unsupported types.
+
+    Raises on unreadable or corrupt files.
+    """
+    size, digest = _sha256(path)
+    extractor = _EXTRACTORS.get(os.path.splitext(path)[1].lower())
+    if extractor is None or (extractor is _pdf and pypdf is None):
+        return size, digest, None
+    pages, total = [], 0
+    for number, page_text in extractor(path):
+        page_text = re.sub(r"[ \t]+", " ", page_text).strip()
+        if not page_text:
+            continue
+        page_text = page_text[:MAX_CHARS - total]
+        pages.append((number, page_text))
+        total += len(page_text)
+        if total >= MAX_CHARS:
+            break
+    return size, digest, pages
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Newest announcement ids kept per (course_code, section) bucket
+FEED_SIZE = int(os.environ.get("ANNOUNCEMENT_FEED_SIZE", "50"))
+
+Bucket = Tuple[str, str]
+Entry = Tuple[int, Optional[int]]   # (announcement id, expires_at)
+
+_LIVE = "(expires_at IS NULL OR expires_at > :now)"
+
+
+def bucket_for(course_code: Optional[str], section: Optional[str]) -> Bucket:
+    return (course_code or "Global", section or "All")
+
+
+class AnnouncementFeeds:
+    """Per-process ring buffers of the latest FEED_SIZE announcement ids for
+    each (course_code, section) target, newest first.
+
+    A bucket is loaded from the database the first time it is read. After
+    that, one primary-key range query per read (`id > newest seen`) picks up
+    announcements posted through other workers, so every process converges
+    without any cross-process signalling.
+
+    Each id is kept with its expiry. Expired ids are evicted when read; a full
+    bucket that lost some is reloaded, so a feed never comes back short while
+    older live announcements exist (the archival sweep only runs periodically).
+    """
+
+    def __init__(self, size: int = FEED_SIZE):
+        self.size = size
+        self._buckets: Dict[Bucket, deque] = {}
+        self._high_water = 0
+        self._lock = threading.Lock()
+
+    def add(self, announcement_id: int, course_code: Optional[str], section: Optional[str],
+            expires_at: Optional[int] = None):
+        with self._lock:
+            self._push(announcement_id, expires_at, bucket_for(course_code, section))
+
+    def _push(self, announcement_id: int, expires_at: Optional[int], bucket: Bucket):
+        entries = self._buckets.get(bucket)
+        if entries is not None and (not entries or announcement_id > entries[0][0]):
+            entries.appendleft((announcement_id, expires_at))
+        # Cold buckets pick the row up when they are first loaded
+        self._high_water = max(self._high_water, announcement_id)
+
+    def reset(self):
+        """Forgets everything, e.g. after rows were archived or deleted."""
+        with self._lock:
+            self._buckets.clear()
+            self._high_water = 0
+
+    def _catch_up(self, db: Session):
+        with self._lock:
+            since = self._high_water
+        new = db.execute(text(
+            "SELECT id, course_code, section, expires_at FROM announcements WHERE id > :since ORDER BY id"
+        ), {"since": since}).all()
+        with self._lock:
+            for announcement_id, course_code, section, expires_at in new:
+                self._push(announcement_id, expires_at, bucket_for(course_code, section))
+
+    def _load(self, db: Session, bucket: Bucket, now: int) -> List[Entry]:
+        course_code, section = bucket
+        course_filter = "(course_code = :course_code OR course_code IS NULL)" if course_code == "Global" \
+            else "course_code = :course_code"
+        section_filter = "(section = :section OR section IS NULL)" if section == "All" else "section = :section"
+        entries = [tuple(r) for r in db.execute(text(
+            f"SELECT id, expires_at FROM announcements WHERE {course_filter} AND {section_filter} AND {_LIVE} "
+            "ORDER BY id DESC LIMIT :n"
+        ), {"course_code": course_code, "section": section, "now": now, "n": self.size})]
+        with self._lock:
+            if bucket not in self._buckets:
+                self._buckets[bucket] = deque(entries, maxlen=self.size)
+            return list(self._buckets[bucket])
+
+    def _live(self, bucket: Bucket, now: int) -> Optional[List[Entry]]:
+        """The bucket's unexpired entries, or None when it must be (re)loaded."""
+        with self._lock:
+            entries = self._buckets.get(bucket)
+            if entries is None:
+                return None
+            live = [e for e in entries if e[1] is None or e[1] > now]
+            if len(live) == len(entries):
+                return live
+            if len(entries) == entries.maxlen:
+                # Older live rows may have been pushed out of a full bucket
+                del self._buckets[bucket]
+                return None
+            # A bucket that never filled up holds every live row already
+            self._buckets[bucket] = deque(live, maxlen=self.size)
+            return live
+
+    def ids(self, db: Session, buckets: Iterable[Bucket], limit: int, now: Optional[int] = None) -> List[int]:
+        """Newest `limit` unexpired ids across the given buckets (at most FEED_SIZE per bucket)."""
+        now = int(now or time.time())
+        if self._high_water == 0 and not self._buckets:
+            # Nothing loaded yet: start from the current maximum instead of replaying history
+            with self._lock:
+                self._high_water = db.execute(text("SELECT COALESCE(MAX(id), 0) FROM announcements")).scalar()
+        else:
+            self._catch_up(db)
+        merged = set()
+        for bucket in set(buckets):
+            entries = self._live(bucket, now)
+            if entries is None:
+                entries = self._load(db, bucket, now)
+            merged.update(announcement_id for announcement_id, _ in entries)
+        return sorted(merged, reverse=True)[:limit]
+
+
+announcements = AnnouncementFeeds()
@@ -0,0 +1,94 @@
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# --- GRADING SCHEME ---
+# Course total out of 100: internals (best of each CIA and its retest, both
+# out of 50) weighted INTERNAL_WEIGHT, the end-semester exam (out of 100) the rest.
+INTERNAL_WEIGHT = 0.4
+# (minimum total, grade, points), highest first; below the last entry is U / 0
+GRADES = [
+    (91, "O", 10),
+    (81, "A+", 9),
+    (71, "A", 8),
+    (61, "B+", 7),
+    (50, "B", 6),
+]
+FAIL_GRADE = "U"
+BATCH_SIZE = 500   # Students per recompute statement
+
+_TOTAL_SQL = f"""(
+    {INTERNAL_WEIGHT} * (MAX(COALESCE(cia1_marks, 0), COALESCE(cia1_retest, 0))
+                       + MAX(COALESCE(cia2_marks, 0), COALESCE(cia2_retest, 0)))
+    + {1 - INTERNAL_WEIGHT} * end_sem_marks
+)"""
+_POINTS_SQL = "CASE " + " ".join(f"WHEN {_TOTAL_SQL} >= {low} THEN {points}" for low, _, points in GRADES) + " ELSE 0 END"
+
+
+def course_total(cia1, cia1_retest, cia2, cia2_retest, end_sem) -> Optional[float]:
+    if end_sem is None:
+        return None
+    internals = max(cia1 or 0, cia1_retest or 0) + max(cia2 or 0, cia2_retest or 0)
+    return round(INTERNAL_WEIGHT * internals + (1 - INTERNAL_WEIGHT) * end_sem, 2)
+
+
+def grade_for(points: Optional[int]) -> Optional[str]:
+    if points is None:
+        return None
+    return next((grade for _, grade, p in GRADES if p == points), FAIL_GRADE)
+
+
+# --- RECOMPUTATION ---
+# Three set-based statements per batch of students: grade points for their
+# graded rows, SGPA per semester, then CGPA. A student left without any graded
+# course gets Student.cgpa's default, 0.0, rather than a stale value.
+def _recompute_scope(db: Session, scope: str, params: dict):
+    db.execute(text(f"""
+        UPDATE academic_data SET grade_points = CASE WHEN end_sem_marks IS NULL THEN NULL ELSE {_POINTS_SQL} END
+        WHERE student_roll_no IN ({scope})
+    """), params)
+    db.execute(text(f"DELETE FROM semester_gpa WHERE student_roll_no IN ({scope})"), params)
+    db.execute(text(f"""
+        INSERT INTO semester_gpa (student_roll_no, semester, sgpa, credits)
+        SELECT a.student_roll_no, c.semester,
+               ROUND(1.0 * SUM(a.grade_points * c.credits) / SUM(c.credits), 2), SUM(c.credits)
+        FROM academic_data a JOIN courses c ON c.id = a.course_id
+        WHERE a.grade_points IS NOT NULL AND c.credits > 0 AND a.student_roll_no IN ({scope})
+        GROUP BY a.student_roll_no, c.semester
+    """), params)
+    db.execute(text(f"""
+        UPDATE students SET cgpa = COALESCE((
+            SELECT ROUND(SUM(g.sgpa * g.credits) / SUM(g.credits), 2)
+            FROM semester_gpa g WHERE g.student_roll_no = students.roll_no
+        ), 0.0)
+        WHERE roll_no IN ({scope})
+    """), params)
+
+
+def recompute_students(db: Session, roll_nos: Iterable[str]) -> int:
+    """Recomputes grades, SGPA and CGPA for the given students. Caller commits."""
+    rolls: List[str] = sorted(set(roll_nos))
+    for start in range(0, len(rolls), BATCH_SIZE):
+        batch = rolls[start:start + BATCH_SIZE]
+        names = [f"r{i}" for i in range(len(batch))]
+        _recompute_scope(db, ", ".join(f":{n}" for n in names), dict(zip(names, batch)))
+    return len(rolls)
+
+
+def recompute_course(db: Session, course_id: int):
+    """After a course's credits or semester change: everyone enrolled in it."""
+    _recompute_scope(db, "SELECT student_roll_no FROM academic_data WHERE course_id = :course_id",
+                     {"course_id": course_id})
+
+
+def recompute_all(db: Session) -> int:
+    rolls = [r for (r,) in db.execute(text("SELECT roll_no FROM students"))]
+    return recompute_students(db, rolls)
+
+
+def semester_breakdown(db: Session, roll_no: str) -> List[dict]:
+    rows = db.execute(text(
+        "SELECT semester, sgpa, credits FROM semester_gpa WHERE student_roll_no = :roll ORDER BY semester"
+    ), {"roll": roll_no})
+    return [{"semester": s, "sgpa": sgpa, "credits": credits} for s, sgpa, credits in rows]
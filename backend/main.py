@@ -1,67 +1,86 @@
 import os
-import shutil
+import re
 import time
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Request, status, UploadFile, File, Form, Query
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import and_, text
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from typing import Annotated, List, Optional
+from urllib.parse import quote
 from pydantic import BaseModel
 import logging
 
-from . import models, schemas
-from .database import SessionLocal, engine
+from . import models, schemas, profiling, migrations, database, background, auth, passwords, ratelimit, spreadsheets, marks, audit, attendance, gpa, at_risk, cache, feeds, archival, storage, uploads, bundles, textindex, storage_gc
+from .database import SessionLocal
 
-# --- 1. SETUP STORAGE ---
-UPLOAD_DIR = "uploaded_files"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+UPLOAD_DIR = storage.UPLOAD_DIR
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables automatically
-models.Base.metadata.create_all(bind=engine)
+# Every route is wrapped so it can be profiled on demand (see profiling.py)
+router = APIRouter(route_class=profiling.ProfiledRoute)
 
-# --- DATABASE MIGRATION CHECK ---
-def ensure_profile_columns():
-    """Safely adds profile_pic column if it doesn't exist, preventing DB errors."""
+# --- STARTUP & SHUTDOWN ---
+# Nothing touches the disk or the database at import time, so the module can be
+# preloaded (gunicorn --preload) and each worker initialises itself here.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging.basicConfig(level=logging.INFO)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    # Bring the schema up to date (a single version check when already current)
+    migrations.ensure_schema(database.engine)
+    background.start_all()
     try:
-        with engine.connect() as conn:
-            # Check Faculty table
-            col_info = conn.execute(text("PRAGMA table_info('faculty')")).fetchall()
-            cols = [c[1] for c in col_info]
-            if 'profile_pic' not in cols:
-                conn.execute(text("ALTER TABLE faculty ADD COLUMN profile_pic TEXT"))
-                logger.info("Added 'profile_pic' column to faculty table.")
-
-            # Check Students table
-            col_info = conn.execute(text("PRAGMA table_info('students')")).fetchall()
-            cols = [c[1] for c in col_info]
-            if 'profile_pic' not in cols:
-                conn.execute(text("ALTER TABLE students ADD COLUMN profile_pic TEXT"))
-                logger.info("Added 'profile_pic' column to students table.")
-    except Exception as e:
-        logger.error(f"Migration check failed (minor if DB is new): {e}")
+        yield
+    finally:
+        background.stop_all()
+        database.engine.dispose()
+
+def _static_file(key: str, request: Request):
+    """/static when downloads are offloaded: the app resolves the file, the proxy sends it."""
+    path = storage.path_for(key)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _offload(request, key, {}) or FileResponse(path)
+
+def _remote_static(key: str):
+    # Files in a bucket: hand out a short-lived signed URL in place of /static
+    return RedirectResponse(storage.backend.presigned_url(key))
 
-ensure_profile_columns()
+def create_app(database_url: Optional[str] = None) -> FastAPI:
+    """Builds the API. Pass database_url to run against another database (tests, benchmarks)."""
+    if database_url:
+        database.configure(database_url)
 
-# --- 2. INITIALIZE THE APP ---
-app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
-# --- 3. MOUNT STATIC FILES ---
-app.mount("/static", StaticFiles(directory=UPLOAD_DIR), name="static")
+    if storage.backend.local and storage.DOWNLOAD_MODE == "offload":
+        app.add_api_route("/static/{key}", _static_file, methods=["GET", "HEAD"], include_in_schema=False)
+    elif storage.backend.local:
+        # Directory is created in lifespan, so don't check it at mount time
+        app.mount("/static", StaticFiles(directory=UPLOAD_DIR, check_dir=False), name="static")
+    else:
+        app.add_api_route("/static/{key}", _remote_static, methods=["GET", "HEAD"], include_in_schema=False)
+
+    # Innermost of the middlewares, so 429/503 responses still get CORS headers
+    app.add_middleware(ratelimit.RateLimitMiddleware)
+
+    # CORS configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"], 
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(profiling.ProfileHeaderMiddleware)
 
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    app.include_router(router)
+    return app
 
 # Database Session Dependency
 def get_db():
@@ -80,6 +99,7 @@ class MarkSyncRequest(BaseModel):
     cia2_marks: float
     cia2_retest: float
     subject_attendance: float
+    end_sem_marks: Optional[float] = None   # Left unchanged when omitted
 
 class AdminUserCreateRequest(BaseModel):
     id: str
@@ -97,23 +117,52 @@ class AdminEnrollmentRequest(BaseModel):
     course_code: str
     section: Optional[str] = "A"
 
+class ProfilingToggleRequest(BaseModel):
+    route: str          # Route path template, e.g. "/marks/section"
+    rate: float = 0.0   # Fraction of requests to profile; 0 turns it off
+
 # --- AUTHENTICATION ---
-@app.post("/login", response_model=schemas.Token)
-def login(login_data: schemas.LoginData, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.id == login_data.username).first()
-    if user and user.password == login_data.password:
-        return {"access_token": user.id, "token_type": "bearer", "role": user.role, "user_id": user.id}
+@router.post("/login", response_model=schemas.Token)
+async def login(login_data: schemas.LoginData, db: Session = Depends(get_db)):
+    # Async so the hash check can queue on its own bounded pool; the DB work is
+    # synchronous, so it goes to the threadpool rather than the event loop
+    user = await run_in_threadpool(_find_user, db, login_data.username)
+    if user:
+        ok, new_hash = await passwords.verify_password_async(login_data.password, user.password)
+        if ok:
+            if new_hash:
+                # Plaintext or outdated-cost credential: upgrade it transparently
+                await run_in_threadpool(_save_password, db, user, new_hash)
+            return auth.issue_tokens(user.id, user.role)
     raise HTTPException(status_code=400, detail="Incorrect username or password")
 
+def _find_user(db: Session, user_id: str):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+def _save_password(db: Session, user, new_hash: str):
+    user.password = new_hash
+    db.commit()
+
+@router.post("/token/refresh", response_model=schemas.Token)
+def refresh_token(data: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    claims = auth.decode_token(data.refresh_token, kind="refresh")
+    if not claims:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    # Refreshing is rare, so re-read the user: deleted accounts and role changes take effect here
+    user = db.query(models.User).filter(models.User.id == claims.id).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User no longer exists")
+    return auth.issue_tokens(user.id, user.role)
+
 # --- ADMIN: USER & COURSE MANAGEMENT ---
 
-@app.post("/admin/create-user")
+@router.post("/admin/create-user")
 def admin_create_user(data: AdminUserCreateRequest, db: Session = Depends(get_db)):
     try:
         if db.query(models.User).filter(models.User.id == data.id).first():
             raise HTTPException(status_code=400, detail="User ID already exists")
 
-        new_user = models.User(id=data.id, role=data.role, password=data.password)
+        new_user = models.User(id=data.id, role=data.role, password=passwords.hash_password(data.password))
         db.add(new_user)
         db.flush() 
 
@@ -165,7 +214,7 @@ def admin_create_user(data: AdminUserCreateRequest, db: Session = Depends(get_db
         logger.error(f"Creation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/admin/courses")
+@router.post("/admin/courses")
 def add_course(course: schemas.CourseCreate, db: Session = Depends(get_db)):
     existing = db.query(models.Course).filter(
         models.Course.code == course.code,
@@ -202,18 +251,48 @@ def add_course(course: schemas.CourseCreate, db: Session = Depends(get_db)):
     db.commit()
     return db_course
 
-@app.delete("/admin/courses/{course_id}")
+@router.put("/admin/courses/{course_id}")
+def update_course(course_id: int, data: schemas.CourseUpdate, db: Session = Depends(get_db)):
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    changes = data.model_dump(exclude_unset=True)
+    regrade = any(k in changes and changes[k] != getattr(course, k) for k in ("credits", "semester"))
+    for key, value in changes.items():
+        setattr(course, key, value)
+    if "title" in changes:
+        db.query(models.AcademicData).filter(models.AcademicData.course_id == course.id).update(
+            {models.AcademicData.subject: course.title}, synchronize_session=False)
+    db.flush()
+    # Credits weight every SGPA/CGPA this course is part of
+    if regrade:
+        gpa.recompute_course(db, course.id)
+    db.commit()
+    db.refresh(course)
+    return course
+
+@router.delete("/admin/courses/{course_id}")
 def delete_course(course_id: int, db: Session = Depends(get_db)):
     course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
+    enrolled = [r for (r,) in db.query(models.AcademicData.student_roll_no).filter(models.AcademicData.course_id == course.id)]
     db.query(models.AcademicData).filter(models.AcademicData.course_id == course.id).delete()
+    materials = db.query(models.Material.id, models.Material.file_link).filter(models.Material.course_id == course.id).all()
+    for material_id, _ in materials:
+        textindex.forget(db, material_id)
+    db.query(models.Material).filter(models.Material.course_id == course.id).delete()
     db.delete(course)
+    db.flush()
+    gpa.recompute_students(db, enrolled)
     db.commit()
+    _remove_files([storage.key_for(link) for _, link in materials])
+    course_view_cache.invalidate()
     return {"message": "Course removed"}
 
-@app.post("/admin/enroll")
+@router.post("/admin/enroll")
 def enroll_student(data: AdminEnrollmentRequest, db: Session = Depends(get_db)):
     try:
         student = db.query(models.Student).filter(models.Student.roll_no == data.student_roll_no).first()
@@ -247,26 +326,30 @@ def enroll_student(data: AdminEnrollmentRequest, db: Session = Depends(get_db)):
 
 # --- FACULTY: MARKS & ATTENDANCE ---
 
-@app.get("/faculty/my-courses")
+@router.get("/faculty/my-courses")
 def get_faculty_courses(staff_no: str, db: Session = Depends(get_db)):
     return db.query(models.Course).filter(models.Course.faculty_id == staff_no).all()
 
-@app.get("/marks/section")
-def get_section_marks(course_code: str, section: Optional[str] = "A", db: Session = Depends(get_db)):
-    results = db.query(
+def _section_marks_query(db: Session, course_code: str, section: Optional[str]):
+    return db.query(
         models.Student.name,
         models.AcademicData.student_roll_no,
         models.AcademicData.cia1_marks,
         models.AcademicData.cia1_retest,
         models.AcademicData.cia2_marks,
         models.AcademicData.cia2_retest,
-        models.AcademicData.subject_attendance
+        models.AcademicData.subject_attendance,
+        models.AcademicData.version
     ).join(
         models.AcademicData, models.Student.roll_no == models.AcademicData.student_roll_no
     ).filter(
         models.AcademicData.course_code == course_code,
         models.AcademicData.section == section
-    ).all()
+    )
+
+@router.get("/marks/section")
+def get_section_marks(course_code: str, section: Optional[str] = "A", db: Session = Depends(get_db)):
+    results = _section_marks_query(db, course_code, section).all()
     
     response_data = []
     for row in results:
@@ -277,12 +360,110 @@ def get_section_marks(course_code: str, section: Optional[str] = "A", db: Sessio
             "cia1_retest": row[3] or 0,
             "cia2_marks": row[4] or 0,
             "cia2_retest": row[5] or 0,
-            "subject_attendance": row[6] or 0
+            "subject_attendance": row[6] or 0,
+            "version": row[7]
         })
     return response_data
 
-@app.post("/marks/sync")
-def sync_marks(data: MarkSyncRequest, db: Session = Depends(get_db)):
+# --- BULK IMPORT ---
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+
+@router.post("/marks/import")
+def import_marks(
+    course_code: str = Form(...),
+    section: str = Form("A"),
+    apply: bool = Form(False),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    user: Optional[auth.TokenUser] = Depends(auth.get_optional_user)
+):
+    """Upload a CSV/XLSX of roll_no, cia1, cia1_retest, cia2, cia2_retest, attendance.
+
+    Without apply=true this only returns the diff against the stored marks.
+    With it, all changes are written in one transaction, and only if every row is valid.
+    """
+    data = file.file.read(MAX_IMPORT_BYTES + 1)
+    if len(data) > MAX_IMPORT_BYTES:
+        raise HTTPException(status_code=413, detail="Spreadsheet too large")
+    try:
+        rows = spreadsheets.read_rows(file.filename, data)
+    except spreadsheets.SpreadsheetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    updates, errors = marks.parse_import(rows)
+    changes, unknown, unchanged = marks.diff_section(db, course_code, section, updates)
+    errors += [{"roll_no": roll, "error": f"Not enrolled in {course_code} section {section}"} for roll in unknown]
+
+    result = {
+        "course_code": course_code,
+        "section": section,
+        "rows": len(updates),
+        "unchanged": unchanged,
+        "changes": changes,
+        "errors": errors,
+        "applied": False,
+    }
+    if apply:
+        if errors:
+            raise HTTPException(status_code=400, detail=result)
+        try:
+            log = audit.AuditBuffer(db, user.id if user else None)
+            marks.apply_changes(db, course_code, changes, log)
+            log.flush()
+            gpa.recompute_students(db, [c["roll_no"] for c in changes])
+            db.commit()
+            _forget_course_views({c["roll_no"] for c in changes})
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Marks import failed: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        result["applied"] = True
+    return result
+
+# --- EXPORTS ---
+EXPORT_BATCH = 1000
+
+_UNSAFE_FILENAME = re.compile(r'[^\w.() -]+')
+
+def _attachment(filename: str) -> str:
+    """Content-Disposition for a download name that may come from user input:
+    a sanitised ASCII filename plus the exact name as RFC 5987 filename*."""
+    fallback = _UNSAFE_FILENAME.sub("_", filename.encode("ascii", "replace").decode("ascii")).strip(" .") or "download"
+    return f"attachment; filename=\"{fallback}\"; filename*=utf-8''{quote(filename, safe='')}"
+
+def _export_response(fmt: str, filename: str, header, rows_factory):
+    """Streams rows from a server-side cursor as CSV or XLSX.
+
+    The generator owns its session: the request's session may be closed before
+    the body finishes streaming.
+    """
+    def body():
+        db = SessionLocal()
+        try:
+            yield from spreadsheets.stream(fmt, header, rows_factory(db), sheet_name=filename)
+        finally:
+            db.close()
+    return StreamingResponse(
+        body(),
+        media_type=spreadsheets.CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": _attachment(f"{filename}.{fmt}")},
+    )
+
+@router.get("/marks/section/export")
+def export_section_marks(course_code: str, section: Optional[str] = "A", format: str = Query("csv", pattern="^(csv|xlsx)$")):
+    header = ["Roll No", "Name", "CIA 1", "CIA 1 Retest", "CIA 2", "CIA 2 Retest", "Attendance %", "Total"]
+
+    def rows(db):
+        query = _section_marks_query(db, course_code, section).order_by(models.AcademicData.student_roll_no)
+        for name, roll, cia1, cia1_re, cia2, cia2_re, att, _ in query.yield_per(EXPORT_BATCH):
+            total = max(cia1 or 0, cia1_re or 0) + max(cia2 or 0, cia2_re or 0)
+            yield (roll, name, cia1 or 0, cia1_re or 0, cia2 or 0, cia2_re or 0, att or 0, total)
+
+    return _export_response(format, f"{course_code}_{section}_marks", header, rows)
+
+@router.post("/marks/sync")
+def sync_marks(data: MarkSyncRequest, db: Session = Depends(get_db),
+               user: Optional[auth.TokenUser] = Depends(auth.get_optional_user)):
     record = db.query(models.AcademicData).filter(
         models.AcademicData.student_roll_no == data.student_roll_no,
         models.AcademicData.course_code == data.course_code
@@ -291,17 +472,97 @@ def sync_marks(data: MarkSyncRequest, db: Session = Depends(get_db)):
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
     
-    record.cia1_marks = data.cia1_marks
-    record.cia1_retest = data.cia1_retest
-    record.cia2_marks = data.cia2_marks
-    record.cia2_retest = data.cia2_retest
-    record.subject_attendance = data.subject_attendance
+    log = audit.AuditBuffer(db, user.id if user else None)
+    for field in marks.MARK_FIELDS:
+        new = getattr(data, field)
+        if new is None:
+            continue
+        log.record(record.student_roll_no, record.course_code, field, getattr(record, field), new)
+        setattr(record, field, new)
+    record.version = (record.version or 0) + 1
     
+    log.flush()
+    db.flush()
+    gpa.recompute_students(db, [record.student_roll_no])
     db.commit()
-    return {"message": "Sync successful"}
+    _forget_course_views({record.student_roll_no})
+    return {"message": "Sync successful", "version": record.version}
+
+@router.post("/marks/sync/delta")
+def sync_marks_delta(data: schemas.MarkDeltaSyncRequest, db: Session = Depends(get_db),
+                     user: Optional[auth.TokenUser] = Depends(auth.get_optional_user)):
+    """Saves only the fields that changed, checked against the version each client loaded.
+
+    Rows edited by someone else since are returned under "conflicts" with their
+    current values instead of being overwritten.
+    """
+    try:
+        log = audit.AuditBuffer(db, user.id if user else None)
+        result = marks.apply_deltas(db, data.course_code, data.section, data.changes, log)
+        log.flush()
+        gpa.recompute_students(db, [row["roll_no"] for row in result["applied"]])
+        db.commit()
+        _forget_course_views({row["roll_no"] for row in result["applied"]})
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Delta sync failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return result
+
+@router.get("/marks/audit", dependencies=[Depends(auth.require_roles("Faculty", "HOD", "Admin"))])
+def get_marks_audit(student_roll_no: str, course_code: Optional[str] = None,
+                    before_id: Optional[int] = None, limit: int = Query(100, ge=1, le=1000),
+                    db: Session = Depends(get_db)):
+    """Change history of one student's marks (optionally one course), newest first."""
+    return audit.history(db, student_roll_no, course_code, before_id, limit)
+
+# --- ATTENDANCE ---
+@router.post("/attendance/sessions")
+def record_attendance(data: schemas.AttendanceSessionRequest, db: Session = Depends(get_db),
+                      user: Optional[auth.TokenUser] = Depends(auth.get_optional_user)):
+    """Marks a whole section present (or absent with default_present=false) for
+    one date/period, with exceptions listed in absent/present."""
+    try:
+        log = audit.AuditBuffer(db, user.id if user else None)
+        result = attendance.record_session(
+            db, data.course_code, data.section, data.date.isoformat(), data.period,
+            data.default_present, data.absent, data.present, user.id if user else None, log,
+        )
+        if result is not None:
+            log.flush()
+            db.commit()
+            course_view_cache.invalidate()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Recording attendance failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="No students enrolled in this course/section")
+    return result
+
+@router.get("/attendance/sessions")
+def list_attendance_sessions(course_code: str, section: Optional[str] = "A", db: Session = Depends(get_db)):
+    return db.query(models.AttendanceSession).filter(
+        models.AttendanceSession.course_code == course_code,
+        models.AttendanceSession.section == section,
+    ).order_by(models.AttendanceSession.ordinal.desc()).all()
+
+@router.get("/attendance/sessions/{session_id}")
+def get_attendance_session(session_id: int, db: Session = Depends(get_db)):
+    session = db.query(models.AttendanceSession).filter(models.AttendanceSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session": session, "students": attendance.session_roll(db, session)}
+
+@router.get("/attendance/student")
+def get_student_attendance(student_roll_no: str, course_code: str, db: Session = Depends(get_db)):
+    history = attendance.student_history(db, student_roll_no, course_code)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return history
 
 # --- STUDENT: ACADEMIC PORTAL ---
-@app.get("/marks/cia")
+@router.get("/marks/cia")
 def get_student_marks(student_id: str, db: Session = Depends(get_db)):
     marks = db.query(models.AcademicData).filter(models.AcademicData.student_roll_no == student_id).all()
     return [{
@@ -312,12 +573,85 @@ def get_student_marks(student_id: str, db: Session = Depends(get_db)):
         "cia2": m.cia2_marks or 0,
         "cia2_retest": m.cia2_retest or 0, 
         "subject_attendance": m.subject_attendance or 0,
-        "total": max(m.cia1_marks or 0, m.cia1_retest or 0) + max(m.cia2_marks or 0, m.cia2_retest or 0)
+        "total": max(m.cia1_marks or 0, m.cia1_retest or 0) + max(m.cia2_marks or 0, m.cia2_retest or 0),
+        "end_sem": m.end_sem_marks,
+        "grade": gpa.grade_for(m.grade_points),
+        "grade_points": m.grade_points
     } for m in marks]
 
+@router.get("/student/{roll_no}/gpa")
+def get_student_gpa(roll_no: str, db: Session = Depends(get_db)):
+    student = db.query(models.Student).filter(models.Student.roll_no == roll_no).first()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return {"roll_no": roll_no, "cgpa": student.cgpa, "semesters": gpa.semester_breakdown(db, roll_no)}
+
+# One course page's worth of data for one student. Cached briefly: these pages
+# are reloaded far more often than marks or materials change, and the writes
+# that matter below invalidate explicitly.
+COURSE_VIEW_TTL = float(os.environ.get("COURSE_VIEW_TTL", "30"))
+course_view_cache = cache.TTLCache(COURSE_VIEW_TTL)
+
+def _forget_course_views(roll_nos):
+    course_view_cache.invalidate(lambda key: key[0] in roll_nos)
+
+def _course_view(db: Session, roll_no: str, course_ref: str):
+    # Student, enrolment and course in one joined query. course_ref is a course
+    # id or code; older links carry the subject title, so that matches too
+    matches = models.AcademicData.course_id == int(course_ref) if course_ref.isdigit() \
+        else (models.AcademicData.course_code == course_ref) | (models.AcademicData.subject == course_ref)
+    row = db.query(models.Student.roll_no, models.Student.name, models.Student.section,
+                   models.AcademicData, models.Course).outerjoin(
+        models.AcademicData, and_(models.AcademicData.student_roll_no == models.Student.roll_no, matches)
+    ).outerjoin(
+        models.Course, models.Course.id == models.AcademicData.course_id
+    ).filter(models.Student.roll_no == roll_no).first()
+    if row is None:
+        return None
+    roll, name, section, m, course = row
+    course_code = m.course_code if m else course_ref
+
+    materials = db.query(models.Material.id, models.Material.type, models.Material.title,
+                         models.Material.file_link).filter(
+        models.Material.course_id == int(course_ref) if course_ref.isdigit() else models.Material.course_code == course_code
+    ).order_by(models.Material.id.desc()).all()
+    ids = feeds.announcements.ids(db, [(c, s) for c in (course_code, "Global") for s in ("All", section)], feeds.FEED_SIZE)
+    announcements = _active_announcements(db).filter(
+        models.Announcement.id.in_(ids),
+        (models.Announcement.course_code == course_code) | (models.Announcement.type == "Student"),
+    ).order_by(models.Announcement.pinned.desc(), models.Announcement.id.desc()).all()
+
+    return {
+        "student": {"roll_no": roll, "name": name, "section": section},
+        "course": {"id": course.id, "code": course.code, "title": course.title, "credits": course.credits,
+                   "faculty_id": course.faculty_id} if course else None,
+        "marks": {
+            "subject": m.subject or m.course_code,
+            "cia1": m.cia1_marks or 0, "cia1_retest": m.cia1_retest or 0,
+            "cia2": m.cia2_marks or 0, "cia2_retest": m.cia2_retest or 0,
+            "total": max(m.cia1_marks or 0, m.cia1_retest or 0) + max(m.cia2_marks or 0, m.cia2_retest or 0),
+            "subject_attendance": m.subject_attendance or 0,
+            "sessions_held": m.sessions_held, "sessions_present": m.sessions_present,
+            "end_sem": m.end_sem_marks, "grade": gpa.grade_for(m.grade_points),
+        } if m else None,
+        "materials": [{"id": i, "type": t, "title": title, "file_link": link} for i, t, title, link in materials],
+        "announcements": [{"id": a.id, "title": a.title, "content": a.content, "type": a.type,
+                           "course_code": a.course_code, "posted_by": a.posted_by, "pinned": a.pinned,
+                           "created_at": a.created_at, "expires_at": a.expires_at} for a in announcements],
+    }
+
+@router.get("/student/{roll_no}/course/{course_ref}")
+def get_student_course(roll_no: str, course_ref: str, db: Session = Depends(get_db)):
+    """Marks, attendance, materials and announcements of one course for one student."""
+    roll_no = roll_no.strip()
+    view = course_view_cache.get_or_set((roll_no, course_ref), lambda: _course_view(db, roll_no, course_ref))
+    if view is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return view
+
 # --- MATERIALS & ANNOUNCEMENTS ---
 
-@app.post("/materials")
+@router.post("/materials")
 async def upload_material(
     course_id: Optional[int] = Form(None),
     course_code: str = Form(...),
@@ -329,13 +663,12 @@ async def upload_material(
     db: Session = Depends(get_db)
 ):
     try:
-        file_link = None
+        file_link, size, etag = None, None, None
         if file:
-            filename = f"{course_code}_{int(time.time())}_{file.filename}"
-            file_location = os.path.join(UPLOAD_DIR, filename)
-            with open(file_location, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            file_link = f"http://localhost:8000/static/{filename}"
+            file_link = storage.new_key(course_code, file.filename)
+            # Hash while copying so downloads get a content ETag without re-reading the file
+            size, digest = await run_in_threadpool(storage.backend.save_stream, file.file, file_link)
+            etag = storage.etag_for(digest)
         elif url:
             file_link = url
         else:
@@ -347,15 +680,100 @@ async def upload_material(
             if course: cid = course.id
             else: cid = 0
 
-        db_material = models.Material(course_id=cid, course_code=course_code, type=type, title=title, file_link=file_link, posted_by=posted_by)
+        db_material = models.Material(course_id=cid, course_code=course_code, type=type, title=title, file_link=file_link, posted_by=posted_by,
+                                      size=size, etag=etag, content_type=file.content_type if file else None)
         db.add(db_material)
         db.commit()
+        db.refresh(db_material)
+        course_view_cache.invalidate()
+        if file:
+            textindex.notify()
         return db_material
     except Exception as e:
         logger.error(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/materials/{identifier}")
+def _upload_session(db: Session, upload_id: str) -> models.UploadSession:
+    session = db.query(models.UploadSession).filter(models.UploadSession.id == upload_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    return session
+
+@router.post("/materials/uploads")
+def create_upload(req: schemas.UploadSessionCreate, db: Session = Depends(get_db)):
+    """Starts a resumable upload; for large files where one multipart request is fragile."""
+    cid = req.course_id
+    if not cid:
+        course = db.query(models.Course).filter(models.Course.code == req.course_code).first()
+        cid = course.id if course else 0
+    try:
+        session = uploads.create(db, cid, req.course_code, req.type, req.title, req.posted_by,
+                                 req.filename, req.size, req.content_type)
+    except uploads.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return {"upload_id": session.id, "offset": 0, "size": session.size, "max_chunk": uploads.MAX_CHUNK_BYTES}
+
+@router.api_route("/materials/uploads/{upload_id}", methods=["GET", "HEAD"])
+def get_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Where to resume: the client continues with PUT ?offset=<offset>."""
+    session = _upload_session(db, upload_id)
+    return JSONResponse({"upload_id": session.id, "offset": session.received, "size": session.size},
+                        headers={"Upload-Offset": str(session.received)})
+
+def _advance_upload(db: Session, session: models.UploadSession, end: int) -> models.UploadSession:
+    # MAX(): a late retry of an earlier chunk never moves the offset backwards
+    db.execute(text("UPDATE upload_sessions SET received = MAX(received, :end), updated_at = :now WHERE id = :id"),
+               {"end": end, "now": int(time.time()), "id": session.id})
+    db.commit()
+    db.refresh(session)
+    return session
+
+@router.put("/materials/uploads/{upload_id}")
+async def put_upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0),
+                           db: Session = Depends(get_db)):
+    # Async to stream the body; the session lookup and update are synchronous
+    # DB calls, so they run on the threadpool rather than the event loop
+    session = await run_in_threadpool(_upload_session, db, upload_id)
+    try:
+        _, end = await uploads.write_chunk(session, offset, request.stream(),
+                                           request.headers.get("x-chunk-sha256"))
+    except uploads.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail,
+                            headers={"Upload-Offset": str(session.received)})
+    session = await run_in_threadpool(_advance_upload, db, session, end)
+    return JSONResponse({"upload_id": session.id, "offset": session.received, "size": session.size},
+                        headers={"Upload-Offset": str(session.received)})
+
+@router.post("/materials/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, req: Optional[schemas.UploadFinalize] = None,
+                          db: Session = Depends(get_db)):
+    session = await run_in_threadpool(_upload_session, db, upload_id)
+    try:
+        # Hashing a few hundred MB must not stall the event loop
+        material = await run_in_threadpool(uploads.finalize, db, session, req.sha256 if req else None)
+    except uploads.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    course_view_cache.invalidate()
+    textindex.notify()
+    return material
+
+@router.delete("/materials/uploads/{upload_id}")
+def abort_upload(upload_id: str, db: Session = Depends(get_db)):
+    uploads.discard(db, _upload_session(db, upload_id))
+    return {"message": "Upload discarded"}
+
+def _remove_files(keys):
+    """Deletes stored files after the rows pointing at them are committed.
+    Failures are logged and left to the storage GC."""
+    for key in keys:
+        if not key:
+            continue
+        try:
+            storage.backend.delete(key)
+        except Exception as e:
+            logger.warning(f"Could not delete stored file {key}: {e}")
+
+@router.get("/materials/{identifier}")
 def get_course_materials(identifier: str, db: Session = Depends(get_db)):
     # If numeric ID, fetch by course_id
     if identifier.isdigit():
@@ -364,86 +782,225 @@ def get_course_materials(identifier: str, db: Session = Depends(get_db)):
         # Fetch by exact course_code (e.g. 'Global' for result links)
         return db.query(models.Material).filter(models.Material.course_code == identifier).all()
 
-@app.delete("/materials/{material_id}")
+def _offload(request: Request, key: str, headers: dict, media_type: Optional[str] = None,
+             attachment: bool = False) -> Optional[Response]:
+    """An empty response telling the front proxy to send the file (DOWNLOAD_MODE=offload),
+    or None when this request has to be served from Python."""
+    offload = storage.offload_headers(key, request.headers.get("x-sendfile-type"))
+    if offload is None:
+        return None
+    headers = dict(headers, **offload)
+    if attachment:
+        headers["Content-Disposition"] = _attachment(key)
+    response = Response(status_code=200, headers=headers, media_type=media_type)
+    # The proxy sets the real length (and handles Range) from the file it sends
+    del response.headers["content-length"]
+    return response
+
+@router.api_route("/materials/{material_id}/download", methods=["GET", "HEAD"])
+def download_material(material_id: int, request: Request, db: Session = Depends(get_db)):
+    """Serves an uploaded material with Range/If-Range support and a content-hash ETag,
+    so interrupted downloads resume and unchanged files revalidate with a 304."""
+    mat = db.query(models.Material).filter(models.Material.id == material_id).first()
+    if not mat:
+        raise HTTPException(status_code=404, detail="Material not found")
+    key = storage.key_for(mat.file_link)
+    if key is None:
+        # External material (YouTube link etc.); a link typed without a scheme is not a relative path
+        if not mat.file_link:
+            return Response(status_code=404)
+        return RedirectResponse(mat.file_link if "://" in mat.file_link else "https://" + mat.file_link)
+    path = storage.path_for(key)
+    if path is None or storage.DOWNLOAD_MODE == "redirect":
+        # Bytes are served by the CDN / offload server (or the bucket) instead of this process
+        return RedirectResponse(mat.file_link)
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File missing")
+
+    if mat.etag is None or mat.size != stat_result.st_size:
+        # Uploaded before ETags were recorded (or replaced on disk): hash once and keep it
+        mat.size, digest = storage.hash_file(path)
+        mat.etag = storage.etag_for(digest)
+        db.commit()
+
+    headers = {"ETag": mat.etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or mat.etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    offloaded = _offload(request, key, headers, mat.content_type, attachment=True)
+    if offloaded is not None:
+        return offloaded
+    # FileResponse handles Range/If-Range and uses the server's zero-copy path when offered
+    return FileResponse(path, headers=headers, media_type=mat.content_type, filename=key,
+                        stat_result=stat_result)
+
+@router.get("/materials/{course_ref}/bundle")
+def download_bundle(course_ref: str, request: Request, db: Session = Depends(get_db)):
+    """All uploaded materials of a course as one ZIP, streamed as it is built.
+    The ETag is derived from the materials' content hashes, so an unchanged
+    course revalidates with a 304 instead of a re-download."""
+    course_filter = models.Material.course_id == int(course_ref) if course_ref.isdigit() \
+        else models.Material.course_code == course_ref
+    materials = [m for m in db.query(models.Material).filter(course_filter).order_by(models.Material.id)
+                 if storage.key_for(m.file_link)]
+    if not materials:
+        raise HTTPException(status_code=404, detail="No uploaded materials for this course")
+
+    for m in materials:
+        if m.etag is None:
+            # Uploaded before content hashes were recorded: hash once and keep it
+            try:
+                m.size, digest = storage.hash_key(storage.key_for(m.file_link))
+                m.etag = storage.etag_for(digest)
+            except FileNotFoundError:
+                pass
+    db.commit()
+
+    etag = bundles.etag_for(materials)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    name = course_ref if not course_ref.isdigit() else (materials[0].course_code or course_ref)
+    headers["Content-Disposition"] = _attachment(f"{name}_materials.zip")
+    # The entry list is fixed here; the generator only reads files, so it needs no session
+    return StreamingResponse(bundles.zip_stream(bundles.plan(materials)), media_type="application/zip", headers=headers)
+
+@router.get("/materials/{course_ref}/search")
+def search_materials(course_ref: str, q: str = Query(..., min_length=1, max_length=200),
+                     limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """Pages of a course's uploaded notes and question banks that match `q`, best first."""
+    results = textindex.search(db, course_ref, q, limit)
+    if results is None:
+        raise HTTPException(status_code=400, detail="Query has no searchable words")
+    return results
+
+@router.delete("/materials/{material_id}")
 def delete_material(material_id: int, db: Session = Depends(get_db)):
     mat = db.query(models.Material).filter(models.Material.id == material_id).first()
     if not mat:
         raise HTTPException(status_code=404, detail="Material not found")
-    if mat.file_link and "localhost" in mat.file_link:
-        try:
-            fname = mat.file_link.split("/")[-1]
-            os.remove(os.path.join(UPLOAD_DIR, fname))
-        except Exception: pass
+    key = storage.key_for(mat.file_link)
+    textindex.forget(db, mat.id)
     db.delete(mat)
     db.commit()
+    _remove_files([key])
+    course_view_cache.invalidate()
     return {"message": "Deleted"}
 
-@app.post("/announcements")
+def _active_announcements(db: Session):
+    # The sweeper archives expired rows periodically; this hides them in between
+    now = int(time.time())
+    return db.query(models.Announcement).filter(
+        (models.Announcement.expires_at == None) | (models.Announcement.expires_at > now))
+
+@router.post("/announcements")
 def create_announcement(announcement: schemas.AnnouncementCreate, db: Session = Depends(get_db)):
+    now = int(time.time())
+    expires_at = int(announcement.expires_at.timestamp()) if announcement.expires_at \
+        else archival.default_expiry(now, announcement.pinned)
     db_announcement = models.Announcement(
         title=announcement.title, content=announcement.content, type=announcement.type,
         posted_by=announcement.posted_by, course_code=announcement.course_code or "Global",
-        section=getattr(announcement, 'section', 'All')
+        section=getattr(announcement, 'section', 'All'),
+        created_at=now, expires_at=expires_at, pinned=announcement.pinned
     )
     db.add(db_announcement)
     db.commit()
+    feeds.announcements.add(db_announcement.id, db_announcement.course_code, db_announcement.section,
+                            db_announcement.expires_at)
+    course_view_cache.invalidate()
     return db_announcement
 
-@app.get("/announcements")
-def get_announcements(type: Optional[str] = None, section: Optional[str] = None, student_id: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(models.Announcement)
+@router.get("/announcements")
+def get_announcements(type: Optional[str] = None, section: Optional[str] = None, student_id: Optional[str] = None,
+                      limit: Annotated[int, Query(ge=1, le=feeds.FEED_SIZE)] = feeds.FEED_SIZE,
+                      db: Session = Depends(get_db)):
     if student_id:
-        student = db.query(models.Student).filter(models.Student.roll_no == student_id).first()
+        # Global notices for everyone or the student's section, plus notices for the
+        # courses they are enrolled in, read from the precomputed per-target feeds
+        student = db.query(models.Student.section).filter(models.Student.roll_no == student_id).first()
         if student:
-            query = query.filter((models.Announcement.section == "All") | (models.Announcement.section == student.section))
+            sections = ["All", student.section or "A"]
+            courses = ["Global"] + [c for (c,) in db.query(models.AcademicData.course_code).filter(
+                models.AcademicData.student_roll_no == student_id).distinct()]
+            ids = feeds.announcements.ids(db, [(c, s) for c in courses for s in sections], limit)
+            # Pinned notices stay on top even once newer posts push them out of the ring buffer
+            pinned = db.query(models.Announcement.id).filter(
+                models.Announcement.pinned == True,
+                models.Announcement.course_code.in_(courses),
+                models.Announcement.section.in_(sections),
+            )
+            query = _active_announcements(db).filter(
+                models.Announcement.id.in_(ids) | models.Announcement.id.in_(pinned))
+            if type: query = query.filter(models.Announcement.type == type)
+            return query.order_by(models.Announcement.pinned.desc(), models.Announcement.id.desc()).all()
+
+    query = _active_announcements(db)
+    if section: query = query.filter(models.Announcement.section.in_(["All", section]))
     if type: query = query.filter(models.Announcement.type == type)
-    return query.order_by(models.Announcement.id.desc()).all()
+    # limit only applies to student feeds; this listing stays complete
+    return query.order_by(models.Announcement.pinned.desc(), models.Announcement.id.desc()).all()
+
+@router.get("/announcements/archive")
+def get_archived_announcements(course_code: Optional[str] = None, section: Optional[str] = None,
+                               type: Optional[str] = None, before_id: Optional[int] = None,
+                               limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_db)):
+    """Expired announcements, newest first. Page with before_id = last id of the previous page."""
+    query = db.query(models.AnnouncementArchive)
+    if course_code: query = query.filter(models.AnnouncementArchive.course_code == course_code)
+    if section: query = query.filter(models.AnnouncementArchive.section.in_(["All", section]))
+    if type: query = query.filter(models.AnnouncementArchive.type == type)
+    if before_id: query = query.filter(models.AnnouncementArchive.id < before_id)
+    return query.order_by(models.AnnouncementArchive.id.desc()).limit(limit).all()
 
 # --- PROFILES & PHOTO UPLOADS ---
 
-@app.get("/faculty/{staff_no}", response_model=schemas.Faculty)
+@router.get("/faculty/{staff_no}", response_model=schemas.Faculty)
 def get_faculty(staff_no: str, db: Session = Depends(get_db)):
     faculty = db.query(models.Faculty).filter(models.Faculty.staff_no == staff_no.strip()).first()
     if not faculty: raise HTTPException(status_code=404, detail="Faculty not found")
     return faculty
 
-@app.post("/faculty/{staff_no}/photo")
+@router.post("/faculty/{staff_no}/photo")
 async def upload_faculty_photo(staff_no: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
     faculty = db.query(models.Faculty).filter(models.Faculty.staff_no == staff_no.strip()).first()
     if not faculty: raise HTTPException(status_code=404, detail="Faculty not found")
     
-    filename = f"faculty_{staff_no.strip()}_{int(time.time())}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    key = storage.new_key(f"faculty_{staff_no.strip()}", file.filename)
+    await run_in_threadpool(storage.backend.save_stream, file.file, key)
         
-    faculty.profile_pic = f"http://localhost:8000/static/{filename}"
+    old_key = storage.key_for(faculty.profile_pic)
+    faculty.profile_pic = key
     db.commit()
+    _remove_files([old_key])
     db.refresh(faculty)
     return {"profile_pic": faculty.profile_pic}
 
-@app.get("/student/{roll_no}", response_model=schemas.Student)
+@router.get("/student/{roll_no}", response_model=schemas.Student)
 def get_student(roll_no: str, db: Session = Depends(get_db)):
     student = db.query(models.Student).filter(models.Student.roll_no == roll_no.strip()).first()
     if not student: raise HTTPException(status_code=404, detail="Student not found")
     return student
 
-@app.post("/student/upload-photo")
+@router.post("/student/upload-photo")
 async def upload_student_photo(roll_no: str = Form(...), file: UploadFile = File(...), db: Session = Depends(get_db)):
     student = db.query(models.Student).filter(models.Student.roll_no == roll_no.strip()).first()
     if not student: raise HTTPException(status_code=404, detail="Student not found")
     
-    filename = f"student_{roll_no.strip()}_{int(time.time())}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    key = storage.new_key(f"student_{roll_no.strip()}", file.filename)
+    await run_in_threadpool(storage.backend.save_stream, file.file, key)
         
-    student.profile_pic = f"http://localhost:8000/static/{filename}"
+    old_key = storage.key_for(student.profile_pic)
+    student.profile_pic = key
     db.commit()
+    _remove_files([old_key])
     db.refresh(student)
     return {"profile_pic": student.profile_pic}
 
-@app.get("/courses", response_model=List[schemas.Course])
+@router.get("/courses", response_model=List[schemas.Course])
 def get_courses(semester: Optional[int] = None, section: Optional[str] = None, faculty_id: Optional[str] = None, db: Session = Depends(get_db)):
     query = db.query(models.Course)
     if semester: query = query.filter(models.Course.semester == semester)
@@ -451,15 +1008,14 @@ def get_courses(semester: Optional[int] = None, section: Optional[str] = None, f
     if faculty_id: query = query.filter(models.Course.faculty_id == faculty_id)
     return query.all()
 
-@app.get("/admin/faculties")
+@router.get("/admin/faculties")
 def get_all_faculties(designation: Optional[str] = None, db: Session = Depends(get_db)):
     query = db.query(models.Faculty)
     if designation and designation != "":
         query = query.filter(models.Faculty.designation == designation)
     return query.all()
 
-@app.get("/admin/students")
-def get_all_students(year: Optional[int] = None, semester: Optional[int] = None, section: Optional[str] = None, db: Session = Depends(get_db)):
+def _students_query(db: Session, year: Optional[int], semester: Optional[int], section: Optional[str]):
     query = db.query(models.Student)
     if year:
         query = query.filter(models.Student.year == year)
@@ -467,20 +1023,134 @@ def get_all_students(year: Optional[int] = None, semester: Optional[int] = None,
         query = query.filter(models.Student.semester == semester)
     if section and section != "":
         query = query.filter(models.Student.section == section)
-    return query.all()
+    return query
+
+@router.get("/admin/students")
+def get_all_students(year: Optional[int] = None, semester: Optional[int] = None, section: Optional[str] = None, db: Session = Depends(get_db)):
+    return _students_query(db, year, semester, section).all()
+
+@router.get("/admin/students/export")
+def export_students(year: Optional[int] = None, semester: Optional[int] = None, section: Optional[str] = None,
+                    format: str = Query("csv", pattern="^(csv|xlsx)$")):
+    header = ["Roll No", "Name", "Year", "Semester", "Section", "CGPA", "Attendance %"]
+
+    def rows(db):
+        query = _students_query(db, year, semester, section).with_entities(
+            models.Student.roll_no, models.Student.name, models.Student.year, models.Student.semester,
+            models.Student.section, models.Student.cgpa, models.Student.attendance_percentage,
+        ).order_by(models.Student.roll_no)
+        yield from query.yield_per(EXPORT_BATCH)
+
+    parts = ["students"] + [str(p) for p in (year and f"Y{year}", semester and f"S{semester}", section) if p]
+    return _export_response(format, "_".join(parts), header, rows)
 
 
 # --- TOPPER CALCULATIONS ---
-@app.get("/admin/toppers/overall")
+@router.get("/admin/toppers/overall")
 def get_overall_toppers(year: Optional[int] = None, db: Session = Depends(get_db)):
     query = db.query(models.Student)
     if year:
         query = query.filter(models.Student.year == year)
     return query.order_by(models.Student.cgpa.desc()).limit(3).all()
 
-@app.get("/admin/toppers/classwise")
+@router.get("/admin/toppers/classwise")
 def get_classwise_toppers(year: int, section: str, db: Session = Depends(get_db)):
     return db.query(models.Student).filter(
         models.Student.year == year,
         models.Student.section == section
-    ).order_by(models.Student.cgpa.desc()).all()
\ No newline at end of file
+    ).order_by(models.Student.cgpa.desc()).all()
+
+
+@router.post("/admin/gpa/recompute", dependencies=[Depends(auth.require_roles("Admin"))])
+def recompute_all_gpa(db: Session = Depends(get_db)):
+    """Full rebuild, e.g. after changing the grading scheme. Routine edits recompute incrementally."""
+    count = gpa.recompute_all(db)
+    db.commit()
+    return {"students": count}
+
+
+# --- AT-RISK REPORT ---
+# Filled by the at_risk background scan (every AT_RISK_INTERVAL seconds)
+hod_or_admin = Depends(auth.require_roles("HOD", "Admin"))
+
+@router.get("/admin/at-risk", dependencies=[hod_or_admin])
+def get_at_risk(rule: Optional[str] = None, course_code: Optional[str] = None, section: Optional[str] = None,
+                year: Optional[int] = None, student_roll_no: Optional[str] = None,
+                limit: int = Query(500, ge=1, le=5000), db: Session = Depends(get_db)):
+    query = db.query(
+        models.AtRiskFlag.student_roll_no, models.Student.name, models.Student.year,
+        models.AtRiskFlag.course_code, models.AtRiskFlag.section,
+        models.AtRiskFlag.rule, models.AtRiskFlag.value, models.AtRiskFlag.flagged_at,
+    ).join(models.Student, models.Student.roll_no == models.AtRiskFlag.student_roll_no)
+    if rule:
+        query = query.filter(models.AtRiskFlag.rule == rule)
+    if course_code:
+        query = query.filter(models.AtRiskFlag.course_code == course_code)
+    if section:
+        query = query.filter(models.AtRiskFlag.section == section)
+    if year:
+        query = query.filter(models.Student.year == year)
+    if student_roll_no:
+        query = query.filter(models.AtRiskFlag.student_roll_no == student_roll_no)
+    rows = query.order_by(models.AtRiskFlag.course_code, models.AtRiskFlag.section,
+                          models.AtRiskFlag.student_roll_no).limit(limit).all()
+    return {
+        "last_run": at_risk.last_run or None,
+        "flags": [{
+            "roll_no": r[0], "name": r[1], "year": r[2], "course_code": r[3], "section": r[4],
+            "rule": r[5], "value": r[6], "flagged_at": r[7],
+        } for r in rows],
+    }
+
+@router.post("/admin/at-risk/run", dependencies=[hod_or_admin])
+def run_at_risk_scan():
+    """Rebuilds the report now instead of waiting for the next scheduled scan."""
+    return {"flags": at_risk.run()}
+
+
+# --- STORAGE ---
+@router.get("/admin/storage", dependencies=[Depends(auth.require_roles("Admin"))])
+def get_storage_report(fresh: bool = False):
+    """Disk use per course and per user, with orphan counts. `fresh` rescans now
+    (read only); otherwise the report of the last GC run is returned."""
+    if fresh or not storage_gc.last_run:
+        return storage_gc.run(dry_run=True)
+    return storage_gc.last_run
+
+@router.post("/admin/storage/gc", dependencies=[Depends(auth.require_roles("Admin"))])
+def run_storage_gc(dry_run: bool = False):
+    return storage_gc.run(dry_run=dry_run)
+
+
+# --- PROFILING ---
+# Reports expose code paths and timings, so these need an admin token
+admin_only = Depends(auth.require_roles("Admin"))
+
+@router.get("/admin/profiling", dependencies=[admin_only])
+def get_profiling_settings():
+    return {
+        "backend": profiling.backend_name(),
+        "header_enabled": profiling.PROFILE_TOKEN is not None,
+        "rates": profiling.get_route_rates(),
+    }
+
+@router.post("/admin/profiling", dependencies=[admin_only])
+def set_profiling_rate(data: ProfilingToggleRequest):
+    if not any(getattr(r, "path", None) == data.route for r in router.routes):
+        raise HTTPException(status_code=404, detail=f"Unknown route {data.route}")
+    profiling.set_route_rate(data.route, data.rate)
+    return {"rates": profiling.get_route_rates()}
+
+@router.get("/admin/profiles", dependencies=[admin_only])
+def list_profiles():
+    return profiling.list_reports()
+
+@router.get("/admin/profiles/{name}", dependencies=[admin_only])
+def get_profile(name: str):
+    path = profiling.report_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path)
+
+
+app = create_app()
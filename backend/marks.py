@@ -0,0 +1,189 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Editable per-student fields of an AcademicData row
+MARK_FIELDS = ("cia1_marks", "cia1_retest", "cia2_marks", "cia2_retest", "subject_attendance", "end_sem_marks")
+MAX_VALUE = 100.0
+
+# Spreadsheet header (normalised) -> AcademicData column
+IMPORT_COLUMNS = {
+    "cia1": "cia1_marks",
+    "cia1_marks": "cia1_marks",
+    "cia1_retest": "cia1_retest",
+    "cia2": "cia2_marks",
+    "cia2_marks": "cia2_marks",
+    "cia2_retest": "cia2_retest",
+    "attendance": "subject_attendance",
+    "subject_attendance": "subject_attendance",
+    "end_sem": "end_sem_marks",
+    "end_sem_marks": "end_sem_marks",
+    "ese": "end_sem_marks",
+}
+
+
+def _normalise_header(name: str) -> str:
+    # "CIA 1 Retest" -> "cia1_retest", "Attendance %" -> "attendance", "Roll No" -> "roll_no"
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower()).split()
+    return re.sub(r"cia_(\d)", r"cia\1", "_".join(words))
+
+
+def parse_import(rows: List[List[str]]) -> Tuple[Dict[str, Dict[str, float]], List[dict]]:
+    """Turns spreadsheet rows into {roll_no: {field: value}} plus per-row errors.
+
+    The first row is the header. Blank cells leave a field untouched.
+    """
+    if not rows:
+        return {}, [{"row": 1, "error": "Sheet is empty"}]
+    header = [_normalise_header(h) for h in rows[0]]
+    if "roll_no" not in header:
+        return {}, [{"row": 1, "error": "Missing roll_no column"}]
+    roll_idx = header.index("roll_no")
+    columns = [(i, IMPORT_COLUMNS[h]) for i, h in enumerate(header) if h in IMPORT_COLUMNS]
+
+    updates, errors, seen = {}, [], set()
+    for line, row in enumerate(rows[1:], start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        roll = row[roll_idx].strip() if roll_idx < len(row) else ""
+        if not roll:
+            errors.append({"row": line, "error": "Missing roll_no"})
+            continue
+        if roll in seen:
+            errors.append({"row": line, "roll_no": roll, "error": "Duplicate roll_no"})
+            continue
+        seen.add(roll)
+        fields, row_errors = {}, len(errors)
+        for i, field in columns:
+            cell = row[i].strip() if i < len(row) else ""
+            if cell == "":
+                continue
+            try:
+                value = float(cell)
+            except ValueError:
+                errors.append({"row": line, "roll_no": roll, "error": f"{field} is not a number: {cell!r}"})
+                continue
+            if not 0 <= value <= MAX_VALUE:
+                errors.append({"row": line, "roll_no": roll, "error": f"{field} out of range: {value}"})
+                continue
+            fields[field] = value
+        # A row with a bad cell is reported, not half-imported (nor counted as unchanged)
+        if len(errors) == row_errors:
+            updates[roll] = fields
+    return updates, errors
+
+
+def diff_section(db: Session, course_code: str, section: Optional[str], updates: Dict[str, Dict[str, float]]):
+    """Compares proposed values with the stored rows of one course/section in a single query.
+
+    Returns (changes, unknown_roll_numbers, unchanged_count); each change is
+    {"id", "roll_no", "fields": {field: [old, new]}}.
+    """
+    stored = db.query(models.AcademicData.id, models.AcademicData.student_roll_no,
+                      *[getattr(models.AcademicData, f) for f in MARK_FIELDS]).filter(
+        models.AcademicData.course_code == course_code,
+        models.AcademicData.section == section,
+    ).all()
+    by_roll = {row[1]: row for row in stored}
+
+    changes, unknown, unchanged = [], [], 0
+    for roll, fields in updates.items():
+        row = by_roll.get(roll)
+        if row is None:
+            unknown.append(roll)
+            continue
+        current = dict(zip(MARK_FIELDS, row[2:]))
+        # Raw comparison: an end-sem mark of 0 still differs from "not graded" (NULL)
+        delta = {f: [current[f], v] for f, v in fields.items() if current[f] != v}
+        if delta:
+            changes.append({"id": row[0], "roll_no": roll, "fields": delta})
+        else:
+            unchanged += 1
+    return changes, unknown, unchanged
+
+
+def _versioned_update(fields):
+    """UPDATE of the given fields by id that also bumps the row version."""
+    table = models.AcademicData.__table__
+    return update(table).where(table.c.id == bindparam("_id")).values(
+        version=table.c.version + 1, **{f: bindparam(f) for f in fields}
+    )
+
+
+def apply_changes(db: Session, course_code: str, changes: List[dict], log=None) -> int:
+    """Writes a diff produced by diff_section, one executemany per distinct set
+    of changed columns. Caller commits (after log.flush())."""
+    groups: Dict[tuple, List[dict]] = {}
+    for c in changes:
+        if log is not None:
+            for f, (old, new) in c["fields"].items():
+                log.record(c["roll_no"], course_code, f, old, new)
+        fields = tuple(sorted(c["fields"]))
+        groups.setdefault(fields, []).append(dict({"_id": c["id"]}, **{f: c["fields"][f][1] for f in fields}))
+    for fields, params in groups.items():
+        db.execute(_versioned_update(fields), params)
+    return len(changes)
+
+
+def validate_fields(fields: Dict[str, float]) -> Optional[str]:
+    for f, v in fields.items():
+        if f not in MARK_FIELDS:
+            return f"Unknown field {f}"
+        if not 0 <= v <= MAX_VALUE:
+            return f"{f} out of range: {v}"
+    return None
+
+
+def apply_deltas(db: Session, course_code: str, section: Optional[str], deltas, log=None) -> dict:
+    """Applies changed fields only where the stored version still matches the
+    client's, so concurrent editors never overwrite each other silently.
+
+    One SELECT for the touched rows, then one conditional UPDATE per edited row
+    (the version check has to be per row). Caller commits (after log.flush()).
+    """
+    table = models.AcademicData.__table__
+    rolls = [d.roll_no for d in deltas]
+    stored = {
+        row.student_roll_no: row for row in db.execute(
+            table.select().with_only_columns(table.c.id, table.c.student_roll_no, table.c.version,
+                                            *[table.c[f] for f in MARK_FIELDS])
+            .where(table.c.course_code == course_code, table.c.section == section,
+                   table.c.student_roll_no.in_(rolls))
+        )
+    }
+
+    applied, conflicts, errors = [], [], []
+    for delta in deltas:
+        row = stored.get(delta.roll_no)
+        if row is None:
+            errors.append({"roll_no": delta.roll_no, "error": "Record not found"})
+            continue
+        problem = validate_fields(delta.fields)
+        if problem:
+            errors.append({"roll_no": delta.roll_no, "error": problem})
+            continue
+        if not delta.fields:
+            continue
+        result = db.execute(
+            update(table)
+            .where(table.c.id == row.id, table.c.version == delta.version)
+            .values(version=table.c.version + 1, **delta.fields)
+        )
+        if result.rowcount == 1:
+            changed = {f: [row._mapping[f], v] for f, v in delta.fields.items()}
+            applied.append({"roll_no": delta.roll_no, "version": delta.version + 1, "changes": changed})
+            if log is not None:
+                for f, (old, new) in changed.items():
+                    log.record(delta.roll_no, course_code, f, old, new)
+        else:
+            conflicts.append({
+                "roll_no": delta.roll_no,
+                "your_version": delta.version,
+                "current_version": row.version,
+                "current": {f: row._mapping[f] for f in MARK_FIELDS},
+            })
+    return {"applied": applied, "conflicts": conflicts, "errors": errors}
@@ -0,0 +1,241 @@
+"""Versioned schema migrations.
+
+    python -m backend.migrations upgrade      # apply pending migrations
+    python -m backend.migrations current      # print the database version
+    python -m backend.migrations history      # list known migrations
+    python -m backend.migrations stamp 3      # record a version without running anything
+
+The database keeps its version in a one-row ``schema_version`` table, so the
+startup check is a single SELECT. A brand new database is built with
+``create_all`` from the models and stamped at the head version; an existing one
+runs each pending migration in order. Migrations are written to be idempotent
+(columns and indexes are only added when missing) so a half-applied upgrade or
+two workers racing on the same file cannot break the schema.
+
+To change the schema: update models.py, then append a migration that brings an
+existing database to the same shape.
+"""
+import logging
+import os
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from . import database, models
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+
+
+# --- HELPERS ---
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info('{table}')"))}
+
+
+def _add_column(conn, table, column, ddl):
+    if column not in _columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        logger.info(f"Added '{column}' column to {table} table.")
+
+
+def _create_index(conn, name, table, *columns):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def _create_tables(conn, *tables):
+    models.Base.metadata.create_all(bind=conn, tables=[models.Base.metadata.tables[t] for t in tables])
+
+
+# --- MIGRATIONS ---
+def m001_baseline(conn):
+    """Tables of the original app plus the columns the old ad-hoc scripts added."""
+    _create_tables(conn, "users", "faculty", "students", "courses", "announcements", "academic_data", "materials")
+    _add_column(conn, "students", "section", "TEXT DEFAULT 'A'")
+    _add_column(conn, "faculty", "profile_pic", "TEXT")
+    _add_column(conn, "students", "profile_pic", "TEXT")
+
+
+def m002_hot_path_indexes(conn):
+    """Lookups by student, by course/section and by year/section were all full scans."""
+    _create_index(conn, "ix_academic_data_student_roll_no", "academic_data", "student_roll_no")
+    _create_index(conn, "ix_academic_data_course_section", "academic_data", "course_code", "section")
+    _create_index(conn, "ix_students_year_section", "students", "year", "section")
+    _create_index(conn, "ix_materials_course_id", "materials", "course_id")
+    _create_index(conn, "ix_materials_course_code", "materials", "course_code")
+
+
+def m003_academic_data_version(conn):
+    """Optimistic concurrency counter for marks edits."""
+    _add_column(conn, "academic_data", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def m004_marks_audit(conn):
+    _create_tables(conn, "marks_audit")
+
+
+def m005_attendance_ledger(conn):
+    _create_tables(conn, "attendance_sessions")
+    _add_column(conn, "academic_data", "attendance_marked", "BLOB")
+    _add_column(conn, "academic_data", "attendance_present", "BLOB")
+    _add_column(conn, "academic_data", "sessions_held", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "academic_data", "sessions_present", "INTEGER NOT NULL DEFAULT 0")
+
+
+def m006_gpa(conn):
+    _add_column(conn, "academic_data", "end_sem_marks", "FLOAT")
+    _add_column(conn, "academic_data", "grade_points", "INTEGER")
+    _create_tables(conn, "semester_gpa")
+
+
+def m007_at_risk_flags(conn):
+    _create_tables(conn, "at_risk_flags")
+
+
+def m008_announcement_indexes(conn):
+    _create_index(conn, "ix_announcements_section_type_id", "announcements", "section", "type", "id")
+    _create_index(conn, "ix_announcements_course_code_id", "announcements", "course_code", "id")
+
+
+def m009_announcement_expiry(conn):
+    """Existing announcements get no expiry; only new posts default to one."""
+    _add_column(conn, "announcements", "created_at", "INTEGER")
+    _add_column(conn, "announcements", "expires_at", "INTEGER")
+    _add_column(conn, "announcements", "pinned", "BOOLEAN NOT NULL DEFAULT 0")
+    _create_index(conn, "ix_announcements_expires_at", "announcements", "expires_at")
+    _create_index(conn, "ix_announcements_pinned", "announcements", "pinned")
+    _create_tables(conn, "announcements_archive")
+
+
+def m010_material_validators(conn):
+    _add_column(conn, "materials", "size", "INTEGER")
+    _add_column(conn, "materials", "etag", "TEXT")
+    _add_column(conn, "materials", "content_type", "TEXT")
+
+
+def m011_upload_sessions(conn):
+    _create_tables(conn, "upload_sessions")
+
+
+def m012_material_text(conn):
+    # material_pages' after_create hook adds the FTS5 index and its triggers
+    _create_tables(conn, "material_pages", "material_index")
+
+
+def m013_storage_keys(conn):
+    """Absolute upload links become storage keys; URLs are now built from config when read."""
+    # Frozen here rather than read from storage: the result must not depend on config
+    for prefix in ("http://localhost:8000/static/",):
+        for table, column in (("materials", "file_link"), ("students", "profile_pic"), ("faculty", "profile_pic")):
+            conn.execute(text(
+                f"UPDATE {table} SET {column} = substr({column}, :start) WHERE substr({column}, 1, :n) = :prefix"
+            ), {"start": len(prefix) + 1, "n": len(prefix), "prefix": prefix})
+
+
+MIGRATIONS = [
+    (1, "baseline schema", m001_baseline),
+    (2, "hot path indexes", m002_hot_path_indexes),
+    (3, "academic_data.version", m003_academic_data_version),
+    (4, "marks audit log", m004_marks_audit),
+    (5, "attendance ledger", m005_attendance_ledger),
+    (6, "grades and semester GPA", m006_gpa),
+    (7, "at-risk flags", m007_at_risk_flags),
+    (8, "announcement targeting indexes", m008_announcement_indexes),
+    (9, "announcement expiry, pinning and archive", m009_announcement_expiry),
+    (10, "material size and etag", m010_material_validators),
+    (11, "resumable upload sessions", m011_upload_sessions),
+    (12, "material text index", m012_material_text),
+    (13, "relative storage keys", m013_storage_keys),
+]
+HEAD = MIGRATIONS[-1][0]
+
+
+# --- VERSION TABLE ---
+def current_version(engine=None):
+    """0 for a database that has never been migrated."""
+    engine = engine or database.engine
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT version FROM {VERSION_TABLE}")).scalar() or 0
+    except OperationalError:
+        return 0
+
+
+def _set_version(conn, version):
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version INTEGER NOT NULL)"))
+    conn.execute(text(f"DELETE FROM {VERSION_TABLE}"))
+    conn.execute(text(f"INSERT INTO {VERSION_TABLE} (version) VALUES (:v)"), {"v": version})
+
+
+def stamp(version, engine=None):
+    engine = engine or database.engine
+    with engine.begin() as conn:
+        _set_version(conn, version)
+
+
+def upgrade(engine=None):
+    """Brings the database to HEAD and returns the new version."""
+    # Looked up per call: database.configure() may have repointed the app since import
+    engine = engine or database.engine
+    with engine.begin() as conn:
+        fresh = "users" not in {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type='table'"))}
+        if fresh:
+            models.Base.metadata.create_all(bind=conn)
+            _set_version(conn, HEAD)
+            logger.info(f"Created new database at schema version {HEAD}.")
+            return HEAD
+
+    version = current_version(engine)
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            _set_version(conn, number)
+        logger.info(f"Applied migration {number}: {description}")
+        version = number
+    return version
+
+
+def ensure_schema(engine=None, auto_upgrade=None):
+    """Startup check: one SELECT when the database is already current.
+
+    Pending migrations are applied automatically unless AUTO_MIGRATE=0, in which
+    case the process refuses to start until `python -m backend.migrations upgrade`
+    has been run (the usual choice when several workers share one database).
+    """
+    engine = engine or database.engine
+    if auto_upgrade is None:
+        auto_upgrade = os.environ.get("AUTO_MIGRATE", "1") != "0"
+    version = current_version(engine)
+    if version == HEAD:
+        return version
+    if version > HEAD:
+        raise RuntimeError(f"Database schema version {version} is newer than this code ({HEAD})")
+    if not auto_upgrade:
+        raise RuntimeError(f"Database schema version {version} is behind {HEAD}; run `python -m backend.migrations upgrade`")
+    return upgrade(engine)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    command = args[0] if args else "upgrade"
+    if command == "upgrade":
+        before = current_version()
+        print(f"Schema version {before} -> {upgrade()}")
+    elif command == "current":
+        print(current_version())
+    elif command == "history":
+        for number, description, _ in MIGRATIONS:
+            print(f"{number:4d}  {description}")
+    elif command == "stamp" and len(args) == 2:
+        stamp(int(args[1]))
+        print(f"Stamped schema version {args[1]}")
+    else:
+        raise SystemExit("usage: python -m backend.migrations [upgrade|current|history|stamp VERSION]")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
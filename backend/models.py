@@ -1,7 +1,25 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text
+from sqlalchemy import DDL, Boolean, Column, Integer, String, ForeignKey, Float, Text, Index, LargeBinary, UniqueConstraint, event
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
+from . import storage
 from .database import Base
 
+class StorageLink(TypeDecorator):
+    """An uploaded file's storage key in the database, its public URL in Python.
+
+    Rows are written with keys (URLs built by storage.url_for are turned back
+    into keys) and loaded with URLs from the current configuration. Links to
+    other sites pass through unchanged.
+    """
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return storage.key_for(value) or value
+
+    def process_result_value(self, value, dialect):
+        return storage.url_for(value)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(String, primary_key=True, index=True) # Staff_No or Roll_No or 'admin'
@@ -18,13 +36,14 @@ class Faculty(Base):
     designation = Column(String)
     doj = Column(String)
     # --- FIXED: Added profile_pic here to allow persistence ---
-    profile_pic = Column(String, nullable=True) 
+    profile_pic = Column(StorageLink, nullable=True) 
 
     user = relationship("User", back_populates="faculty")
     courses = relationship("Course", back_populates="assigned_faculty")
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (Index("ix_students_year_section", "year", "section"),)
     roll_no = Column(String, ForeignKey("users.id"), primary_key=True)
     name = Column(String)
     year = Column(Integer)
@@ -33,7 +52,7 @@ class Student(Base):
     cgpa = Column(Float, default=0.0)
     attendance_percentage = Column(Float, default=0.0) 
     # Persists profile photo link
-    profile_pic = Column(String, nullable=True) 
+    profile_pic = Column(StorageLink, nullable=True) 
 
     user = relationship("User", back_populates="student")
     academic_data = relationship("AcademicData", back_populates="student")
@@ -55,6 +74,12 @@ class Course(Base):
 
 class Announcement(Base):
     __tablename__ = "announcements"
+    __table_args__ = (
+        Index("ix_announcements_section_type_id", "section", "type", "id"),
+        Index("ix_announcements_course_code_id", "course_code", "id"),
+        Index("ix_announcements_expires_at", "expires_at"),
+        Index("ix_announcements_pinned", "pinned"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     content = Column(Text)
@@ -62,11 +87,31 @@ class Announcement(Base):
     course_code = Column(String, nullable=True) 
     section = Column(String, default="All") 
     posted_by = Column(String) 
+    created_at = Column(Integer, nullable=True)    # Unix seconds; NULL for rows older than the column
+    expires_at = Column(Integer, nullable=True)    # Unix seconds; NULL = never expires
+    pinned = Column(Boolean, nullable=False, default=False, server_default="0")
+
+class AnnouncementArchive(Base):
+    # Expired announcements, moved here by archival.sweep() so the live table stays small
+    __tablename__ = "announcements_archive"
+    __table_args__ = (Index("ix_announcements_archive_course_code_id", "course_code", "id"),)
+    id = Column(Integer, primary_key=True)         # Same id as in announcements
+    title = Column(String)
+    content = Column(Text)
+    type = Column(String)
+    course_code = Column(String, nullable=True)
+    section = Column(String)
+    posted_by = Column(String)
+    created_at = Column(Integer, nullable=True)
+    expires_at = Column(Integer, nullable=True)
+    pinned = Column(Boolean, nullable=False, default=False)
+    archived_at = Column(Integer, nullable=False)
 
 class AcademicData(Base):
     __tablename__ = "academic_data"
+    __table_args__ = (Index("ix_academic_data_course_section", "course_code", "section"),)
     id = Column(Integer, primary_key=True, index=True)
-    student_roll_no = Column(String, ForeignKey("students.roll_no"))
+    student_roll_no = Column(String, ForeignKey("students.roll_no"), index=True)
     course_id = Column(Integer, ForeignKey("courses.id")) 
     course_code = Column(String) 
     # --- FIXED: subject column ensures titles appear on the student UI ---
@@ -77,8 +122,17 @@ class AcademicData(Base):
     cia2_marks = Column(Float, default=0.0)
     cia2_retest = Column(Float, default=0.0)
     subject_attendance = Column(Float, default=0.0)
+    end_sem_marks = Column(Float, nullable=True)   # NULL until the end-semester result is in
+    grade_points = Column(Integer, nullable=True)  # Derived by gpa.recompute_*; NULL = not graded yet
     innovative_assignment_marks = Column(Float, default=0.0) 
     status = Column(String, default="Pursuing") 
+    # Bumped on every marks write; clients send back the version they edited
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Attendance ledger: bit i refers to AttendanceSession.ordinal i of this course/section
+    attendance_marked = Column(LargeBinary)   # Sessions the student was on the roll for
+    attendance_present = Column(LargeBinary)  # Sessions the student attended
+    sessions_held = Column(Integer, nullable=False, default=0, server_default="0")
+    sessions_present = Column(Integer, nullable=False, default=0, server_default="0")
 
     student = relationship("Student", back_populates="academic_data")
     course = relationship("Course", back_populates="academic_data")
@@ -86,11 +140,114 @@ class AcademicData(Base):
 class Material(Base):
     __tablename__ = "materials"
     id = Column(Integer, primary_key=True, index=True)
-    course_id = Column(Integer, ForeignKey("courses.id"))
-    course_code = Column(String) 
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
+    course_code = Column(String, index=True)
     type = Column(String) 
     title = Column(String)
-    file_link = Column(String)
+    file_link = Column(StorageLink)   # Storage key for uploads, full URL for external links
     posted_by = Column(String) 
+    # Uploaded files only; filled at upload (or on first download for older rows)
+    size = Column(Integer, nullable=True)
+    etag = Column(String, nullable=True)          # Quoted, from the SHA-256 of the content
+    content_type = Column(String, nullable=True)
+
+    course = relationship("Course", back_populates="materials")
+
+class MarkAudit(Base):
+    # Append-only: one row per changed field. Kept by roll_no/course_code rather
+    # than academic_data.id so history outlives the marks row itself.
+    __tablename__ = "marks_audit"
+    __table_args__ = (Index("ix_marks_audit_student_course", "student_roll_no", "course_code", "id"),)
+    id = Column(Integer, primary_key=True)
+    student_roll_no = Column(String, nullable=False)
+    course_code = Column(String, nullable=False)
+    field = Column(Integer, nullable=False)       # audit.FIELD_CODES
+    old_value = Column(Float)
+    new_value = Column(Float)
+    editor = Column(String)                       # User.id, NULL when unauthenticated
+    changed_at = Column(Integer, nullable=False)  # Unix seconds
+
+class SemesterGPA(Base):
+    # Derived from AcademicData.grade_points by gpa.py; never edited directly
+    __tablename__ = "semester_gpa"
+    student_roll_no = Column(String, ForeignKey("students.roll_no"), primary_key=True)
+    semester = Column(Integer, primary_key=True)
+    sgpa = Column(Float, nullable=False)
+    credits = Column(Integer, nullable=False)
+
+class AttendanceSession(Base):
+    # One class meeting. Per-student presence lives in the AcademicData bitmaps.
+    __tablename__ = "attendance_sessions"
+    __table_args__ = (UniqueConstraint("course_code", "section", "date", "period", name="uq_attendance_session"),)
+    id = Column(Integer, primary_key=True)
+    course_code = Column(String, nullable=False)
+    section = Column(String, nullable=False)
+    date = Column(String, nullable=False)         # ISO yyyy-mm-dd
+    period = Column(Integer, nullable=False)
+    ordinal = Column(Integer, nullable=False)     # 0, 1, 2... within course/section
+    present_count = Column(Integer, default=0)
+    absent_count = Column(Integer, default=0)
+    taken_by = Column(String)
+
+class AtRiskFlag(Base):
+    # Rebuilt wholesale by at_risk.scan(); one row per (enrolment, rule) hit
+    __tablename__ = "at_risk_flags"
+    __table_args__ = (
+        Index("ix_at_risk_course_section", "course_code", "section", "rule"),
+        Index("ix_at_risk_rule", "rule"),
+    )
+    id = Column(Integer, primary_key=True)
+    student_roll_no = Column(String, nullable=False, index=True)
+    course_code = Column(String, nullable=False)
+    section = Column(String)
+    rule = Column(String, nullable=False)     # low_attendance | cia_fail | cia_decline
+    value = Column(Float)                     # The figure that tripped the rule
+    flagged_at = Column(Integer, nullable=False)
+
+class UploadSession(Base):
+    # A resumable upload in progress (see uploads.py); the bytes live in a .part file
+    __tablename__ = "upload_sessions"
+    id = Column(String, primary_key=True)
+    course_id = Column(Integer)
+    course_code = Column(String, nullable=False)
+    type = Column(String)
+    title = Column(String)
+    posted_by = Column(String)
+    filename = Column(String, nullable=False)
+    content_type = Column(String)
+    size = Column(Integer, nullable=False)
+    received = Column(Integer, nullable=False, default=0)   # Contiguous bytes written from offset 0
+    created_at = Column(Integer, nullable=False)
+    updated_at = Column(Integer, nullable=False, index=True)
+
+class MaterialPage(Base):
+    # Extracted text, one row per page/slide; searched through the material_pages_fts index below
+    __tablename__ = "material_pages"
+    id = Column(Integer, primary_key=True)
+    material_id = Column(Integer, nullable=False, index=True)
+    page = Column(Integer, nullable=False)
+    char_offset = Column(Integer, nullable=False)   # Where the page starts in the document's text
+    text = Column(Text, nullable=False)
+
+class MaterialIndexState(Base):
+    # One row per material the indexer has claimed; etag is the content it indexed
+    __tablename__ = "material_index"
+    material_id = Column(Integer, primary_key=True)
+    etag = Column(String)
+    status = Column(String, nullable=False)        # indexing | done | skipped | failed
+    capabilities = Column(String)                  # extract.capabilities() when it was skipped
+    error = Column(String)
+    updated_at = Column(Integer, nullable=False)
 
-    course = relationship("Course", back_populates="materials")
\ No newline at end of file
+# External-content FTS5 table: it stores only the index, the text stays in
+# material_pages, and triggers keep the two in step. Created whenever
+# material_pages is (create_all or a migration).
+for _ddl in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS material_pages_fts USING fts5("
+    "text, content='material_pages', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS material_pages_ai AFTER INSERT ON material_pages BEGIN "
+    "INSERT INTO material_pages_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS material_pages_ad AFTER DELETE ON material_pages BEGIN "
+    "INSERT INTO material_pages_fts(material_pages_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+):
+    event.listen(MaterialPage.__table__, "after_create", DDL(_ddl))
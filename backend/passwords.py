@@ -0,0 +1,53 @@
+import hmac
+import os
+from typing import Optional, Tuple
+
+import anyio
+import bcrypt
+
+# --- CONFIGURATION ---
+# bcrypt cost: each +1 doubles verification time (12 is ~0.2 s on one core).
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# Upper bound on concurrent hash computations, so a login storm queues here
+# instead of occupying every threadpool worker the rest of the API needs.
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+
+_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _encode(password: str) -> bytes:
+    # bcrypt only uses the first 72 bytes; newer releases raise instead of truncating
+    return password.encode("utf-8")[:72]
+
+
+def is_hashed(stored: Optional[str]) -> bool:
+    return bool(stored) and stored.startswith("$2")
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode("ascii")
+
+
+def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Checks a password against the stored value.
+
+    Returns (ok, replacement). replacement is a fresh hash to save when the
+    stored value is legacy plaintext or was hashed with a different cost.
+    """
+    if not stored:
+        return False, None
+    if not is_hashed(stored):
+        ok = hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+        return ok, hash_password(password) if ok else None
+    ok = bcrypt.checkpw(_encode(password), stored.encode("ascii"))
+    if ok and int(stored.split("$")[2]) != BCRYPT_ROUNDS:
+        return ok, hash_password(password)
+    return ok, None
+
+
+async def verify_password_async(password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """verify_password on a worker thread, at most HASH_WORKERS at a time."""
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(HASH_WORKERS)
+    return await anyio.to_thread.run_sync(verify_password, password, stored, limiter=_limiter)
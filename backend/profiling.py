@@ -0,0 +1,194 @@
+import contextvars
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from typing import Dict, Optional
+
+from fastapi.routing import APIRoute
+
+try:
+    from pyinstrument import Profiler as _PyinstrumentProfiler
+except ImportError:  # pyinstrument is optional, cProfile is always available
+    _PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# Requests carrying "X-Profile: <PROFILE_TOKEN>" are always profiled.
+# With no token configured the header is ignored entirely.
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+PROFILE_HEADER = b"x-profile"
+MAX_REPORTS = int(os.environ.get("PROFILE_MAX_REPORTS", "200"))
+
+# Route path template (e.g. "/marks/section") -> fraction of requests to profile.
+# Kept per process; set through the admin toggle endpoint.
+_route_rates: Dict[str, float] = {}
+
+_forced = contextvars.ContextVar("profile_forced", default=False)
+
+
+def set_route_rate(route: str, rate: float):
+    if rate <= 0:
+        _route_rates.pop(route, None)
+    else:
+        _route_rates[route] = min(rate, 1.0)
+
+
+def get_route_rates() -> Dict[str, float]:
+    return dict(_route_rates)
+
+
+def backend_name() -> str:
+    return "pyinstrument" if _PyinstrumentProfiler is not None else "cProfile"
+
+
+def _should_profile(route: str) -> bool:
+    if _forced.get():
+        return True
+    if not _route_rates:
+        return False
+    rate = _route_rates.get(route)
+    return rate is not None and random.random() < rate
+
+
+# --- PROFILER BACKENDS ---
+class _Session:
+    """One profiled endpoint call. Uses pyinstrument when installed, cProfile otherwise."""
+
+    def __init__(self, method: str, route: str, is_async: bool):
+        self.method = method
+        self.route = route
+        if _PyinstrumentProfiler is not None:
+            self.profiler = _PyinstrumentProfiler(async_mode="enabled" if is_async else "disabled")
+        else:
+            self.profiler = cProfile.Profile()
+        self.started = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+
+    def stop(self):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            body, ext = f"# {self.method} {self.route} {elapsed_ms:.1f} ms\n" + out.getvalue(), "txt"
+        else:
+            self.profiler.stop()
+            body, ext = self.profiler.output_html(), "html"
+        try:
+            _write_report(self.method, self.route, elapsed_ms, body, ext)
+        except OSError as e:
+            logger.error(f"Could not write profile report: {e}")
+
+
+def _write_report(method: str, route: str, elapsed_ms: float, body: str, ext: str):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    name = f"{int(time.time() * 1000)}_{method}_{slug}_{int(elapsed_ms)}ms.{ext}"
+    with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+        f.write(body)
+    _prune_reports()
+
+
+def _prune_reports():
+    entries = sorted(os.scandir(PROFILE_DIR), key=lambda e: e.name)
+    if len(entries) <= MAX_REPORTS:
+        return
+    for entry in entries[:-MAX_REPORTS]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def list_reports():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    reports = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file():
+            stat = entry.stat()
+            reports.append({"name": entry.name, "size": stat.st_size, "created": stat.st_mtime})
+    return sorted(reports, key=lambda r: r["name"], reverse=True)
+
+
+def report_path(name: str) -> Optional[str]:
+    # Names come from list_reports(); never allow walking out of PROFILE_DIR.
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+# --- ROUTE INSTRUMENTATION ---
+def _instrument(endpoint, method: str, route: str):
+    """Wraps an endpoint so a profiler runs around it only when this call is selected.
+
+    Sync endpoints execute in the threadpool, so the profiler has to start inside
+    the wrapped call (the request context is copied into the worker thread).
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            if not _should_profile(route):
+                return await endpoint(*args, **kwargs)
+            session = _Session(method, route, is_async=True)
+            session.start()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                session.stop()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        if not _should_profile(route):
+            return endpoint(*args, **kwargs)
+        session = _Session(method, route, is_async=False)
+        session.start()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            session.stop()
+    return sync_wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        methods = kwargs.get("methods") or ["GET"]
+        super().__init__(path, _instrument(endpoint, "_".join(sorted(methods)), path), **kwargs)
+
+
+class ProfileHeaderMiddleware:
+    """Marks the request for profiling when it carries the configured X-Profile token."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if PROFILE_TOKEN is None or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = PROFILE_TOKEN.encode()
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER and hmac.compare_digest(value, token):
+                reset = _forced.set(True)
+                try:
+                    return await self.app(scope, receive, send)
+                finally:
+                    _forced.reset(reset)
+        return await self.app(scope, receive, send)
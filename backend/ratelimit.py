@@ -0,0 +1,190 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from . import auth
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+# path -> (requests per second, burst). Applied per client IP and, when the
+# request carries a valid token, per user as well. Paths not listed use "*".
+# /login has no token: it is limited per submitted username instead, and per
+# IP only by the much looser LOGIN_IP_LIMIT, since a whole class behind one
+# campus NAT may log in at the same moment.
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "*": (20.0, 60.0),
+    "/login": (5 / 60, 10.0),          # Per username: 5 per minute after a burst of 10
+    "/token/refresh": (1.0, 10.0),
+    "/marks/sync": (10.0, 150.0),      # one save posts every student of a section at once
+    "/materials": (0.5, 5.0),
+}
+# RATE_LIMITS='{"/login": [0.2, 20]}' overrides or adds entries
+LIMITS = dict(DEFAULT_LIMITS, **{k: tuple(v) for k, v in json.loads(os.environ.get("RATE_LIMITS", "{}")).items()})
+LOGIN_IP_LIMIT = tuple(json.loads(os.environ.get("LOGIN_IP_LIMIT", "[5, 300]")))
+LOGIN_BODY_LIMIT = 4096
+# Load shedding: beyond these many concurrent requests (or concurrent writes,
+# since SQLite has a single writer) new requests get 503 instead of queueing.
+MAX_IN_FLIGHT = int(os.environ.get("MAX_IN_FLIGHT", "128"))
+MAX_WRITES_IN_FLIGHT = int(os.environ.get("MAX_WRITES_IN_FLIGHT", "16"))
+ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") != "0"
+# Only trust X-Real-IP / X-Forwarded-For when a proxy we control sets them
+TRUST_PROXY = os.environ.get("TRUST_PROXY", "0") == "1"
+EXEMPT_PREFIXES = ("/static",)
+# Resumable upload chunks stream for as long as the client's link takes and
+# don't touch the database, so they don't hold one of the write slots
+STREAMING_WRITE_PREFIXES = ("/materials/uploads/",)
+MAX_BUCKETS = 50000
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class TokenBuckets:
+    """Token buckets keyed by (route, client). Thread-safe, bounded in size."""
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self._buckets: Dict[tuple, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self.max_buckets = max_buckets
+
+    def take(self, key: tuple, rate: float, burst: float) -> float:
+        """Consumes one token. Returns 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+            return (1 - tokens) / rate if rate > 0 else 60.0
+
+    def _prune(self, now: float):
+        # Drop buckets idle long enough to have refilled; they carry no state
+        idle = [k for k, (_, last) in self._buckets.items() if now - last > 300]
+        for k in idle:
+            del self._buckets[k]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+buckets = TokenBuckets()
+
+
+def _client_ip(scope) -> str:
+    if TRUST_PROXY:
+        headers = dict(scope["headers"])
+        real_ip = headers.get(b"x-real-ip")
+        if real_ip:
+            return real_ip.decode("latin-1").strip()
+        forwarded = headers.get(b"x-forwarded-for")
+        if forwarded:
+            # The rightmost entry is the one our proxy appended; anything to
+            # its left came from the client and can be made up
+            return forwarded.decode("latin-1").split(",")[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _login_username(receive) -> Tuple[Optional[str], list]:
+    """Reads a small login body; returns the username and the messages read,
+    which are replayed to the app."""
+    messages, body = [], b""
+    while len(body) <= LOGIN_BODY_LIMIT:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            try:
+                username = json.loads(body).get("username")
+            except (ValueError, AttributeError):
+                break
+            return (username.strip() or None) if isinstance(username, str) else None, messages
+    return None, messages
+
+
+def _user_id(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                user = auth.decode_token(token)
+                return user.id if user else None
+    return None
+
+
+async def _reject(send, status: int, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """Per-route token buckets (429) and a global concurrency cap (503)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        self.writes_in_flight = 0
+        self.shed = 0
+        self._last_shed_log = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if not ENABLED or scope["type"] != "http" or scope["method"] == "OPTIONS" \
+                or scope["path"].startswith(EXEMPT_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        rate, burst = LIMITS.get(path) or LIMITS["*"]
+        route_key = path if path in LIMITS else "*"
+        if path == "/login" and scope["method"] == "POST":
+            wait = buckets.take((route_key, "ip", _client_ip(scope)), *LOGIN_IP_LIMIT)
+            user_id, messages = await _login_username(receive)
+            upstream = receive
+
+            async def receive():
+                return messages.pop(0) if messages else await upstream()
+        else:
+            wait = buckets.take((route_key, "ip", _client_ip(scope)), rate, burst)
+            user_id = None if wait else _user_id(scope)
+        if not wait and user_id:
+            wait = buckets.take((route_key, "user", user_id), rate, burst)
+        if wait:
+            return await _reject(send, 429, wait, "Too many requests")
+
+        is_write = scope["method"] in _WRITE_METHODS and not (
+            scope["method"] == "PUT" and path.startswith(STREAMING_WRITE_PREFIXES))
+        if self.in_flight >= MAX_IN_FLIGHT or (is_write and self.writes_in_flight >= MAX_WRITES_IN_FLIGHT):
+            self.shed += 1
+            now = time.monotonic()
+            if now - self._last_shed_log > 5:  # one line per burst, not per request
+                logger.warning(f"Shedding load: {self.in_flight} in flight, {self.writes_in_flight} writes, {self.shed} rejected so far")
+                self._last_shed_log = now
+            return await _reject(send, 503, 1, "Server is busy, retry shortly")
+
+        # Counters are only touched from the event loop thread, so no lock is needed
+        self.in_flight += 1
+        self.writes_in_flight += is_write
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self.writes_in_flight -= is_write
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from datetime import date, datetime
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
 
 # --- AUTH & LOGIN ---
 class Token(BaseModel):
@@ -7,6 +8,11 @@ class Token(BaseModel):
     token_type: str
     role: str
     user_id: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None     # Access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class LoginData(BaseModel):
     username: str
@@ -65,6 +71,13 @@ class CourseBase(BaseModel):
 class CourseCreate(CourseBase):
     pass
 
+class CourseUpdate(BaseModel):
+    title: Optional[str] = None
+    semester: Optional[int] = None
+    credits: Optional[int] = None
+    category: Optional[str] = None
+    faculty_id: Optional[str] = None
+
 class Course(CourseBase):
     id: int 
     class Config:
@@ -79,6 +92,27 @@ class MarkSyncRequest(BaseModel):
     cia2_marks: float
     cia2_retest: float
     subject_attendance: float
+    end_sem_marks: Optional[float] = None   # Left unchanged when omitted
+
+class MarkDelta(BaseModel):
+    roll_no: str
+    version: int                     # AcademicData.version the client last saw
+    fields: Dict[str, float]         # Only the changed fields, e.g. {"cia1_marks": 42}
+
+class MarkDeltaSyncRequest(BaseModel):
+    course_code: str
+    section: str = "A"
+    changes: List[MarkDelta]
+
+# --- ATTENDANCE SCHEMAS ---
+class AttendanceSessionRequest(BaseModel):
+    course_code: str
+    section: str = "A"
+    date: date
+    period: int = Field(1, ge=1, le=12)
+    default_present: bool = True     # Mark the whole section present (or absent)...
+    absent: List[str] = []           # ...except these roll numbers
+    present: List[str] = []
 
 # --- ANNOUNCEMENT & MATERIAL SCHEMAS ---
 class AnnouncementCreate(BaseModel):
@@ -88,9 +122,13 @@ class AnnouncementCreate(BaseModel):
     posted_by: str                   
     course_code: Optional[str] = "Global"
     section: Optional[str] = "All"   # Allows targeting specific sections (A, B, C)
+    pinned: bool = False             # Listed first, and exempt from the default expiry
+    expires_at: Optional[datetime] = None
 
 class Announcement(AnnouncementCreate):
     id: int
+    created_at: Optional[int] = None
+    expires_at: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -105,4 +143,17 @@ class MaterialCreate(BaseModel):
 class Material(MaterialCreate):
     id: int
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UploadSessionCreate(BaseModel):
+    course_id: Optional[int] = None
+    course_code: str
+    type: str
+    title: str
+    posted_by: str
+    filename: str
+    size: int = Field(..., gt=0)
+    content_type: Optional[str] = None
+
+class UploadFinalize(BaseModel):
+    sha256: Optional[str] = None     # Hex digest of the whole file, checked before the Material is created
@@ -1,36 +1,24 @@
-import json
-from sqlalchemy.orm import Session
-from backend.database import SessionLocal, engine
-from backend import models
+"""Database seeding.
+
+    python -m backend.seed                                    # demo dataset (default)
+    python -m backend.seed --preset college --students 20000 --courses 600 --seed 7
+    python -m backend.seed --preset college --reset           # wipe and regenerate
+
+The demo preset is the small hand-written department used in development.
+The college preset generates departments, sections, faculty, courses and
+marks at any scale with a deterministic RNG and batched Core inserts.
+"""
+import argparse
+import random
+import time
 from datetime import datetime
 
-# Ensure tables exist with the newest schema
-models.Base.metadata.create_all(bind=engine)
-
-db = SessionLocal()
-
-print("--- STARTING SEEDING PROCESS ---")
-
-# --- 1. ADMIN SEEDING ---
-admin = db.query(models.User).filter(models.User.id == "admin").first()
-if not admin:
-    # Create Login User
-    admin_user = models.User(id="admin", role="Admin", password="admin123")
-    db.add(admin_user)
-    
-    # Create Profile (Required for Admin Dashboard access in some checks)
-    admin_profile = models.Faculty(
-        staff_no="admin", 
-        name="System Admin", 
-        designation="Admin", 
-        doj="01.01.2024"
-    )
-    db.add(admin_profile)
-    
-    db.commit()
-    print("✅ Admin created")
+from sqlalchemy import insert, select, text
 
-# --- 2. FACULTY SEEDING ---
+from backend.database import SessionLocal, engine
+from backend import models, migrations, passwords, gpa
+
+# --- 1. DEMO DATASET ---
 faculty_data = [
   {"id": "HTS 1794", "name": "Dr. Sankar", "designation": "Professor", "doj": "20.01.2025"},
   {"id": "HTS 1856", "name": "Dr. S. Zulaikha Beevi", "designation": "Professor", "doj": "16.06.2025"},
@@ -57,59 +45,12 @@ faculty_data = [
   {"id": "HTS 1900", "name": "Ms. Pavithra M", "designation": "Assistant Professor", "doj": "08.09.2025"}
 ]
 
-def parse_date_to_password(date_str):
-    try:
-        if "." in date_str:
-            d = datetime.strptime(date_str, "%d.%m.%Y")
-            return d.strftime("%d%m%Y")
-        elif "-" in date_str:
-            d = datetime.strptime(date_str, "%d-%b-%Y")
-            return d.strftime("%d%m%Y")
-    except:
-        return "12345678"
-    return "12345678"
-
-for f in faculty_data:
-    if not db.query(models.User).filter(models.User.id == f["id"]).first():
-        password = parse_date_to_password(f["doj"])
-        role = "HOD" if "HOD" in f["designation"] else "Faculty"
-        
-        # 1. Create User (Login) - Password goes here
-        db.add(models.User(id=f["id"], role=role, password=password))
-        
-        # 2. Create Faculty Profile - NO password here
-        db.add(models.Faculty(
-            staff_no=f["id"], 
-            name=f["name"], 
-            designation=f["designation"], 
-            doj=f["doj"]
-        ))
-
-db.commit()
-print("✅ Faculty seeded")
-
-# --- 3. CURRICULUM (COURSES) ---
 curriculum_data = [
   {"sem": 5, "code": "CS3401", "title": "Artificial Intelligence", "credits": 3},
   {"sem": 5, "code": "MA3151", "title": "Matrices & Calculus", "credits": 4},
   {"sem": 5, "code": "21HI53IT", "title": "Web Technology", "credits": 4}
 ]
 
-for c in curriculum_data:
-    # Check if course exists for Section A (Default seed section)
-    if not db.query(models.Course).filter(models.Course.code == c["code"], models.Course.section == "A").first():
-        db.add(models.Course(
-            code=c["code"], 
-            title=c["title"], 
-            semester=c["sem"], 
-            credits=c["credits"],
-            section="A" # Explicitly seeding for Section A
-        ))
-
-db.commit()
-print("✅ Curriculum seeded")
-
-# --- 4. STUDENT SEEDING ---
 students_to_seed = [
     {"id": "21AD001", "name": "Original Student", "pass": "01012000", "cgpa": 8.5, "att": 85},
     {"id": "21AD002", "name": "Bhavani S", "pass": "pass002", "cgpa": 9.1, "att": 92},
@@ -123,50 +64,262 @@ students_to_seed = [
     {"id": "21AD010", "name": "Rahul T", "pass": "pass010", "cgpa": 7.2, "att": 78},
 ]
 
-# Fetch ACTUAL Course Objects from DB
-# This is crucial: we need the real ID and Title from the DB row we just created
-sem5_courses = db.query(models.Course).filter(models.Course.semester == 5, models.Course.section == "A").all()
-
-for s in students_to_seed:
-    # 1. Create Login User
-    if not db.query(models.User).filter(models.User.id == s["id"]).first():
-        db.add(models.User(id=s["id"], role="Student", password=s["pass"]))
-    
-    # 2. Create Student Profile
-    if not db.query(models.Student).filter(models.Student.roll_no == s["id"]).first():
-        db.add(models.Student(
-            roll_no=s["id"], 
-            name=s["name"], 
-            year=3, 
-            semester=5, 
-            section="A", 
-            cgpa=s["cgpa"], 
-            attendance_percentage=s["att"]
-        ))
-    
-    # 3. Create Academic Data (Link Student to Course Objects)
-    for course in sem5_courses:
-        existing_enrollment = db.query(models.AcademicData).filter(
-            models.AcademicData.student_roll_no == s["id"],
-            models.AcademicData.course_id == course.id
-        ).first()
-        
-        if not existing_enrollment:
-            db.add(models.AcademicData(
-                student_roll_no=s["id"], 
-                course_id=course.id,        # <--- Mandatory: Link to Course ID
-                course_code=course.code, 
-                subject=course.title,       # <--- Mandatory: Store Title for Frontend Filtering
-                section="A",
-                status="Pursuing",
-                cia1_marks=0.0,
-                cia1_retest=0.0,
-                cia2_marks=0.0,
-                cia2_retest=0.0,
-                subject_attendance=float(s["att"]), 
-                innovative_assignment_marks=0.0
-            ))
-
-db.commit()
-print("✅ Students & Academic Data seeded successfully!")
-db.close()
\ No newline at end of file
+def parse_date_to_password(date_str):
+    try:
+        if "." in date_str:
+            d = datetime.strptime(date_str, "%d.%m.%Y")
+            return d.strftime("%d%m%Y")
+        elif "-" in date_str:
+            d = datetime.strptime(date_str, "%d-%b-%Y")
+            return d.strftime("%d%m%Y")
+    except:
+        return "12345678"
+    return "12345678"
+
+def seed_demo():
+    """Idempotent: only rows that are missing are inserted, a handful of queries in total."""
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    print("--- STARTING SEEDING PROCESS ---")
+    try:
+        existing_users = set(db.scalars(select(models.User.id)))
+        existing_students = set(db.scalars(select(models.Student.roll_no)))
+
+        # --- ADMIN ---
+        if "admin" not in existing_users:
+            db.add(models.User(id="admin", role="Admin", password=passwords.hash_password("admin123")))
+            # Profile is required for Admin Dashboard access in some checks
+            db.add(models.Faculty(staff_no="admin", name="System Admin", designation="Admin", doj="01.01.2024"))
+            print("✅ Admin created")
+
+        # --- FACULTY ---
+        for f in faculty_data:
+            if f["id"] not in existing_users:
+                role = "HOD" if "HOD" in f["designation"] else "Faculty"
+                db.add(models.User(id=f["id"], role=role, password=passwords.hash_password(parse_date_to_password(f["doj"]))))
+                db.add(models.Faculty(staff_no=f["id"], name=f["name"], designation=f["designation"], doj=f["doj"]))
+        db.flush()
+        print("✅ Faculty seeded")
+
+        # --- CURRICULUM (Section A is the default seed section) ---
+        existing_codes = set(db.scalars(select(models.Course.code).where(models.Course.section == "A")))
+        for c in curriculum_data:
+            if c["code"] not in existing_codes:
+                db.add(models.Course(code=c["code"], title=c["title"], semester=c["sem"], credits=c["credits"], section="A"))
+        db.flush()
+        print("✅ Curriculum seeded")
+
+        # --- STUDENTS & ACADEMIC DATA ---
+        sem5_courses = db.query(models.Course).filter(models.Course.semester == 5, models.Course.section == "A").all()
+        enrolled = set(db.execute(select(models.AcademicData.student_roll_no, models.AcademicData.course_id)).all())
+        for s in students_to_seed:
+            if s["id"] not in existing_users:
+                db.add(models.User(id=s["id"], role="Student", password=passwords.hash_password(s["pass"])))
+            if s["id"] not in existing_students:
+                db.add(models.Student(
+                    roll_no=s["id"], name=s["name"], year=3, semester=5, section="A",
+                    cgpa=s["cgpa"], attendance_percentage=s["att"]
+                ))
+            for course in sem5_courses:
+                if (s["id"], course.id) not in enrolled:
+                    db.add(models.AcademicData(
+                        student_roll_no=s["id"], course_id=course.id, course_code=course.code,
+                        subject=course.title, section="A", status="Pursuing",
+                        cia1_marks=0.0, cia1_retest=0.0, cia2_marks=0.0, cia2_retest=0.0,
+                        subject_attendance=float(s["att"]), innovative_assignment_marks=0.0
+                    ))
+        db.commit()
+        print("✅ Students & Academic Data seeded successfully!")
+    finally:
+        db.close()
+
+# --- 2. SYNTHETIC COLLEGE DATASET ---
+DEPARTMENTS = [
+    ("AD", "Artificial Intelligence & Data Science"),
+    ("CS", "Computer Science & Engineering"),
+    ("IT", "Information Technology"),
+    ("EC", "Electronics & Communication Engineering"),
+    ("ME", "Mechanical Engineering"),
+]
+FIRST_NAMES = [
+    "Aarav", "Bhavani", "Deepak", "Divya", "Gokul", "Harini", "Ishwarya", "Karthik", "Kavya", "Lakshmi",
+    "Meena", "Naveen", "Nivetha", "Pradeep", "Priyanka", "Rahul", "Ranjani", "Sankar", "Sneha", "Vignesh",
+]
+INITIALS = "ABGJKMPRSTV"
+DESIGNATIONS = ["Professor", "Associate Professor", "Assistant Professor", "Assistant Professor", "Assistant Professor"]
+SUBJECTS = [
+    "Data Structures", "Operating Systems", "Machine Learning", "Computer Networks", "Database Systems",
+    "Deep Learning", "Probability & Statistics", "Compiler Design", "Cloud Computing", "Digital Logic",
+    "Signals & Systems", "Thermodynamics", "Software Engineering", "Computer Vision", "Discrete Mathematics",
+]
+
+# Login password of every generated user; the benchmark logs in with it.
+# One shared password means one bcrypt hash: hashing per user would take
+# hours at realistic cost settings.
+SYNTHETIC_PASSWORD = "college123"
+
+def _batched_insert(conn, table, rows, batch_size):
+    """Consumes a row generator, inserting executemany batches of batch_size."""
+    stmt = insert(table)
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.execute(stmt, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(stmt, batch)
+        total += len(batch)
+    return total
+
+def generate(engine, students=5000, courses=300, faculty=None, sections=5, announcements=500,
+             seed=42, batch_size=20000):
+    """Loads a synthetic college into an empty database and returns row counts.
+
+    Each section belongs to one department; every semester of a section gets an
+    even share of the courses. A student is enrolled in all courses of their
+    current and earlier semesters, with marks drawn around a per-student ability.
+    """
+    rng = random.Random(seed)
+    migrations.upgrade(engine)
+    sections = max(1, min(sections, 26))
+    faculty = faculty or max(10, courses // 4)
+    section_names = [chr(ord("A") + i) for i in range(sections)]
+    section_dept = {sec: DEPARTMENTS[i % len(DEPARTMENTS)][0] for i, sec in enumerate(section_names)}
+
+    staff_ids = [f"SYN {i:05d}" for i in range(faculty)]
+    faculty_rows = [{
+        "staff_no": sid, "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(INITIALS)}",
+        "designation": rng.choice(DESIGNATIONS), "doj": f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2010, 2025)}",
+        "profile_pic": None,
+    } for sid in staff_ids]
+
+    groups = [(sem, sec) for sem in range(1, 9) for sec in section_names]
+    course_rows, by_group = [], {g: [] for g in groups}
+    for i in range(courses):
+        sem, sec = groups[i % len(groups)]
+        row = {
+            "id": i + 1, "code": f"{section_dept[sec]}{sem}{i:04d}",
+            "title": f"{SUBJECTS[i % len(SUBJECTS)]} {sem}{sec}", "semester": sem,
+            "credits": rng.choice([2, 3, 3, 4]), "category": rng.choice(["Core", "Core", "Elective", "Lab"]),
+            "section": sec, "faculty_id": rng.choice(staff_ids),
+        }
+        course_rows.append(row)
+        by_group[(sem, sec)].append(row)
+
+    student_plan = []
+    for i in range(students):
+        sem, sec = rng.randint(1, 8), rng.choice(section_names)
+        roll = f"{26 - (sem + 1) // 2}{section_dept[sec]}{i:06d}"
+        student_plan.append((roll, sem, sec, rng.gauss(0.65, 0.15)))
+
+    shared_hash = passwords.hash_password(SYNTHETIC_PASSWORD)
+
+    def users():
+        for sid in staff_ids:
+            yield {"id": sid, "role": "Faculty", "password": shared_hash}
+        for roll, _, _, _ in student_plan:
+            yield {"id": roll, "role": "Student", "password": shared_hash}
+
+    def student_rows():
+        for roll, sem, sec, ability in student_plan:
+            yield {
+                "roll_no": roll, "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(INITIALS)}",
+                "year": (sem + 1) // 2, "semester": sem, "section": sec,
+                "cgpa": round(min(10.0, max(4.0, ability * 12)), 2),
+                "attendance_percentage": round(min(100.0, max(40.0, rng.gauss(82, 10))), 1),
+                "profile_pic": None,
+            }
+
+    # Gaussian noise drawn once; per-mark draws are a table lookup, which keeps
+    # generation from dominating multi-million row loads
+    noise = [rng.gauss(0, 0.12) for _ in range(4096)]
+    pick = rng.getrandbits
+
+    def mark(ability, out_of=50):
+        value = round((ability + noise[pick(12)]) * out_of)
+        return float(out_of if value > out_of else 0 if value < 0 else value)
+
+    def academic_rows():
+        for roll, sem, sec, ability in student_plan:
+            for past in range(1, sem + 1):
+                for c in by_group[(past, sec)]:
+                    cia1, cia2 = mark(ability), mark(ability)
+                    yield {
+                        "student_roll_no": roll, "course_id": c["id"], "course_code": c["code"],
+                        "subject": c["title"], "section": sec,
+                        "cia1_marks": cia1, "cia1_retest": mark(ability) if cia1 < 25 else 0.0,
+                        "cia2_marks": cia2, "cia2_retest": mark(ability) if cia2 < 25 else 0.0,
+                        "subject_attendance": float(min(100, 30 + mark(ability, 70))),
+                        "innovative_assignment_marks": mark(ability, 10),
+                        "status": "Pursuing" if past == sem else "Completed",
+                        "end_sem_marks": None if past == sem else mark(ability, 100),
+                    }
+
+    def announcement_rows():
+        for i in range(announcements):
+            yield {
+                "title": f"Notice {i}", "content": f"Circular {i} regarding examinations and schedules.",
+                "type": rng.choice(["Global", "Student", "Faculty", "Department"]), "course_code": "Global",
+                "section": rng.choice(["All"] + section_names), "posted_by": rng.choice(staff_ids),
+            }
+
+    counts = {}
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # Bulk load: skip fsyncs, the whole load is one transaction anyway
+            conn.execute(text("PRAGMA synchronous=OFF"))
+        counts["users"] = _batched_insert(conn, models.User.__table__, users(), batch_size)
+        counts["faculty"] = _batched_insert(conn, models.Faculty.__table__, faculty_rows, batch_size)
+        counts["courses"] = _batched_insert(conn, models.Course.__table__, course_rows, batch_size)
+        counts["students"] = _batched_insert(conn, models.Student.__table__, student_rows(), batch_size)
+        counts["academic_data"] = _batched_insert(conn, models.AcademicData.__table__, academic_rows(), batch_size)
+        counts["announcements"] = _batched_insert(conn, models.Announcement.__table__, announcement_rows(), batch_size)
+        # Completed courses carry end-semester marks, so CGPA comes from them
+        gpa.recompute_all(conn)
+    return counts
+
+def reset_database():
+    models.Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {migrations.VERSION_TABLE}"))
+    migrations.upgrade(engine)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the college database")
+    parser.add_argument("--preset", choices=["demo", "college"], default="demo")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=300)
+    parser.add_argument("--faculty", type=int, default=None, help="Defaults to courses / 4")
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--announcements", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed; same seed gives the same data")
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    args = parser.parse_args(argv)
+
+    if args.reset:
+        reset_database()
+    if args.preset == "demo":
+        seed_demo()
+        return
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        has_data = db.query(models.User.id).first() is not None
+    finally:
+        db.close()
+    if has_data:
+        raise SystemExit("Database is not empty; use --reset to regenerate the college preset")
+    started = time.perf_counter()
+    counts = generate(
+        engine, students=args.students, courses=args.courses, faculty=args.faculty,
+        sections=args.sections, announcements=args.announcements, seed=args.seed,
+        batch_size=args.batch_size,
+    )
+    print(f"✅ Generated {counts} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
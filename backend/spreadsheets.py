@@ -0,0 +1,209 @@
+import csv
+import io
+import posixpath
+import re
+import zipfile
+from typing import Iterable, Iterator, List, Sequence
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from .streaming import StreamBuffer
+
+CHUNK_ROWS = 500
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# --- CSV ---
+_FORMULA_START = ("=", "+", "-", "@", "\t", "\r")
+
+def _csv_value(value):
+    # Excel runs text starting with these as a formula; the quote makes it plain text
+    if isinstance(value, str) and value.startswith(_FORMULA_START):
+        return "'" + value
+    return value
+
+def csv_stream(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """Yields UTF-8 CSV (with BOM so Excel detects the encoding) in chunks of CHUNK_ROWS rows."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    out.write("\ufeff")
+    writer.writerow([_csv_value(v) for v in header])
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(v) for v in row])
+        if i % CHUNK_ROWS == 0:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue().encode("utf-8")
+
+# --- XLSX ---
+# Minimal single-sheet workbook. Strings are written inline (no shared string
+# table), so each row can be emitted as soon as it is read.
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Characters Excel does not allow in sheet names
+_SHEET_UNSAFE = re.compile(r"[\[\]:*?/\\]")
+
+def _workbook_xml(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(_SHEET_UNSAFE.sub("_", sheet_name)[:31] or "Sheet1")}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+def _cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value}</v></c>"
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+def _row(values) -> str:
+    return "<row>" + "".join(_cell(v) for v in values) + "</row>"
+
+def xlsx_stream(header: Sequence[str], rows: Iterable[Sequence], sheet_name: str = "Sheet1") -> Iterator[bytes]:
+    """Yields an .xlsx file as it is written; memory use does not grow with row count."""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_STATIC.items():
+            zf.writestr(name, xml)
+        zf.writestr("xl/workbook.xml", _workbook_xml(sheet_name))
+        yield buffer.drain()
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_row(header).encode("utf-8"))
+            for i, row in enumerate(rows, 1):
+                sheet.write(_row(row).encode("utf-8"))
+                if i % CHUNK_ROWS == 0:
+                    chunk = buffer.drain()
+                    if chunk:
+                        yield chunk
+            sheet.write(b"</sheetData></worksheet>")
+    yield buffer.drain()
+
+def stream(fmt: str, header: Sequence[str], rows: Iterable[Sequence], sheet_name: str = "Sheet1") -> Iterator[bytes]:
+    if fmt == "xlsx":
+        return xlsx_stream(header, rows, sheet_name)
+    return csv_stream(header, rows)
+
+# --- READING ---
+_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# Decompressed size allowed per workbook part; a few KB of zip can inflate to gigabytes
+MAX_PART_BYTES = 50 * 1024 * 1024
+
+class SpreadsheetError(ValueError):
+    pass
+
+class _LimitedReader:
+    def __init__(self, src, limit: int):
+        self.src = src
+        self.left = limit
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.src.read(self.left + 1 if n is None or n < 0 else min(n, self.left + 1))
+        self.left -= len(data)
+        if self.left < 0:
+            raise SpreadsheetError("Spreadsheet is too large once decompressed")
+        return data
+
+def _read_part(zf: zipfile.ZipFile, name: str) -> bytes:
+    with zf.open(name) as src:
+        return _LimitedReader(src, MAX_PART_BYTES).read()
+
+def _column_index(ref: str) -> int:
+    letters = re.match(r"[A-Z]+", ref).group(0)
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - 64)
+    if index > 16384:   # Past column XFD, Excel's last
+        raise SpreadsheetError(f"Cell reference out of range: {ref}")
+    return index - 1
+
+def _first_sheet_path(zf: zipfile.ZipFile) -> str:
+    workbook = ElementTree.fromstring(_read_part(zf, "xl/workbook.xml"))
+    sheet = workbook.find("m:sheets/m:sheet", _NS)
+    if sheet is None:
+        raise SpreadsheetError("Workbook has no worksheet")
+    rels = ElementTree.fromstring(_read_part(zf, "xl/_rels/workbook.xml.rels"))
+    for rel in rels:
+        if rel.get("Id") == sheet.get(_REL_NS):
+            target = rel.get("Target")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    raise SpreadsheetError("Workbook has no worksheet")
+
+def _read_xlsx(data: bytes) -> List[List[str]]:
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        shared = []
+        if "xl/sharedStrings.xml" in zf.namelist():
+            for si in ElementTree.fromstring(_read_part(zf, "xl/sharedStrings.xml")).findall("m:si", _NS):
+                shared.append("".join(t.text or "" for t in si.iter(f"{{{_NS['m']}}}t")))
+        rows = []
+        with zf.open(_first_sheet_path(zf)) as sheet:
+            for _, row in ElementTree.iterparse(_LimitedReader(sheet, MAX_PART_BYTES)):
+                if row.tag != f"{{{_NS['m']}}}row":
+                    continue
+                values = {}
+                for position, cell in enumerate(row.findall("m:c", _NS)):
+                    kind, ref = cell.get("t"), cell.get("r")
+                    if kind == "inlineStr":
+                        value = "".join(t.text or "" for t in cell.iter(f"{{{_NS['m']}}}t"))
+                    else:
+                        v = cell.find("m:v", _NS)
+                        value = v.text if v is not None else ""
+                        if kind == "s" and value:
+                            value = shared[int(value)]
+                    values[_column_index(ref) if ref else position] = value or ""
+                row.clear()
+                rows.append([values.get(i, "") for i in range(max(values) + 1)] if values else [])
+        return rows
+
+def read_rows(filename: str, data: bytes) -> List[List[str]]:
+    """Rows of the first sheet of an .xlsx file, or of a CSV file, as lists of strings."""
+    if (filename or "").lower().endswith(".xlsx") or data[:2] == b"PK":
+        try:
+            return _read_xlsx(data)
+        except SpreadsheetError:
+            raise
+        # Malformed parts surface as whatever the parser trips over first
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError, AttributeError, IndexError,
+                ValueError, TypeError) as e:
+            raise SpreadsheetError(f"Could not read spreadsheet: {e}")
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = data.decode("latin-1")
+    return [row for row in csv.reader(io.StringIO(text))]
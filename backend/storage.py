@@ -0,0 +1,246 @@
+"""Where uploaded files live and how clients reach them.
+
+The database stores relative keys (e.g. ``CS101_1718000000_notes.pdf``) in
+Material.file_link and the profile_pic columns; links to other sites (YouTube
+etc.) are stored as entered. Public URLs are built from configuration each
+time a row is loaded (see models.StorageLink), so moving behind a proxy or a
+CDN is a config change rather than a data migration:
+
+    PUBLIC_BASE_URL   where this API is reachable       (default http://localhost:8000)
+    MEDIA_BASE_URL    prefix of public file URLs        (default PUBLIC_BASE_URL + /static/)
+    STORAGE_BACKEND   local | s3                         (default local)
+    DOWNLOAD_MODE     app | redirect | offload          (default app)
+
+With DOWNLOAD_MODE=redirect, /materials/{id}/download answers with a redirect
+to MEDIA_BASE_URL (a CDN or offload server) instead of streaming the file.
+
+With DOWNLOAD_MODE=offload, downloads and /static are still checked by the
+app, but the bytes are sent by the front proxy: a request carrying the
+proxy's X-Sendfile-Type header gets an empty response with X-Accel-Redirect
+(nginx) or X-Sendfile (Apache, lighttpd). Requests without it, e.g. straight
+to uvicorn, are served from Python as before. See deploy/nginx.conf.
+"""
+import contextlib
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import BinaryIO, Iterator, Optional, Tuple
+from urllib.parse import quote, unquote
+
+# --- CONFIGURATION ---
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploaded_files")
+COPY_CHUNK = 1024 * 1024
+STATIC_PREFIX = "/static/"
+PUBLIC_BASE_URL = os.environ.get("PUBLIC_BASE_URL", "http://localhost:8000").rstrip("/")
+MEDIA_BASE_URL = os.environ.get("MEDIA_BASE_URL") or PUBLIC_BASE_URL + STATIC_PREFIX
+if not MEDIA_BASE_URL.endswith("/"):
+    MEDIA_BASE_URL += "/"
+DOWNLOAD_MODE = os.environ.get("DOWNLOAD_MODE", "app")
+# nginx `internal` location that aliases UPLOAD_DIR
+X_ACCEL_PREFIX = os.environ.get("X_ACCEL_PREFIX", "/protected-uploads/")
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+# Absolute links written before keys were stored (migration 13 rewrites the same ones)
+LEGACY_PREFIXES = ("http://localhost:8000/static/",)
+
+
+class _HashingReader:
+    """Wraps a file object and hashes whatever is read through it."""
+
+    def __init__(self, src: BinaryIO):
+        self.src = src
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.src.read(n)
+        self.digest.update(data)
+        self.size += len(data)
+        return data
+
+
+# --- BACKENDS ---
+class LocalStorage:
+    """Files under UPLOAD_DIR, served by the /static mount (or a proxy in front of it)."""
+
+    local = True
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        # basename: keys never contain directories, so "../" cannot escape the root
+        return os.path.join(self.root, os.path.basename(key))
+
+    def save_stream(self, src: BinaryIO, key: str) -> Tuple[int, str]:
+        """Copies an upload into place, hashing it on the way. Returns (size, sha256 hex)."""
+        reader = _HashingReader(src)
+        with open(self.path(key), "wb") as out:
+            shutil.copyfileobj(reader, out, COPY_CHUNK)
+        return reader.size, reader.digest.hexdigest()
+
+    def save_file(self, local_path: str, key: str):
+        """Moves a finished file (e.g. an assembled chunked upload) into place."""
+        os.replace(local_path, self.path(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+class S3Storage:
+    """An S3-compatible bucket (AWS, or MinIO as a local stand-in). Needs boto3.
+
+    Files are not on this machine, so /static/{key} redirects to a short-lived
+    presigned URL unless MEDIA_BASE_URL points at a public bucket or CDN.
+    """
+
+    local = False
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        import boto3   # Optional dependency, only needed for this backend
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _name(self, key: str) -> str:
+        return self.prefix + os.path.basename(key)
+
+    def path(self, key: str) -> None:
+        return None
+
+    def save_stream(self, src: BinaryIO, key: str) -> Tuple[int, str]:
+        reader = _HashingReader(src)
+        self.client.upload_fileobj(reader, self.bucket, self._name(key))
+        return reader.size, reader.digest.hexdigest()
+
+    def save_file(self, local_path: str, key: str):
+        self.client.upload_file(local_path, self.bucket, self._name(key))
+        os.remove(local_path)
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._name(key))["Body"]
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self._name(key))
+        return True
+
+    def presigned_url(self, key: str, expires: int = 3600) -> str:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._name(key)}, ExpiresIn=expires)
+
+
+def _make_backend():
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(os.environ["S3_BUCKET"], os.environ.get("S3_PREFIX", ""),
+                         os.environ.get("S3_ENDPOINT_URL"))
+    return LocalStorage(UPLOAD_DIR)
+
+
+backend = _make_backend()
+
+
+# --- KEYS & URLS ---
+def new_key(owner: str, filename: str) -> str:
+    # Microsecond stamp: two uploads of the same file name in one second must not collide
+    return f"{owner}_{time.time_ns() // 1000}_{os.path.basename(filename)}"
+
+
+# "<owner>_<timestamp>_<file name>", as made by new_key (and, with a seconds
+# stamp, by uploads before it); never contains a directory separator
+_KEY = re.compile(r"[^/\\]+_\d{10,}_[^/\\]+")
+
+
+def is_key(value: Optional[str]) -> bool:
+    return bool(value) and _KEY.fullmatch(value) is not None
+
+
+def key_for(link: Optional[str]) -> Optional[str]:
+    """Storage key behind a stored value or a URL we built, or None for external links."""
+    if not link:
+        return None
+    if is_key(link):
+        return link
+    for prefix in (MEDIA_BASE_URL,) + LEGACY_PREFIXES:
+        if link.startswith(prefix):
+            key = unquote(link[len(prefix):])
+            return key if is_key(key) else None
+    # Anything else, e.g. "youtube.com/watch?v=..." typed without a scheme, is an external link
+    return None
+
+
+def url_for(link: Optional[str]) -> Optional[str]:
+    """Public URL of a stored value; external links pass through unchanged."""
+    return MEDIA_BASE_URL + quote(link) if is_key(link) else link
+
+
+def path_for(key: str) -> Optional[str]:
+    """Local path of a key, or None when the backend is remote."""
+    return backend.path(key)
+
+
+@contextlib.contextmanager
+def local_copy(key: str) -> Iterator[str]:
+    """A path to the file's bytes on this machine, downloading it first if needed."""
+    path = backend.path(key)
+    if path is not None:
+        yield path
+        return
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+    try:
+        with os.fdopen(fd, "wb") as out, contextlib.closing(backend.open(key)) as src:
+            shutil.copyfileobj(src, out, COPY_CHUNK)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def offload_headers(key: str, sendfile_type: Optional[str]) -> Optional[dict]:
+    """Headers that hand the file to the front proxy, or None to serve it from Python.
+
+    sendfile_type is the request's X-Sendfile-Type header, which only the
+    proxy sets (it must overwrite any value sent by clients).
+    """
+    if DOWNLOAD_MODE != "offload" or not sendfile_type or not backend.local:
+        return None
+    if sendfile_type.lower() == "x-accel-redirect":
+        return {"X-Accel-Redirect": X_ACCEL_PREFIX + quote(os.path.basename(key))}
+    if sendfile_type.lower() == "x-sendfile":
+        path = os.path.abspath(backend.path(key))
+        # The path goes out as-is; a name headers cannot carry is served from Python
+        return {"X-Sendfile": path} if path.isascii() else None
+    return None
+
+
+def hash_stream(src: BinaryIO) -> Tuple[int, str]:
+    digest, size = hashlib.sha256(), 0
+    while True:
+        chunk = src.read(COPY_CHUNK)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def hash_file(path: str) -> Tuple[int, str]:
+    with open(path, "rb") as f:
+        return hash_stream(f)
+
+
+def hash_key(key: str) -> Tuple[int, str]:
+    with contextlib.closing(backend.open(key)) as f:
+        return hash_stream(f)
+
+
+def etag_for(sha256_hex: str) -> str:
+    # Strong validator: the same bytes always get the same tag, whichever worker serves them
+    return f'"{sha256_hex[:32]}"'
@@ -0,0 +1,190 @@
+"""Removes uploaded files nothing refers to, and reports disk use.
+
+One os.scandir pass over UPLOAD_DIR is matched against a single query that
+collects every stored reference (material files and profile photos), which
+also attributes each file's bytes to its course or user. Partial chunked
+uploads without a live session are cleaned up the same way.
+
+Files younger than GC_GRACE_SECONDS are never touched: an upload is written
+before its row is committed. Orphans are moved to QUARANTINE_DIR (or deleted
+with GC_MODE=delete) in batches, each re-checked against the database just
+before it is moved, and quarantined files are deleted after QUARANTINE_DAYS.
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from . import background, storage, uploads
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+INTERVAL = float(os.environ.get("STORAGE_GC_INTERVAL", "86400"))   # 0 disables the scheduled job
+GRACE_SECONDS = float(os.environ.get("GC_GRACE_SECONDS", "3600"))
+MODE = os.environ.get("GC_MODE", "quarantine")                      # quarantine | delete
+QUARANTINE_DIR = os.environ.get("GC_QUARANTINE_DIR", storage.UPLOAD_DIR.rstrip("/\\") + "_quarantine")
+QUARANTINE_DAYS = float(os.environ.get("GC_QUARANTINE_DAYS", "30"))
+BATCH_SIZE = 500
+
+last_run: Dict[str, object] = {}
+
+_REFERENCES = text(
+    "SELECT file_link, 'course', course_code FROM materials WHERE file_link IS NOT NULL "
+    "UNION ALL SELECT profile_pic, 'user', roll_no FROM students WHERE profile_pic IS NOT NULL "
+    "UNION ALL SELECT profile_pic, 'user', staff_no FROM faculty WHERE profile_pic IS NOT NULL"
+)
+
+
+def _references(db) -> Dict[str, Tuple[str, str]]:
+    """Every stored key -> (owner kind, owner id)."""
+    owners = {}
+    for link, kind, owner in db.execute(_REFERENCES):
+        key = storage.key_for(link)
+        if key:
+            owners[key] = (kind, owner)
+    return owners
+
+
+def _still_referenced(db, keys: List[str]) -> set:
+    params = {f"k{n}": k for n, k in enumerate(keys)}
+    in_list = ", ".join(f":{p}" for p in params)
+    return {r for (r,) in db.execute(text(
+        f"SELECT file_link FROM materials WHERE file_link IN ({in_list}) "
+        f"UNION SELECT profile_pic FROM students WHERE profile_pic IN ({in_list}) "
+        f"UNION SELECT profile_pic FROM faculty WHERE profile_pic IN ({in_list})"
+    ), params)}
+
+
+def _files(directory: str):
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry
+    except FileNotFoundError:
+        return
+
+
+def scan(db, now: Optional[float] = None) -> Tuple[dict, List[Tuple[str, int]]]:
+    """Usage report plus the orphans old enough to collect, as (name, bytes)."""
+    now = now or time.time()
+    owners = _references(db)
+    usage = {"course": defaultdict(lambda: [0, 0]), "user": defaultdict(lambda: [0, 0])}
+    total = [0, 0]
+    orphans, young, seen = [], [0, 0], set()
+    for entry in _files(storage.UPLOAD_DIR):
+        seen.add(entry.name)
+        st = entry.stat(follow_symlinks=False)
+        total[0] += 1
+        total[1] += st.st_size
+        owner = owners.get(entry.name)
+        if owner:
+            bucket = usage[owner[0]][owner[1]]
+            bucket[0] += 1
+            bucket[1] += st.st_size
+        elif st.st_mtime < now - GRACE_SECONDS:
+            orphans.append((entry.name, st.st_size))
+        else:
+            young[0] += 1
+            young[1] += st.st_size
+
+    def rows(counts):
+        return sorted(({"owner": k, "files": v[0], "bytes": v[1]} for k, v in counts.items()),
+                      key=lambda r: -r["bytes"])
+
+    report = {
+        "scanned_at": int(now),
+        "files": total[0], "bytes": total[1],
+        "courses": rows(usage["course"]),
+        "users": rows(usage["user"]),
+        "orphans": {"files": len(orphans), "bytes": sum(size for _, size in orphans)},
+        "recent_unreferenced": {"files": young[0], "bytes": young[1]},
+        "missing": len(owners.keys() - seen),   # Referenced but not on disk
+    }
+    return report, orphans
+
+
+def _dispose(name: str):
+    path = storage.path_for(name)
+    if MODE == "delete":
+        os.remove(path)
+    else:
+        os.makedirs(QUARANTINE_DIR, exist_ok=True)
+        os.replace(path, os.path.join(QUARANTINE_DIR, name))
+        # mtime marks when it was quarantined, for the purge below
+        os.utime(os.path.join(QUARANTINE_DIR, name))
+
+
+def _purge(directory: str, older_than: float, keep=frozenset()) -> Tuple[int, int]:
+    removed, freed = 0, 0
+    for entry in _files(directory):
+        st = entry.stat(follow_symlinks=False)
+        if st.st_mtime < older_than and entry.name not in keep:
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.warning(f"Could not remove {entry.path}: {e}")
+                continue
+            removed += 1
+            freed += st.st_size
+    return removed, freed
+
+
+def collect(db, dry_run: bool = False, now: Optional[float] = None) -> dict:
+    """Scans, then quarantines or deletes orphans in batches. Returns the report."""
+    now = now or time.time()
+    report, orphans = scan(db, now)
+    collected, freed, errors = 0, 0, 0
+    if not dry_run:
+        for start in range(0, len(orphans), BATCH_SIZE):
+            batch = orphans[start:start + BATCH_SIZE]
+            # A row may have been written since the scan; never touch what is referenced now
+            live = _still_referenced(db, [name for name, _ in batch])
+            for name, size in batch:
+                if name in live:
+                    continue
+                try:
+                    _dispose(name)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    errors += 1
+                    logger.warning(f"Could not collect orphaned upload {name}: {e}")
+                    continue
+                collected += 1
+                freed += size
+        # Expired quarantine, and chunked-upload parts whose session is gone
+        purged = _purge(QUARANTINE_DIR, now - QUARANTINE_DAYS * 86400)
+        sessions = {f"{r}.part" for (r,) in db.execute(text("SELECT id FROM upload_sessions"))}
+        parts = _purge(uploads.PARTIAL_DIR, now - GRACE_SECONDS, keep=sessions)
+        report.update({"quarantine_purged": purged[0], "partial_removed": parts[0],
+                       "bytes_freed": freed + purged[1] + parts[1]})
+    report.update({"mode": "dry-run" if dry_run else MODE, "collected": collected, "errors": errors})
+    return report
+
+
+def run(dry_run: bool = False) -> dict:
+    """Entry point for the scheduler and the admin trigger; owns its session."""
+    if not storage.backend.local:
+        return {"skipped": "storage backend is not local"}
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        report = collect(db, dry_run)
+    finally:
+        db.close()
+    if not dry_run:
+        last_run.clear()
+        last_run.update(report)
+    logger.info(f"Storage GC: {report['files']} files, {report['bytes']} bytes, collected {report['collected']} "
+                f"orphans in {time.perf_counter() - started:.2f}s")
+    return report
+
+
+if INTERVAL > 0:
+    background.register(background.PeriodicTask("storage-gc", run, INTERVAL))
@@ -0,0 +1,28 @@
+import io
+
+
+class StreamBuffer(io.RawIOBase):
+    """Write-only sink that hands written bytes back to a generator.
+
+    Writers such as zipfile.ZipFile write into it; the generator calls drain()
+    after each step and yields the result, so output leaves the process as it is
+    produced instead of being assembled in memory or a temp file. It has no
+    seek/tell, which makes zipfile fall back to streaming mode (data descriptors).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
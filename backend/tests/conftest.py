@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+import pytest
+
+# Must be set before any backend module is imported: they read their
+# configuration, and database.py builds its engine, at import time
+_scratch = tempfile.mkdtemp(prefix="college_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_scratch, "uploaded_files")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+# No scheduled jobs: each test drives what it needs
+for name in ("AT_RISK_INTERVAL", "ARCHIVE_SWEEP_INTERVAL", "UPLOAD_SESSION_TTL",
+             "MATERIAL_INDEX_INTERVAL", "STORAGE_GC_INTERVAL"):
+    os.environ[name] = "0"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from backend import seed
+    from backend.main import create_app
+
+    seed.seed_demo()
+    with TestClient(create_app()) as c:
+        yield c
+
+
+def login(client, username, password):
+    r = client.post("/login", json={"username": username, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
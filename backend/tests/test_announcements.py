@@ -0,0 +1,51 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend import archival, feeds
+from backend.database import SessionLocal
+
+STUDENT = "21AD003"
+DAY = 86400
+
+
+def _post(client, title, **extra):
+    return client.post("/announcements", json=dict({
+        "title": title, "content": "-", "type": "Student", "course_code": "CS3401", "section": "A",
+        "posted_by": "HTS 1794"}, **extra)).json()
+
+
+def _sweep(now):
+    db = SessionLocal()
+    try:
+        return archival.sweep(db, now=now, batch_size=2)
+    finally:
+        db.close()
+        feeds.announcements.reset()
+
+
+def _feed(client):
+    return [a["title"] for a in client.get("/announcements", params={"student_id": STUDENT}).json()]
+
+
+def test_expiry_pinning_and_archive(client):
+    soon = datetime.now(timezone.utc) + timedelta(hours=1)
+    default = _post(client, "Default expiry")
+    pinned = _post(client, "Pinned", pinned=True)
+    short = _post(client, "Short", expires_at=soon.isoformat())
+    assert default["expires_at"] == default["created_at"] + int(archival.ANNOUNCEMENT_TTL_DAYS * DAY)
+    assert pinned["expires_at"] is None and short["expires_at"] == int(soon.timestamp())
+    assert _feed(client)[0] == "Pinned"
+    assert {"Default expiry", "Short"} <= set(_feed(client))
+
+    now = int(time.time())
+    assert _sweep(now + 2 * 3600) >= 1
+    assert "Short" not in _feed(client) and "Default expiry" in _feed(client)
+    assert [a["id"] for a in client.get("/announcements/archive", params={"course_code": "CS3401"}).json()][0] == short["id"]
+
+    # Moved in several batches; pinned notices never expire
+    _sweep(now + 100 * DAY)
+    assert "Default expiry" not in _feed(client) and _feed(client)[0] == "Pinned"
+    archived = client.get("/announcements/archive", params={"course_code": "CS3401", "limit": 2}).json()
+    assert [a["id"] for a in archived] == [short["id"], default["id"]]
+    assert client.get("/announcements/archive", params={"before_id": default["id"], "course_code": "CS3401"}).json() == []
+    assert _sweep(now + 100 * DAY) == 0
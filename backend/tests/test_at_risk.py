@@ -0,0 +1,55 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import at_risk, models
+
+from .conftest import login
+
+
+def _row(roll, course, **marks):
+    return models.AcademicData(student_roll_no=roll, course_code=course, section="A",
+                               status=marks.pop("status", "Pursuing"), **marks)
+
+
+def test_rules(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'risk.db'}")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        _row("S1", "CS1", subject_attendance=60, sessions_held=10, cia1_marks=20, cia1_retest=30, cia2_marks=10),
+        _row("S2", "CS1", subject_attendance=0, sessions_held=0, cia1_marks=40, cia2_marks=40),
+        _row("S3", "CS1", subject_attendance=10, cia1_marks=0, cia2_marks=0, status="Completed"),
+        # CIA 2 not held in CS2 yet: a 0 there is not a fail or a decline
+        _row("S1", "CS2", subject_attendance=90, cia1_marks=45, cia2_marks=None),
+        _row("S2", "CS2", subject_attendance=74.9, cia1_marks=20),
+    ])
+    db.commit()
+
+    assert at_risk.scan(db) == {"low_attendance": 2, "cia_fail": 2, "cia_decline": 1}
+    db.commit()
+    flags = {(f.student_roll_no, f.course_code, f.rule): f.value for f in db.query(models.AtRiskFlag)}
+    assert flags == {
+        ("S1", "CS1", "low_attendance"): 60, ("S1", "CS1", "cia_fail"): 10, ("S1", "CS1", "cia_decline"): 10,
+        ("S2", "CS2", "low_attendance"): 74.9, ("S2", "CS2", "cia_fail"): 20,
+    }
+
+    # A rescan replaces the previous report
+    db.query(models.AcademicData).filter(models.AcademicData.student_roll_no == "S2").delete()
+    db.commit()
+    assert at_risk.scan(db) == {"low_attendance": 1, "cia_fail": 1, "cia_decline": 1}
+    db.commit()
+    assert db.query(models.AtRiskFlag).count() == 3
+    db.close()
+    engine.dispose()
+
+
+def test_report_endpoint(client):
+    headers = {"Authorization": f"Bearer {login(client, 'admin', 'admin123')}"}
+    counts = client.post("/admin/at-risk/run", headers=headers).json()["flags"]
+    report = client.get("/admin/at-risk", headers=headers).json()
+    assert report["last_run"]["flags"] == counts
+    for rule, count in counts.items():
+        flags = client.get("/admin/at-risk", params={"rule": rule}, headers=headers).json()["flags"]
+        assert len(flags) == count and {f["rule"] for f in flags} <= {rule}
+    student = login(client, "21AD002", "pass002")
+    assert client.get("/admin/at-risk", headers={"Authorization": f"Bearer {student}"}).status_code == 403
@@ -0,0 +1,45 @@
+from backend import attendance
+
+from .conftest import login
+
+
+def test_bitmaps():
+    bits = attendance.set_bit(None, 9, True)
+    assert len(bits) == 2 and attendance.get_bit(bits, 9) and not attendance.get_bit(bits, 8)
+    bits = attendance.set_bit(attendance.set_bit(bits, 0, True), 9, False)
+    assert attendance.popcount(bits) == 1 and not attendance.get_bit(bits, 64)
+    assert attendance.percentage(2, 3) == 66.67 and attendance.percentage(0, 0) == 0.0
+
+
+def _record(client, token, day, period=1, **extra):
+    return client.post("/attendance/sessions", json=dict(
+        {"course_code": "21HI53IT", "section": "A", "date": day, "period": period}, **extra),
+        headers={"Authorization": f"Bearer {token}"})
+
+
+def test_sessions_update_percentages_and_audit(client):
+    token = login(client, "HTS 1794", "20012025")
+    assert _record(client, token, "2026-01-05", absent=["21AD001"]).json()["absent"] == 1
+    assert _record(client, token, "2026-01-05", period=2).json()["ordinal"] == 1
+    result = _record(client, token, "2026-01-06", absent=["21AD001", "21AD002"], present=["NOPE"]).json()
+    assert (result["present"], result["absent"], result["unknown"]) == (8, 2, ["NOPE"])
+
+    history = client.get("/attendance/student", params={"student_roll_no": "21AD001", "course_code": "21HI53IT"}).json()
+    assert (history["held"], history["present"], history["percentage"]) == (3, 1, 33.33)
+    assert [s["present"] for s in history["sessions"]] == [False, True, False]
+
+    # Re-recording a session overwrites it instead of adding one
+    _record(client, token, "2026-01-06", absent=["21AD002"])
+    history = client.get("/attendance/student", params={"student_roll_no": "21AD001", "course_code": "21HI53IT"}).json()
+    assert (history["held"], history["present"]) == (3, 2)
+
+    changes = client.get("/marks/audit", params={"student_roll_no": "21AD001", "course_code": "21HI53IT"},
+                         headers={"Authorization": f"Bearer {token}"}).json()
+    assert [(c["field"], c["new"]) for c in changes][:3] == [
+        ("subject_attendance", 66.67), ("subject_attendance", 33.33), ("subject_attendance", 50.0)]
+
+
+def test_unknown_scope_is_404(client):
+    token = login(client, "HTS 1794", "20012025")
+    assert _record(client, token, "2026-01-05", course_code="NOPE101").status_code == 404
+    assert client.get("/attendance/sessions", params={"course_code": "NOPE101"}).json() == []
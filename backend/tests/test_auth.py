@@ -0,0 +1,34 @@
+import time
+
+from jose import jwt
+
+from backend import auth
+
+from .conftest import login
+
+
+def _forged(secret, role="Admin"):
+    now = int(time.time())
+    claims = {"sub": "attacker", "role": role, "type": "access", "iat": now, "exp": now + 600}
+    return jwt.encode(claims, secret, algorithm=auth.ALGORITHM)
+
+
+def test_admin_route_needs_a_token_signed_by_this_server(client):
+    assert client.get("/admin/storage").status_code == 401
+    # The key the code used to fall back to when JWT_SECRET was unset
+    for secret in ("dev-only-secret-change-me", "guess"):
+        r = client.get("/admin/storage", headers={"Authorization": f"Bearer {_forged(secret)}"})
+        assert r.status_code == 401
+
+
+def test_roles_and_token_kinds(client):
+    admin = login(client, "admin", "admin123")
+    assert client.get("/admin/storage", headers={"Authorization": f"Bearer {admin}"}).status_code == 200
+    student = login(client, "21AD002", "pass002")
+    assert client.get("/admin/storage", headers={"Authorization": f"Bearer {student}"}).status_code == 403
+
+    refresh = client.post("/login", json={"username": "admin", "password": "admin123"}).json()["refresh_token"]
+    # A refresh token is not an access token, and vice versa
+    assert client.get("/admin/storage", headers={"Authorization": f"Bearer {refresh}"}).status_code == 401
+    assert client.post("/token/refresh", json={"refresh_token": admin}).status_code == 401
+    assert client.post("/token/refresh", json={"refresh_token": refresh}).json()["role"] == "Admin"
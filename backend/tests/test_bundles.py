@@ -0,0 +1,38 @@
+import io
+import zipfile
+
+COURSE = "ZB101"
+
+
+def _material(client, filename, data, type="Notes"):
+    upload_id = client.post("/materials/uploads", json={
+        "course_code": COURSE, "type": type, "title": filename, "posted_by": "HTS 1794",
+        "filename": filename, "size": len(data)}).json()["upload_id"]
+    client.put(f"/materials/uploads/{upload_id}", params={"offset": 0}, content=data)
+    return client.post(f"/materials/uploads/{upload_id}/finalize").json()
+
+
+def test_course_bundle(client):
+    url = f"/materials/{COURSE}/bundle"
+    assert client.get(url).status_code == 404
+    notes = b"lecture notes " * 1000
+    _material(client, "week 1.txt", notes)
+    _material(client, "week 1.txt", b"again")
+    _material(client, "qb.pdf", b"%PDF-1.4 question bank", type="Question Bank")
+
+    r = client.get(url)
+    assert r.status_code == 200 and r.headers["content-type"] == "application/zip"
+    assert r.headers["content-disposition"].startswith(f'attachment; filename="{COURSE}_materials.zip"')
+    with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["Notes/week 1.txt", "Notes/week 1 (2).txt", "Question Bank/qb.pdf"]
+        assert zf.read("Notes/week 1.txt") == notes and zf.read("Notes/week 1 (2).txt") == b"again"
+        assert zf.getinfo("Notes/week 1.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.getinfo("Question Bank/qb.pdf").compress_type == zipfile.ZIP_STORED
+
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"') and client.get(url).content == r.content
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    _material(client, "week 2.txt", b"new")
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
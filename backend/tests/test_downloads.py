@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from backend import storage
+
+
+def _material(client, data, filename="notes.pdf"):
+    upload_id = client.post("/materials/uploads", json={
+        "course_code": "CS3401", "type": "Notes", "title": filename, "posted_by": "HTS 1794",
+        "filename": filename, "size": len(data)}).json()["upload_id"]
+    client.put(f"/materials/uploads/{upload_id}", params={"offset": 0}, content=data)
+    return client.post(f"/materials/uploads/{upload_id}/finalize").json()
+
+
+@pytest.fixture
+def offload(monkeypatch):
+    monkeypatch.setattr(storage, "DOWNLOAD_MODE", "offload")
+
+
+def test_offload_to_nginx(client, offload):
+    material = _material(client, b"%PDF offloaded", "réport.pdf")
+    url = f"/materials/{material['id']}/download"
+    key = storage.key_for(material["file_link"])
+
+    r = client.get(url, headers={"X-Sendfile-Type": "X-Accel-Redirect"})
+    assert r.status_code == 200 and r.content == b""
+    assert r.headers["x-accel-redirect"] == storage.X_ACCEL_PREFIX + key.replace("é", "%C3%A9")
+    assert r.headers["etag"] == material["etag"] and "content-length" not in r.headers
+    assert r.headers["content-disposition"].startswith('attachment; filename="CS3401_')
+    assert "filename*=utf-8''" in r.headers["content-disposition"]
+    # Unchanged files are still revalidated by the app
+    assert client.get(url, headers={"X-Sendfile-Type": "X-Accel-Redirect",
+                                    "If-None-Match": material["etag"]}).status_code == 304
+    # Not through the proxy: served from Python
+    r = client.get(url)
+    assert r.content == b"%PDF offloaded" and "x-accel-redirect" not in r.headers
+
+
+def test_offload_with_x_sendfile(client, offload):
+    material = _material(client, b"sendfile me")
+    key = storage.key_for(material["file_link"])
+    r = client.get(f"/materials/{material['id']}/download", headers={"X-Sendfile-Type": "X-Sendfile"})
+    assert r.headers["x-sendfile"] == os.path.abspath(storage.backend.path(key)) and r.content == b""
+    assert client.get(f"/static/{key}", headers={"X-Sendfile-Type": "nonsense"}).content == b"sendfile me"
+
+
+def test_range_and_conditional_get(client):
+    data = bytes(range(256)) * 4
+    material = _material(client, data)
+    url = f"/materials/{material['id']}/download"
+
+    full = client.get(url)
+    etag = full.headers["etag"]
+    assert full.content == data and etag == material["etag"] and full.headers["accept-ranges"] == "bytes"
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    part = client.get(url, headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206 and part.content == data[100:200]
+    assert part.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert client.get(url, headers={"Range": "bytes=-24"}).content == data[-24:]
+    # Resuming against a changed file gets the whole file instead of a mismatched piece
+    assert client.get(url, headers={"Range": "bytes=100-", "If-Range": etag}).status_code == 206
+    assert client.get(url, headers={"Range": "bytes=100-", "If-Range": '"stale"'}).content == data
+    assert client.get(url, headers={"Range": f"bytes={len(data)}-"}).status_code == 416
+
+
+def test_etag_is_backfilled_and_links_redirect(client):
+    from backend import models
+    from backend.database import SessionLocal
+
+    material = _material(client, b"legacy")
+    db = SessionLocal()
+    try:
+        db.query(models.Material).filter(models.Material.id == material["id"]).update({"etag": None, "size": None})
+        link = models.Material(course_code="CS3401", type="Video", title="Lecture", file_link="youtube.com/watch?v=x")
+        db.add(link)
+        db.commit()
+        link_id = link.id
+    finally:
+        db.close()
+    assert client.get(f"/materials/{material['id']}/download").headers["etag"] == material["etag"]
+    r = client.get(f"/materials/{link_id}/download", follow_redirects=False)
+    assert r.status_code == 307 and r.headers["location"] == "https://youtube.com/watch?v=x"
+    assert client.get("/materials/999999/download").status_code == 404
@@ -0,0 +1,36 @@
+import csv
+import io
+
+from backend import spreadsheets
+
+
+def test_section_marks_csv(client):
+    r = client.get("/marks/section/export", params={"course_code": "CS3401", "section": "A"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(r.content.decode("utf-8-sig"))))
+    assert rows[0][:2] == ["Roll No", "Name"]
+    assert len(rows) == 1 + 10
+    assert [row[0] for row in rows[1:]] == sorted(row[0] for row in rows[1:])
+
+
+def test_students_xlsx_round_trip(client):
+    r = client.get("/admin/students/export", params={"year": 3, "section": "A", "format": "xlsx"})
+    assert r.status_code == 200
+    rows = spreadsheets.read_rows("students.xlsx", r.content)
+    assert rows[0][0] == "Roll No"
+    assert {row[0] for row in rows[1:]} >= {"21AD001", "21AD010"}
+
+
+def test_download_name_is_escaped(client):
+    r = client.get("/marks/section/export", params={"course_code": 'x";y\\é', "section": "A"})
+    disposition = r.headers["content-disposition"]
+    assert disposition.startswith('attachment; filename="x_y_')
+    assert disposition.count('"') == 2
+    assert "filename*=utf-8''x%22%3By%5C%C3%A9_A_marks.csv" in disposition
+
+
+def test_csv_cells_cannot_start_formulas():
+    body = b"".join(spreadsheets.csv_stream(["Name"], [["=HYPERLINK(\"http://x\")"], ["@SUM(A1)"], ["-2+3"], [-5], ["Ann"]]))
+    rows = list(csv.reader(io.StringIO(body.decode("utf-8-sig"))))
+    assert [row[0] for row in rows[1:]] == ["'=HYPERLINK(\"http://x\")", "'@SUM(A1)", "'-2+3", "-5", "Ann"]
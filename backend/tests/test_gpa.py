@@ -0,0 +1,43 @@
+from backend import gpa
+
+ROLL = "21AD010"
+
+
+def test_grading_scheme():
+    assert gpa.course_total(30, 45, 50, None, 80) == 86.0
+    assert gpa.course_total(50, 0, 50, 0, None) is None
+    assert [gpa.grade_for(p) for p in (10, 9, 6, 0, None)] == ["O", "A+", "B", "U", None]
+
+
+def _course(client, code, semester, credits):
+    client.post("/admin/courses", json={"code": code, "title": code, "semester": semester,
+                                        "credits": credits, "section": "Z"})
+    client.post("/admin/enroll", json={"student_roll_no": ROLL, "course_code": code})
+    return next(c["id"] for c in client.get("/courses").json() if c["code"] == code)
+
+
+def _grade(client, code, cia, end_sem):
+    client.post("/marks/sync", json={"student_roll_no": ROLL, "course_code": code, "cia1_marks": cia,
+                                     "cia1_retest": 0, "cia2_marks": cia, "cia2_retest": 0,
+                                     "subject_attendance": 90, "end_sem_marks": end_sem})
+
+
+def _gpa(client):
+    body = client.get(f"/student/{ROLL}/gpa").json()
+    return body["cgpa"], [(s["semester"], s["sgpa"], s["credits"]) for s in body["semesters"]]
+
+
+def test_recompute_after_edit_and_course_delete(client):
+    first, second = _course(client, "GP401", 4, 4), _course(client, "GP601", 6, 2)
+    _grade(client, "GP401", 50, 100)   # Total 100: O
+    _grade(client, "GP601", 25, 50)    # Total 50: B
+    assert _gpa(client) == (8.67, [(4, 10.0, 4), (6, 6.0, 2)])
+
+    _grade(client, "GP601", 50, 90)
+    assert _gpa(client) == (10.0, [(4, 10.0, 4), (6, 10.0, 2)])
+
+    assert client.delete(f"/admin/courses/{first}").status_code == 200
+    assert _gpa(client) == (10.0, [(6, 10.0, 2)])
+    # No graded course left: back to the default, not the last computed value
+    client.delete(f"/admin/courses/{second}")
+    assert _gpa(client) == (0.0, [])
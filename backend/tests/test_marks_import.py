@@ -0,0 +1,87 @@
+import io
+import zipfile
+
+import pytest
+
+from backend import marks, spreadsheets
+
+from .conftest import login
+
+
+def _upload(client, body: bytes, filename="marks.csv", apply=False, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    return client.post("/marks/import", data={"course_code": "MA3151", "section": "A", "apply": str(apply).lower()},
+                       files={"file": (filename, body)}, headers=headers)
+
+
+def test_bad_cell_is_an_error_not_an_unchanged_row():
+    updates, errors = marks.parse_import([
+        ["Roll No", "CIA 1", "CIA 2"],
+        ["21AD002", "abc", "30"],
+        ["21AD003", "40", ""],
+        ["21AD003", "41", ""],
+    ])
+    assert updates == {"21AD003": {"cia1_marks": 40.0}}
+    assert [(e["roll_no"], e["row"]) for e in errors] == [("21AD002", 2), ("21AD003", 4)]
+
+
+def test_preview_then_apply(client):
+    token = login(client, "HTS 1794", "20012025")
+    csv = b"Roll No,CIA 1,CIA 2\n21AD004,44,\n21AD005,abc,20\n21AD999,10,10\n"
+    preview = _upload(client, csv).json()
+    assert preview["applied"] is False
+    assert [c["roll_no"] for c in preview["changes"]] == ["21AD004"]
+    assert preview["unchanged"] == 0 and preview["rows"] == 2
+    assert {e.get("roll_no") for e in preview["errors"]} == {"21AD005", "21AD999"}
+    # Nothing is written while any row is invalid
+    assert _upload(client, csv, apply=True, token=token).status_code == 400
+
+    ok = b"Roll No,CIA 1\n21AD004,44\n21AD005,39\n"
+    assert _upload(client, ok, apply=True, token=token).json()["applied"] is True
+    rows = {r["roll_no"]: r for r in client.get("/marks/section", params={"course_code": "MA3151"}).json()}
+    assert (rows["21AD004"]["cia1_marks"], rows["21AD005"]["cia1_marks"]) == (44, 39)
+    again = _upload(client, ok).json()
+    assert again["unchanged"] == 2 and again["changes"] == []
+
+
+def _xlsx(parts):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _workbook(sheet_xml, sheets='<sheet name="S" sheetId="1" r:id="rId1"/>', shared=None):
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    parts = {
+        "xl/workbook.xml": f'<workbook {ns} xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                           f'<sheets>{sheets}</sheets></workbook>',
+        "xl/_rels/workbook.xml.rels": '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                                      '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>',
+        "xl/worksheets/sheet1.xml": f"<worksheet {ns}><sheetData>{sheet_xml}</sheetData></worksheet>",
+    }
+    if shared is not None:
+        parts["xl/sharedStrings.xml"] = f"<sst {ns}>{shared}</sst>"
+    return _xlsx(parts)
+
+
+@pytest.mark.parametrize("data", [
+    _workbook("", sheets=""),                                                     # No sheet
+    _workbook('<row><c r="A1" t="s"><v>7</v></c></row>', shared="<si><t>x</t></si>"),  # Bad shared string
+    _workbook('<row><c r="11"><v>1</v></c></row>'),                                # Malformed reference
+    _workbook('<row><c r="ZZZZZZ1"><v>1</v></c></row>'),                           # Absurd column
+    b"PK\x03\x04 not really a zip",
+])
+def test_malformed_workbooks_are_rejected(client, data):
+    with pytest.raises(spreadsheets.SpreadsheetError):
+        spreadsheets.read_rows("m.xlsx", data)
+    assert _upload(client, data, filename="m.xlsx").status_code == 400
+
+
+def test_decompressed_size_is_capped(monkeypatch):
+    monkeypatch.setattr(spreadsheets, "MAX_PART_BYTES", 10000)
+    bomb = _workbook("<row><c r=\"A1\"><v>1</v></c></row>" * 2000)
+    assert len(bomb) < 10000
+    with pytest.raises(spreadsheets.SpreadsheetError, match="too large"):
+        spreadsheets.read_rows("m.xlsx", bomb)
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from backend import migrations, models
+
+# The original app's tables, before the ad-hoc scripts added
+# students.section and the profile_pic columns
+BASELINE = [
+    "CREATE TABLE users (id VARCHAR PRIMARY KEY, role VARCHAR, password VARCHAR)",
+    "CREATE TABLE faculty (staff_no VARCHAR PRIMARY KEY REFERENCES users (id), name VARCHAR, designation VARCHAR, doj VARCHAR)",
+    """CREATE TABLE students (roll_no VARCHAR PRIMARY KEY REFERENCES users (id), name VARCHAR, year INTEGER,
+                              semester INTEGER, cgpa FLOAT, attendance_percentage FLOAT)""",
+    """CREATE TABLE courses (id INTEGER PRIMARY KEY, code VARCHAR, title VARCHAR, semester INTEGER, credits INTEGER,
+                             category VARCHAR, section VARCHAR, faculty_id VARCHAR REFERENCES faculty (staff_no))""",
+    """CREATE TABLE announcements (id INTEGER PRIMARY KEY, title VARCHAR, content TEXT, type VARCHAR,
+                                   course_code VARCHAR, section VARCHAR, posted_by VARCHAR)""",
+    """CREATE TABLE academic_data (id INTEGER PRIMARY KEY, student_roll_no VARCHAR REFERENCES students (roll_no),
+                                   course_id INTEGER REFERENCES courses (id), course_code VARCHAR, subject VARCHAR,
+                                   section VARCHAR, cia1_marks FLOAT, cia1_retest FLOAT, cia2_marks FLOAT,
+                                   cia2_retest FLOAT, subject_attendance FLOAT, innovative_assignment_marks FLOAT,
+                                   status VARCHAR)""",
+    """CREATE TABLE materials (id INTEGER PRIMARY KEY, course_id INTEGER REFERENCES courses (id), course_code VARCHAR,
+                               type VARCHAR, title VARCHAR, file_link VARCHAR, posted_by VARCHAR)""",
+]
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO users VALUES ('21AD001', 'Student', 'x')"))
+        conn.execute(text("INSERT INTO students (roll_no, name) VALUES ('21AD001', 'Old Student')"))
+        conn.execute(text("""INSERT INTO materials (id, course_code, file_link) VALUES
+            (1, 'CS3401', 'http://localhost:8000/static/CS3401_1700000000_notes.pdf'),
+            (2, 'CS3401', 'https://youtube.com/watch?v=x')"""))
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_from_the_baseline_schema(baseline):
+    assert migrations.current_version(baseline) == 0
+    with pytest.raises(RuntimeError, match="behind"):
+        migrations.ensure_schema(baseline, auto_upgrade=False)
+
+    assert migrations.upgrade(baseline) == migrations.HEAD
+    schema = inspect(baseline)
+    for table in models.Base.metadata.sorted_tables:
+        assert {c.name for c in table.columns} <= {c["name"] for c in schema.get_columns(table.name)}, table.name
+    with baseline.connect() as conn:
+        assert [r for (r,) in conn.execute(text("SELECT file_link FROM materials ORDER BY id"))] == [
+            "CS3401_1700000000_notes.pdf", "https://youtube.com/watch?v=x"]
+        assert conn.execute(text("SELECT name, section FROM students")).one() == ("Old Student", "A")
+
+    # Already current: nothing to do
+    assert migrations.ensure_schema(baseline, auto_upgrade=False) == migrations.HEAD
+    assert migrations.upgrade(baseline) == migrations.HEAD
+
+
+def test_half_applied_migration_can_rerun(baseline):
+    migrations.upgrade(baseline)
+    migrations.stamp(4, baseline)
+    assert migrations.upgrade(baseline) == migrations.HEAD
+
+
+def test_new_database_is_created_at_head(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    assert migrations.upgrade(engine) == migrations.HEAD == migrations.current_version(engine)
+    assert set(models.Base.metadata.tables) <= set(inspect(engine).get_table_names())
+    engine.dispose()
@@ -0,0 +1,45 @@
+import pytest
+
+from backend import profiling
+
+from .conftest import login
+
+
+@pytest.fixture
+def admin(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    yield {"Authorization": f"Bearer {login(client, 'admin', 'admin123')}"}
+    profiling._route_rates.clear()
+
+
+def test_toggle_and_read_reports(client, admin):
+    assert client.post("/admin/profiling", json={"route": "/nope", "rate": 1}, headers=admin).status_code == 404
+    assert client.post("/admin/profiling", json={"route": "/courses", "rate": 5},
+                       headers=admin).json()["rates"] == {"/courses": 1.0}
+    client.get("/courses")
+    client.get("/admin/students")   # Not selected
+
+    reports = client.get("/admin/profiles", headers=admin).json()
+    assert len(reports) == 1 and "_GET_courses_" in reports[0]["name"]
+    body = client.get(f"/admin/profiles/{reports[0]['name']}", headers=admin).text
+    assert "/courses" in body
+
+    client.post("/admin/profiling", json={"route": "/courses", "rate": 0}, headers=admin)
+    client.get("/courses")
+    assert len(client.get("/admin/profiles", headers=admin).json()) == 1
+    assert client.get("/admin/profiles/..%2Fsecret", headers=admin).status_code == 404
+
+
+def test_header_forces_a_profile(client, admin, monkeypatch):
+    client.get("/courses", headers={"X-Profile": "s3cret"})   # No token configured: ignored
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "s3cret")
+    client.get("/courses", headers={"X-Profile": "wrong"})
+    assert client.get("/admin/profiles", headers=admin).json() == []
+    client.get("/courses", headers={"X-Profile": "s3cret"})
+    assert len(client.get("/admin/profiles", headers=admin).json()) == 1
+
+
+def test_reports_are_admin_only(client):
+    student = login(client, "21AD002", "pass002")
+    assert client.get("/admin/profiling").status_code == 401
+    assert client.get("/admin/profiles", headers={"Authorization": f"Bearer {student}"}).status_code == 403
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import ratelimit
+
+
+async def _echo(scope, receive, send):
+    """Stands in for the API: answers 200 with the request body it received."""
+    body, more = b"", True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(ratelimit, "ENABLED", True)
+    monkeypatch.setattr(ratelimit, "TRUST_PROXY", True)
+    monkeypatch.setattr(ratelimit, "LIMITS", dict(ratelimit.LIMITS, **{"*": (0.0, 3.0)}))
+    monkeypatch.setattr(ratelimit, "LOGIN_IP_LIMIT", (0.0, 50.0))
+    ratelimit.buckets.clear()
+    middleware = ratelimit.RateLimitMiddleware(_echo)
+    yield middleware, TestClient(middleware)
+    ratelimit.buckets.clear()
+
+
+def test_spoofed_forwarded_for_prefix_shares_the_proxy_added_address(limiter):
+    _, client = limiter
+    codes = [client.get("/courses", headers={"X-Forwarded-For": f"10.9.9.{i}, 203.0.113.7"}).status_code
+             for i in range(4)]
+    assert codes == [200, 200, 200, 429]
+    # Another real client still has its own budget
+    assert client.get("/courses", headers={"X-Forwarded-For": "203.0.113.8"}).status_code == 200
+
+
+def test_real_ip_header_wins(limiter):
+    _, client = limiter
+    codes = [client.get("/courses", headers={"X-Real-IP": "198.51.100.1", "X-Forwarded-For": f"10.0.0.{i}"}).status_code
+             for i in range(4)]
+    assert codes[-1] == 429
+
+
+def test_login_is_limited_per_username_not_per_ip(limiter):
+    _, client = limiter
+    body = {"username": "21AD002", "password": "x"}
+    codes = [client.post("/login", json=body).status_code for _ in range(11)]
+    assert codes.count(200) == 10 and codes[-1] == 429
+    assert "Retry-After".lower() in client.post("/login", json=body).headers
+    # Classmates behind the same address are unaffected...
+    for n in range(20):
+        r = client.post("/login", json={"username": f"21AD1{n:02d}", "password": "x"})
+        assert r.status_code == 200
+        # ...and the app still receives the body the middleware read
+        assert json.loads(r.content)["username"] == f"21AD1{n:02d}"
+
+
+def test_login_ip_ceiling(limiter):
+    _, client = limiter
+    codes = [client.post("/login", json={"username": f"u{n}", "password": "x"}).status_code for n in range(51)]
+    assert codes[-1] == 429 and codes.count(200) == 50
+
+
+def test_sheds_writes_beyond_the_in_flight_cap(limiter):
+    middleware, client = limiter
+    middleware.writes_in_flight = ratelimit.MAX_WRITES_IN_FLIGHT
+    r = client.post("/marks/sync/delta", json={})
+    assert r.status_code == 503 and r.headers["retry-after"] == "1"
+    assert client.get("/courses").status_code == 200
+
+
+def test_upload_chunks_do_not_take_write_slots(limiter):
+    middleware, client = limiter
+    middleware.writes_in_flight = ratelimit.MAX_WRITES_IN_FLIGHT
+    assert client.put("/materials/uploads/abc?offset=0", content=b"x").status_code == 200
+    assert client.post("/materials/uploads/abc/finalize").status_code == 503  # Finalizing does
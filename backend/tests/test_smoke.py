@@ -0,0 +1,67 @@
+"""End-to-end checks of the hot paths against a seeded demo database."""
+from backend import feeds, main
+from backend.database import SessionLocal
+
+from .conftest import login
+
+STUDENT, STUDENT_PASSWORD = "21AD002", "pass002"
+FACULTY, FACULTY_PASSWORD = "HTS 1794", "20012025"
+COURSE_CODE, SUBJECT = "CS3401", "Artificial Intelligence"
+
+
+def test_login(client):
+    r = client.post("/login", json={"username": STUDENT, "password": STUDENT_PASSWORD})
+    assert r.status_code == 200
+    assert r.json()["access_token"]
+    r = client.post("/login", json={"username": STUDENT, "password": "wrong"})
+    assert r.status_code == 400
+
+
+def test_marks_delta_sync(client):
+    token = login(client, FACULTY, FACULTY_PASSWORD)
+    rows = client.get("/marks/section", params={"course_code": COURSE_CODE, "section": "A"}).json()
+    row = next(r for r in rows if r["roll_no"] == STUDENT)
+    change = {"roll_no": STUDENT, "version": row["version"], "fields": {"cia1_marks": 41}}
+    body = {"course_code": COURSE_CODE, "section": "A", "changes": [change]}
+
+    r = client.post("/marks/sync/delta", json=body, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200
+    assert [a["roll_no"] for a in r.json()["applied"]] == [STUDENT]
+
+    # Same stale version again: reported as a conflict, not overwritten
+    change["fields"] = {"cia1_marks": 12}
+    r = client.post("/marks/sync/delta", json=body, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200
+    assert [c["roll_no"] for c in r.json()["conflicts"]] == [STUDENT]
+
+    history = client.get("/marks/audit", params={"student_roll_no": STUDENT, "course_code": COURSE_CODE},
+                         headers={"Authorization": f"Bearer {token}"}).json()
+    assert history[0]["new"] == 41
+    assert history[0]["editor"] == FACULTY
+
+
+def test_student_course_view(client):
+    by_code = client.get(f"/student/{STUDENT}/course/{COURSE_CODE}").json()
+    assert by_code["course"]["code"] == COURSE_CODE
+    assert by_code["marks"]["subject"] == SUBJECT
+    # Links made before the dashboard used course codes carry the subject title
+    by_subject = client.get(f"/student/{STUDENT}/course/{SUBJECT}").json()
+    assert by_subject["marks"] == by_code["marks"]
+    assert client.get(f"/student/NOBODY/course/{COURSE_CODE}").status_code == 404
+
+
+def test_announcement_feed(client):
+    posted = client.post("/announcements", json={
+        "title": "Lab moved", "content": "Room 204", "type": "Student",
+        "course_code": COURSE_CODE, "section": "A", "posted_by": FACULTY,
+    }).json()
+    r = client.get("/announcements", params={"student_id": STUDENT})
+    assert posted["id"] in [a["id"] for a in r.json()]
+    assert client.get("/announcements", params={"student_id": STUDENT, "limit": feeds.FEED_SIZE + 1}).status_code == 422
+
+    # The benchmark's --micro mode calls handlers directly, relying on plain defaults
+    db = SessionLocal()
+    try:
+        assert posted["id"] in [a.id for a in main.get_announcements(student_id=STUDENT, db=db)]
+    finally:
+        db.close()
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+from backend import models, storage
+from backend.database import SessionLocal
+
+KEY = "CS3401_1718000000123456_unit 1 notes.pdf"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (KEY, True),
+    ("CS3401_1718000000_notes.pdf", True),      # Seconds stamp of older uploads
+    ("youtube.com/watch?v=abc_1718000000_x", False),
+    ("..\\CS3401_1718000000_x", False),
+    ("notes.pdf", False),
+    ("", False),
+    (None, False),
+])
+def test_is_key(value, expected):
+    assert storage.is_key(value) is expected
+
+
+def test_urls_follow_configuration(monkeypatch):
+    assert storage.key_for(storage.url_for(KEY)) == KEY
+    assert storage.key_for("http://localhost:8000/static/CS3401_1718000000_a.pdf") == "CS3401_1718000000_a.pdf"
+    monkeypatch.setattr(storage, "MEDIA_BASE_URL", "https://cdn.example.edu/m/")
+    assert storage.url_for(KEY) == "https://cdn.example.edu/m/CS3401_1718000000123456_unit%201%20notes.pdf"
+    assert storage.key_for(storage.url_for(KEY)) == KEY
+    # External links, with or without a scheme, are never keys
+    for link in ("https://youtube.com/watch?v=x", "youtube.com/watch?v=x", "https://cdn.example.edu/m/../etc"):
+        assert storage.key_for(link) is None and storage.url_for(link) == link
+    assert storage.new_key("CS3401", "../../x/notes.pdf").endswith("_notes.pdf")
+    assert os.path.dirname(storage.backend.path("../../" + KEY)) == storage.backend.root
+
+
+def test_rows_store_keys_and_load_urls(client, monkeypatch):
+    db = SessionLocal()
+    try:
+        material = models.Material(course_code="ZS101", type="Notes", title="t", file_link=storage.url_for(KEY))
+        link = models.Material(course_code="ZS101", type="Video", title="v", file_link="youtube.com/watch?v=x")
+        db.add_all([material, link])
+        db.commit()
+        stored = dict(db.execute(text("SELECT id, file_link FROM materials WHERE course_code = 'ZS101'")).all())
+        assert stored == {material.id: KEY, link.id: "youtube.com/watch?v=x"}
+
+        monkeypatch.setattr(storage, "MEDIA_BASE_URL", "https://cdn.example.edu/m/")
+        db.expire_all()
+        assert db.get(models.Material, material.id).file_link.startswith("https://cdn.example.edu/m/CS3401_")
+        assert db.get(models.Material, link.id).file_link == "youtube.com/watch?v=x"
+    finally:
+        db.close()
@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+from backend import storage, storage_gc, uploads
+from backend.database import SessionLocal
+
+from .conftest import login
+
+DAY = 86400
+
+
+def _file(directory, name, age=0.0, data=b"x" * 10):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+@pytest.fixture
+def db(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_gc, "QUARANTINE_DIR", str(tmp_path / "quarantine"))
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_grace_period_quarantine_and_purge(client, db):
+    upload_id = client.post("/materials/uploads", json={
+        "course_code": "ZG101", "type": "Notes", "title": "kept", "posted_by": "HTS 1794",
+        "filename": "kept.pdf", "size": 4}).json()["upload_id"]
+    client.put(f"/materials/uploads/{upload_id}", params={"offset": 0}, content=b"kept")
+    kept = storage.key_for(client.post(f"/materials/uploads/{upload_id}/finalize").json()["file_link"])
+    os.utime(storage.path_for(kept), (time.time() - 2 * DAY,) * 2)
+    old = _file(storage.UPLOAD_DIR, "ZG101_1700000000_old.pdf", age=2 * DAY)
+    new = _file(storage.UPLOAD_DIR, "ZG101_1700000001_new.pdf")
+    stray_part = _file(uploads.PARTIAL_DIR, "gone.part", age=2 * DAY)
+    live = client.post("/materials/uploads", json={
+        "course_code": "ZG101", "type": "Notes", "title": "t", "posted_by": "x", "filename": "f", "size": 4}).json()
+    os.utime(uploads.part_path(live["upload_id"]), (time.time() - 2 * DAY,) * 2)
+
+    report = storage_gc.collect(db, dry_run=True)
+    assert report["collected"] == 0 and os.path.exists(old)
+    assert report["orphans"]["files"] >= 1 and report["recent_unreferenced"]["files"] >= 1
+    assert {"owner": "ZG101", "files": 1, "bytes": 4} in report["courses"]
+
+    report = storage_gc.collect(db)
+    quarantined = os.path.join(storage_gc.QUARANTINE_DIR, os.path.basename(old))
+    assert not os.path.exists(old) and os.path.exists(quarantined)
+    assert os.path.exists(new) and os.path.exists(storage.path_for(kept))
+    assert not os.path.exists(stray_part) and os.path.exists(uploads.part_path(live["upload_id"]))
+    assert report["partial_removed"] >= 1
+
+    # Quarantined files are deleted once QUARANTINE_DAYS have passed
+    storage_gc.collect(db, now=time.time() + (storage_gc.QUARANTINE_DAYS - 1) * DAY)
+    assert os.path.exists(quarantined)
+    storage_gc.collect(db, now=time.time() + (storage_gc.QUARANTINE_DAYS + 1) * DAY)
+    assert not os.path.exists(quarantined) and os.path.exists(storage.path_for(kept))
+
+
+def test_rechecks_references_before_moving(client, db, monkeypatch):
+    photo = storage.new_key("21AD004", "me.png")
+    db.execute(text("UPDATE students SET profile_pic = :k WHERE roll_no = '21AD004'"), {"k": photo})
+    db.commit()
+    path = _file(storage.UPLOAD_DIR, photo, age=2 * DAY)
+    # As if the row was written between the scan and the move
+    monkeypatch.setattr(storage_gc, "scan", lambda db, now: ({}, [(photo, 10)]))
+    assert storage_gc.collect(db)["collected"] == 0 and os.path.exists(path)
+
+
+def test_report_is_admin_only(client):
+    admin = login(client, "admin", "admin123")
+    report = client.get("/admin/storage", params={"fresh": True}, headers={"Authorization": f"Bearer {admin}"}).json()
+    assert report["mode"] == "dry-run" and report["files"] >= 1
+    assert client.post("/admin/storage/gc").status_code == 401
@@ -0,0 +1,71 @@
+import io
+import zipfile
+
+from sqlalchemy import text
+
+from backend import textindex
+from backend.database import SessionLocal
+
+COURSE = "ZT101"
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+A = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+
+
+def _office(parts):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, xml in parts.items():
+            zf.writestr(name, xml)
+    return buf.getvalue()
+
+
+def _docx(*pages):
+    body = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'.join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in pages)
+    return _office({"word/document.xml": f"<w:document {W}><w:body>{body}</w:body></w:document>"})
+
+
+def _pptx(*slides):
+    return _office({f"ppt/slides/slide{n}.xml": f"<p:sld xmlns:p='p' {A}><a:p><a:r><a:t>{s}</a:t></a:r></a:p></p:sld>"
+                    for n, s in enumerate(slides, 1)})
+
+
+def _material(client, filename, data):
+    upload_id = client.post("/materials/uploads", json={
+        "course_code": COURSE, "type": "Notes", "title": filename, "posted_by": "HTS 1794",
+        "filename": filename, "size": len(data)}).json()["upload_id"]
+    client.put(f"/materials/uploads/{upload_id}", params={"offset": 0}, content=data)
+    return client.post(f"/materials/uploads/{upload_id}/finalize").json()["id"]
+
+
+def _status(material_id):
+    db = SessionLocal()
+    try:
+        return db.execute(text("SELECT status FROM material_index WHERE material_id = :id"), {"id": material_id}).scalar()
+    finally:
+        db.close()
+
+
+def _search(client, q, course=COURSE):
+    r = client.get(f"/materials/{course}/search", params={"q": q})
+    return [(m["material_id"], m["page"]) for m in r.json()] if r.status_code == 200 else r.status_code
+
+
+def test_index_and_search(client):
+    notes = _material(client, "unit1.docx", _docx("Search algorithms: BFS", "Heuristic functions and A-star"))
+    slides = _material(client, "unit2.pptx", _pptx("Intro", "Minimax with heuristic pruning"))
+    plain = _material(client, "readme.txt", b"heuristic")
+    broken = _material(client, "broken.docx", b"not a zip")
+
+    assert textindex.run() >= 4
+    assert [_status(m) for m in (notes, slides, plain, broken)] == ["done", "done", "skipped", "failed"]
+    assert sorted(_search(client, "heuristic")) == [(notes, 2), (slides, 2)]
+    assert sorted(_search(client, "heur")) == [(notes, 2), (slides, 2)]   # Last word matches as a prefix
+    assert _search(client, "search BFS") == [(notes, 1)]
+    assert _search(client, "heuristic", course="CS3401") == []
+    assert _search(client, '"*') == 400
+    # Nothing changed: nothing to redo
+    assert textindex.run() == 0
+
+    assert client.delete(f"/materials/{notes}").status_code == 200
+    assert _search(client, "heuristic") == [(slides, 2)]
+    assert _status(notes) is None
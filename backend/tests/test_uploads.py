@@ -0,0 +1,59 @@
+import hashlib
+
+from backend import storage, uploads
+
+
+def _start(client, size, filename="notes.pdf"):
+    return client.post("/materials/uploads", json={
+        "course_code": "CS3401", "type": "Notes", "title": "Big notes", "posted_by": "HTS 1794",
+        "filename": filename, "size": size, "content_type": "application/pdf"}).json()["upload_id"]
+
+
+def test_chunked_upload_and_finalize(client):
+    data = bytes(range(256)) * 40
+    upload_id = _start(client, len(data))
+    url = f"/materials/uploads/{upload_id}"
+
+    assert client.put(url, params={"offset": 0}, content=data[:4000]).json()["offset"] == 4000
+    # A gap is refused; the client is told where to resume
+    gap = client.put(url, params={"offset": 6000}, content=data[6000:])
+    assert gap.status_code == 409 and gap.headers["upload-offset"] == "4000"
+    bad = client.put(url, params={"offset": 4000}, content=data[4000:8000],
+                     headers={"X-Chunk-SHA256": hashlib.sha256(b"other").hexdigest()})
+    assert bad.status_code == 422 and client.get(url).json()["offset"] == 4000
+    assert client.post(f"{url}/finalize").status_code == 409
+
+    assert client.put(url, params={"offset": 4000}, content=data[4000:],
+                      headers={"X-Chunk-SHA256": hashlib.sha256(data[4000:]).hexdigest()}).json()["offset"] == len(data)
+    # Retrying an already received chunk never moves the offset back
+    assert client.put(url, params={"offset": 0}, content=data[:100]).json()["offset"] == len(data)
+    assert client.post(f"{url}/finalize", json={"sha256": "0" * 64}).status_code == 422
+
+    material = client.post(f"{url}/finalize", json={"sha256": hashlib.sha256(data).hexdigest()}).json()
+    key = storage.key_for(material["file_link"])
+    assert storage.is_key(key) and material["size"] == len(data)
+    with storage.backend.open(key) as f:
+        assert f.read() == data
+    assert client.get(url).status_code == 404
+    assert client.post(f"{url}/finalize").status_code == 404
+
+
+def test_finalize_after_the_file_was_moved_is_409(client):
+    upload_id = _start(client, 3)
+    client.put(f"/materials/uploads/{upload_id}", params={"offset": 0}, content=b"abc")
+    # What a concurrent finalize of the same upload leaves behind
+    storage.backend.save_file(uploads.part_path(upload_id), storage.new_key("CS3401", "notes.pdf"))
+    assert client.post(f"/materials/uploads/{upload_id}/finalize").status_code == 409
+
+
+def test_declared_size_is_enforced(client):
+    assert client.post("/materials/uploads", json={
+        "course_code": "CS3401", "type": "Notes", "title": "t", "posted_by": "x",
+        "filename": "f", "size": uploads.MAX_UPLOAD_BYTES + 1}).status_code == 413
+    upload_id = _start(client, 10)
+    assert client.put(f"/materials/uploads/{upload_id}", params={"offset": 5},
+                      content=b"0123456789").status_code == 409
+    assert client.put(f"/materials/uploads/{upload_id}", params={"offset": 0},
+                      content=b"01234567890").status_code == 413
+    assert client.delete(f"/materials/uploads/{upload_id}").status_code == 200
+    assert client.get(f"/materials/uploads/{upload_id}").status_code == 404
@@ -0,0 +1,199 @@
+"""Full-text search over uploaded materials.
+
+A background task finds materials whose text is not indexed yet (new uploads,
+replaced files, and on first start everything already in uploaded_files),
+extracts them in a pool of worker processes and stores one row per page in
+material_pages, which the FTS5 table material_pages_fts indexes. Uploads only
+nudge the task, so no extraction happens on the request path.
+
+Every API worker runs the task; a material is claimed in material_index before
+it is extracted, so each file is processed by one of them.
+"""
+import contextlib
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from . import background, extract, storage
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+INDEX_INTERVAL = float(os.environ.get("MATERIAL_INDEX_INTERVAL", "300"))   # Catch-up period; 0 disables indexing
+INDEX_WORKERS = int(os.environ.get("MATERIAL_INDEX_WORKERS", "2"))
+BATCH_SIZE = 20
+CLAIM_TIMEOUT = 3600           # A claim older than this is assumed abandoned by a dead worker
+
+
+def _candidates(db, limit: int) -> List[tuple]:
+    """Uploaded materials that are unindexed, changed since indexing, skipped
+    under different extractor capabilities, or stuck in an abandoned claim."""
+    return db.execute(text(
+        "SELECT m.id, m.file_link FROM materials m "
+        "LEFT JOIN material_index s ON s.material_id = m.id "
+        "WHERE m.file_link NOT LIKE '%/%' AND ("     # Keys never contain a slash; links do
+        "  s.material_id IS NULL"
+        "  OR (s.status = 'indexing' AND s.updated_at < :stale)"
+        "  OR (s.status != 'indexing' AND m.etag IS NOT NULL AND s.etag IS NOT m.etag)"
+        "  OR (s.status = 'skipped' AND s.capabilities IS NOT :caps)"
+        ") ORDER BY m.id LIMIT :n"
+    ), {"stale": int(time.time()) - CLAIM_TIMEOUT,
+        "caps": extract.capabilities(), "n": limit}).all()
+
+
+def _claim(db, material_id: int) -> bool:
+    now = int(time.time())
+    claimed = db.execute(text(
+        "INSERT INTO material_index (material_id, status, updated_at) VALUES (:id, 'indexing', :now) "
+        "ON CONFLICT(material_id) DO UPDATE SET status = 'indexing', updated_at = :now "
+        "WHERE material_index.status != 'indexing' OR material_index.updated_at < :stale"
+    ), {"id": material_id, "now": now, "stale": now - CLAIM_TIMEOUT}).rowcount == 1
+    db.commit()
+    return claimed
+
+
+def _finish(db, material_id: int, status: str, etag: Optional[str] = None, error: Optional[str] = None):
+    db.execute(text(
+        "UPDATE material_index SET status = :status, etag = :etag, capabilities = :caps, error = :error, "
+        "updated_at = :now WHERE material_id = :id"
+    ), {"id": material_id, "status": status, "etag": etag, "error": error,
+        "caps": extract.capabilities() if status == "skipped" else None, "now": int(time.time())})
+
+
+def _store(db, material_id: int, size: int, digest: str, pages):
+    etag = storage.etag_for(digest)
+    forget_text(db, material_id)
+    if pages is None:
+        _finish(db, material_id, "skipped", etag)
+    else:
+        offset, rows = 0, []
+        for page, page_text in pages:
+            rows.append({"material_id": material_id, "page": page, "char_offset": offset, "text": page_text})
+            offset += len(page_text) + 1
+        if rows:
+            db.execute(text(
+                "INSERT INTO material_pages (material_id, page, char_offset, text) "
+                "VALUES (:material_id, :page, :char_offset, :text)"
+            ), rows)
+        _finish(db, material_id, "done", etag)
+    # Older uploads have no content hash yet; the extractor computed one anyway
+    db.execute(text("UPDATE materials SET size = :size, etag = :etag WHERE id = :id AND etag IS NULL"),
+               {"id": material_id, "size": size, "etag": etag})
+    db.commit()
+
+
+def _fail(db, material_id: int, error: Exception):
+    db.rollback()
+    logger.warning(f"Could not index material {material_id}: {error}")
+    _finish(db, material_id, "failed", error=str(error)[:500])
+    # Keep its current etag so an unchanged broken file is not retried every run
+    db.execute(text("UPDATE material_index SET etag = (SELECT etag FROM materials WHERE id = :id) "
+                    "WHERE material_id = :id"), {"id": material_id})
+    db.commit()
+
+
+def run() -> int:
+    """Indexes pending materials in batches until none are left. Returns how many were processed."""
+    db = SessionLocal()
+    processed = 0
+    # spawn: workers must not inherit the server's threads, sockets or DB connections
+    pool = ProcessPoolExecutor(max_workers=max(INDEX_WORKERS, 1), mp_context=multiprocessing.get_context("spawn"))
+    try:
+        purge_orphans(db)
+        while True:
+            batch = [(mid, key) for mid, key in _candidates(db, BATCH_SIZE) if _claim(db, mid)]
+            if not batch:
+                break
+            # Remote backends download to temp files, which live until the batch is stored
+            with contextlib.ExitStack() as copies:
+                futures = {}
+                for mid, key in batch:
+                    if not storage.is_key(key):
+                        # A link without a slash, e.g. "example.com"; nothing to extract
+                        _finish(db, mid, "skipped")
+                        db.commit()
+                        continue
+                    try:
+                        path = copies.enter_context(storage.local_copy(key))
+                    except Exception as e:
+                        _fail(db, mid, e)
+                        continue
+                    futures[mid] = pool.submit(extract.extract, os.path.abspath(path))
+                for mid, future in futures.items():
+                    try:
+                        _store(db, mid, *future.result())
+                    except Exception as e:
+                        _fail(db, mid, e)
+            processed += len(batch)
+    finally:
+        pool.shutdown(cancel_futures=True)
+        db.close()
+    if processed:
+        logger.info(f"Indexed text of {processed} materials")
+    return processed
+
+
+def forget_text(db, material_id: int):
+    db.execute(text("DELETE FROM material_pages WHERE material_id = :id"), {"id": material_id})
+
+
+def forget(db, material_id: int):
+    """Drops a material from the index; the caller commits."""
+    forget_text(db, material_id)
+    db.execute(text("DELETE FROM material_index WHERE material_id = :id"), {"id": material_id})
+
+
+def purge_orphans(db):
+    """Removes text of materials deleted without forget() (e.g. by a course delete)."""
+    gone = [r for (r,) in db.execute(text(
+        "SELECT material_id FROM material_index WHERE material_id NOT IN (SELECT id FROM materials)"))]
+    for material_id in gone:
+        forget(db, material_id)
+    db.commit()
+
+
+def _match_expression(query: str) -> Optional[str]:
+    # User input is never passed to MATCH as-is: every word becomes a quoted
+    # term (all must match) and the last one also matches as a prefix
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(db, course_ref: str, query: str, limit: int = 20) -> Optional[List[dict]]:
+    """Best matching pages among one course's materials, or None for an empty query."""
+    expression = _match_expression(query)
+    if expression is None:
+        return None
+    course_filter = "m.course_id = :course" if course_ref.isdigit() else "m.course_code = :course"
+    rows = db.execute(text(
+        "SELECT p.material_id, m.title, m.type, p.page, p.char_offset, "
+        "snippet(material_pages_fts, 0, '[', ']', '...', 16) "
+        "FROM material_pages_fts JOIN material_pages p ON p.id = material_pages_fts.rowid "
+        "JOIN materials m ON m.id = p.material_id "
+        f"WHERE material_pages_fts MATCH :match AND {course_filter} "
+        "ORDER BY bm25(material_pages_fts) LIMIT :n"
+    ), {"match": expression, "course": int(course_ref) if course_ref.isdigit() else course_ref, "n": limit})
+    return [{"material_id": mid, "title": title, "type": type_, "page": page, "offset": offset, "snippet": snippet}
+            for mid, title, type_, page, offset, snippet in rows]
+
+
+task = None
+if INDEX_INTERVAL > 0:
+    task = background.register(background.PeriodicTask("material-index", run, INDEX_INTERVAL, run_at_start=True))
+
+
+def notify():
+    """Called after an upload commits: indexes it now instead of at the next tick."""
+    if task is not None:
+        task.trigger()
@@ -0,0 +1,145 @@
+"""Resumable uploads for large materials.
+
+    POST   /materials/uploads                 -> {upload_id, offset: 0}
+    PUT    /materials/uploads/{id}?offset=N   raw bytes, optional X-Chunk-SHA256 -> {offset}
+    GET    /materials/uploads/{id}            -> {offset} (where to resume after a drop)
+    POST   /materials/uploads/{id}/finalize   optional {"sha256"} -> the created Material
+    DELETE /materials/uploads/{id}            abandon
+
+Chunks are streamed from the request straight to their offset in a .part file,
+so nothing is spooled and a dropped connection only loses the chunk in flight.
+"""
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import AsyncIterator, Optional, Tuple
+
+import anyio
+
+from . import background, models, storage
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+# Next to UPLOAD_DIR (same filesystem, so finalize is a rename) but not under
+# it, so half-written files are never reachable through /static.
+PARTIAL_DIR = os.environ.get("UPLOAD_PARTIAL_DIR", storage.UPLOAD_DIR.rstrip("/\\") + "_partial")
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(2 * 1024 ** 3)))
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+SESSION_TTL = float(os.environ.get("UPLOAD_SESSION_TTL", str(24 * 3600)))   # Idle sessions are dropped after this
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def part_path(upload_id: str) -> str:
+    return os.path.join(PARTIAL_DIR, f"{upload_id}.part")
+
+
+def create(db, course_id: int, course_code: str, type: str, title: str, posted_by: str,
+           filename: str, size: int, content_type: Optional[str] = None) -> models.UploadSession:
+    if size <= 0 or size > MAX_UPLOAD_BYTES:
+        raise UploadError(413, f"Size must be between 1 and {MAX_UPLOAD_BYTES} bytes")
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    now = int(time.time())
+    session = models.UploadSession(
+        id=uuid.uuid4().hex, course_id=course_id, course_code=course_code, type=type, title=title,
+        posted_by=posted_by, filename=os.path.basename(filename), content_type=content_type,
+        size=size, received=0,
+        created_at=now, updated_at=now,
+    )
+    # Preallocate so every chunk lands at a fixed offset of an existing file
+    with open(part_path(session.id), "wb") as f:
+        f.truncate(size)
+    db.add(session)
+    db.commit()
+    return session
+
+
+async def write_chunk(session: models.UploadSession, offset: int, body: AsyncIterator[bytes],
+                      expected_sha256: Optional[str] = None) -> Tuple[int, int]:
+    """Streams one chunk to `offset`. Returns (bytes written, new contiguous offset).
+
+    Chunks may repeat already received ranges (a retry after a lost response)
+    but may not leave a gap. With expected_sha256, the offset only advances if
+    the chunk arrived intact; otherwise the client just sends it again.
+    """
+    if offset > session.received:
+        raise UploadError(409, f"Offset {offset} is past the received data; resume at {session.received}")
+    digest = hashlib.sha256() if expected_sha256 else None
+    written = 0
+    async with await anyio.open_file(part_path(session.id), "r+b") as f:
+        await f.seek(offset)
+        async for data in body:
+            if not data:
+                continue
+            written += len(data)
+            if written > MAX_CHUNK_BYTES or offset + written > session.size:
+                raise UploadError(413, "Chunk runs past the declared size or the chunk limit")
+            if digest:
+                digest.update(data)
+            await f.write(data)
+    if digest and digest.hexdigest() != expected_sha256.lower():
+        raise UploadError(422, "Chunk checksum mismatch; resend it")
+    return written, max(session.received, offset + written)
+
+
+def finalize(db, session: models.UploadSession, sha256: Optional[str]) -> models.Material:
+    """Checks size and checksum, moves the file into storage and creates the Material."""
+    if session.received != session.size:
+        raise UploadError(409, f"Upload incomplete: {session.received} of {session.size} bytes")
+    path = part_path(session.id)
+    key = storage.new_key(session.course_code, session.filename)
+    try:
+        size, digest = storage.hash_file(path)
+        if size != session.size or (sha256 and digest != sha256.lower()):
+            raise UploadError(422, "Checksum mismatch")
+        storage.backend.save_file(path, key)
+    except FileNotFoundError:
+        # A concurrent finalize of the same upload moved the file first
+        raise UploadError(409, "Upload is already being finalized")
+    material = models.Material(
+        course_id=session.course_id, course_code=session.course_code, type=session.type,
+        title=session.title, posted_by=session.posted_by, file_link=key,
+        size=size, etag=storage.etag_for(digest), content_type=session.content_type,
+    )
+    db.add(material)
+    db.delete(session)
+    db.commit()
+    db.refresh(material)
+    return material
+
+
+def discard(db, session: models.UploadSession):
+    try:
+        os.remove(part_path(session.id))
+    except FileNotFoundError:
+        pass
+    db.delete(session)
+    db.commit()
+
+
+def expire_stale(now: Optional[float] = None) -> int:
+    """Drops sessions idle for longer than SESSION_TTL, with their partial files."""
+    cutoff = int((now or time.time()) - SESSION_TTL)
+    db = SessionLocal()
+    try:
+        stale = db.query(models.UploadSession).filter(models.UploadSession.updated_at < cutoff).all()
+        for session in stale:
+            discard(db, session)
+    finally:
+        db.close()
+    if stale:
+        logger.info(f"Expired {len(stale)} abandoned upload sessions")
+    return len(stale)
+
+
+if SESSION_TTL > 0:
+    background.register(background.PeriodicTask("upload-expiry", expire_stale, min(SESSION_TTL, 3600)))
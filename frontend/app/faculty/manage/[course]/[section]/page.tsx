@@ -11,6 +11,9 @@ import {
     Youtube, PlayCircle // Added YouTube icons
 } from 'lucide-react';
 
+const CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+
 export default function SectionManagement() {
     const params = useParams();
     const router = useRouter();
@@ -21,6 +24,7 @@ export default function SectionManagement() {
 
     // States
     const [students, setStudents] = useState<any[]>([]);
+    const [savedMarks, setSavedMarks] = useState<Record<string, any>>({}); // Last values/version from the server, per roll_no
     const [filteredStudents, setFilteredStudents] = useState<any[]>([]);
     const [uploadedMaterials, setUploadedMaterials] = useState<any[]>([]); 
     const [searchQuery, setSearchQuery] = useState('');
@@ -36,9 +40,10 @@ export default function SectionManagement() {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const res = await axios.get(`${API_URL}/marks/section?course_code=${courseCode}`);
+                const res = await axios.get(`${API_URL}/marks/section?course_code=${courseCode}&section=${sectionName}`);
                 setStudents(res.data);
                 setFilteredStudents(res.data);
+                setSavedMarks(Object.fromEntries(res.data.map((s: any) => [s.roll_no, s])));
             } catch (error) {
                 console.error("Error fetching students", error);
             }
@@ -88,22 +93,58 @@ export default function SectionManagement() {
     };
 
     // --- 5. SAVE MARKS DATA ---
+    // Only edited fields are sent, with the version each row was loaded at, so
+    // two faculty editing the same section cannot silently overwrite each other.
+    const MARK_FIELDS = ['cia1_marks', 'cia1_retest', 'cia2_marks', 'cia2_retest', 'subject_attendance'];
+
     const handleSaveMarks = async () => {
+        const changes = students.map(student => {
+            const saved = savedMarks[student.roll_no] || {};
+            const fields: Record<string, number> = {};
+            MARK_FIELDS.forEach(field => {
+                const value = isLabCourse && field !== 'subject_attendance' ? 0 : Number(student[field]);
+                if (value !== Number(saved[field] ?? 0)) fields[field] = value;
+            });
+            return { roll_no: student.roll_no, version: saved.version ?? 1, fields };
+        }).filter(change => Object.keys(change.fields).length > 0);
+
+        if (changes.length === 0) { alert("No changes to save."); return; }
+
         setIsSaving(true);
         try {
-            const savePromises = students.map(student =>
-                axios.post(`${API_URL}/marks/sync`, {
-                    student_roll_no: student.roll_no,
-                    course_code: courseCode,
-                    cia1_marks: isLabCourse ? 0 : Number(student.cia1_marks),
-                    cia1_retest: isLabCourse ? 0 : Number(student.cia1_retest),
-                    cia2_marks: isLabCourse ? 0 : Number(student.cia2_marks),
-                    cia2_retest: isLabCourse ? 0 : Number(student.cia2_retest),
-                    subject_attendance: Number(student.subject_attendance)
-                })
-            );
-            await Promise.all(savePromises);
-            alert(`✅ Success! Data synced.`);
+            const res = await axios.post(`${API_URL}/marks/sync/delta`, {
+                course_code: courseCode,
+                section: sectionName,
+                changes
+            }, {
+                // Identifies the editor in the marks audit log
+                headers: { Authorization: `Bearer ${localStorage.getItem('token')}` }
+            });
+            const { applied, conflicts, errors } = res.data;
+
+            const nextSaved = { ...savedMarks };
+            applied.forEach((row: any) => {
+                const student = students.find(s => s.roll_no === row.roll_no);
+                nextSaved[row.roll_no] = { ...student, version: row.version };
+            });
+            // Someone else saved these rows first: show their values and let the user re-apply
+            conflicts.forEach((row: any) => {
+                nextSaved[row.roll_no] = { ...nextSaved[row.roll_no], ...row.current, version: row.current_version };
+            });
+            setSavedMarks(nextSaved);
+            if (conflicts.length > 0) {
+                setStudents(students.map(s => nextSaved[s.roll_no] && conflicts.some((c: any) => c.roll_no === s.roll_no)
+                    ? { ...s, ...nextSaved[s.roll_no] } : s));
+            }
+
+            if (conflicts.length || errors.length) {
+                const rolls = conflicts.map((c: any) => c.roll_no).join(', ');
+                alert(`⚠️ Saved ${applied.length} record(s).`
+                    + (conflicts.length ? ` ${conflicts.length} were changed by someone else and have been reloaded: ${rolls}.` : '')
+                    + (errors.length ? ` ${errors.length} failed: ${errors.map((e: any) => `${e.roll_no} (${e.error})`).join(', ')}.` : ''));
+            } else {
+                alert(`✅ Success! ${applied.length} record(s) synced.`);
+            }
         } catch (error) {
             alert("Failed to sync data.");
         } finally {
@@ -112,23 +153,55 @@ export default function SectionManagement() {
     };
 
     // --- 6. REAL FILE UPLOAD LOGIC ---
+    // Large files go up in chunks; after a dropped connection we ask the server
+    // how far it got and carry on from there instead of starting over.
+    const uploadResumable = async (file: File, type: string, title: string, userId: string) => {
+        const { data: session } = await axios.post(`${API_URL}/materials/uploads`, {
+            course_code: courseCode, type, title, posted_by: userId,
+            filename: file.name, size: file.size, content_type: file.type || null,
+        });
+        const url = `${API_URL}/materials/uploads/${session.upload_id}`;
+        let offset = 0, failures = 0;
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+            try {
+                const digest = await crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+                const hex = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+                const res = await axios.put(`${url}?offset=${offset}`, chunk, {
+                    headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': hex },
+                });
+                offset = res.data.offset;
+                failures = 0;
+            } catch (error) {
+                if (++failures > 5) throw error;
+                await new Promise(r => setTimeout(r, 1000 * failures));
+                offset = (await axios.get(url)).data.offset;
+            }
+        }
+        await axios.post(`${url}/finalize`, {});
+    };
+
     const handleFileUpload = async (type: string, titleId: string, fileInputId: string) => {
         const titleInput = document.getElementById(titleId) as HTMLInputElement;
         const fileInput = document.getElementById(fileInputId) as HTMLInputElement;
         const userId = localStorage.getItem('user_id');
 
         if (!titleInput?.value || !fileInput?.files?.[0]) { alert("Required!"); return; }
-
-        const formData = new FormData();
-        formData.append('file', fileInput.files[0]); 
-        formData.append('course_code', courseCode);
-        formData.append('type', type);
-        formData.append('title', titleInput.value);
-        formData.append('posted_by', userId!);
+        const file = fileInput.files[0];
 
         setUploading(true);
         try {
-            await axios.post(`${API_URL}/materials`, formData);
+            if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+                await uploadResumable(file, type, titleInput.value, userId!);
+            } else {
+                const formData = new FormData();
+                formData.append('file', file);
+                formData.append('course_code', courseCode);
+                formData.append('type', type);
+                formData.append('title', titleInput.value);
+                formData.append('posted_by', userId!);
+                await axios.post(`${API_URL}/materials`, formData);
+            }
             alert(`📁 ${type} uploaded!`);
             titleInput.value = "";
             fileInput.value = "";
@@ -13,6 +13,7 @@ import {
 export default function CourseDetailPage({ params }: { params: Promise<{ id: string }> }) {
     const router = useRouter();
     const resolvedParams = use(params);
+    // Course code (or id); the subject title comes back with the marks
     const courseId = decodeURIComponent(resolvedParams.id);
 
     const [activeTab, setActiveTab] = useState('notes');
@@ -27,22 +28,12 @@ export default function CourseDetailPage({ params }: { params: Promise<{ id: str
         
         const fetchCourseContent = async () => {
             try {
-                const stuRes = await axios.get(`${API_URL}/student/${userId}`);
-                const profile = stuRes.data;
-                setStudentProfile(profile);
-
-                const matRes = await axios.get(`${API_URL}/materials/${courseId}`);
-                setMaterials(matRes.data.filter((m: any) => m.type !== 'Lab Manual'));
-
-                const annRes = await axios.get(`${API_URL}/announcements?student_id=${userId}`);
-                const specificNotices = annRes.data.filter((a: any) => 
-                    a.course_code === courseId || (a.course_code === "Global" && a.type === "Student")
-                );
-                setAnnouncements(specificNotices);
-
-                const marksRes = await axios.get(`${API_URL}/marks/cia?student_id=${userId}`);
-                const specificMark = marksRes.data.find((m: any) => m.subject === courseId);
-                setMarks(specificMark);
+                // One request for everything this page shows about this course
+                const res = await axios.get(`${API_URL}/student/${userId}/course/${encodeURIComponent(courseId)}`);
+                setStudentProfile(res.data.student);
+                setMaterials(res.data.materials.filter((m: any) => m.type !== 'Lab Manual'));
+                setAnnouncements(res.data.announcements);
+                setMarks(res.data.marks);
 
             } catch (error) {
                 console.error("Connection failed:", error);
@@ -67,7 +58,7 @@ export default function CourseDetailPage({ params }: { params: Promise<{ id: str
                     </button>
                     <div className="flex justify-between items-end">
                         <div>
-                            <h1 className="text-4xl font-black tracking-tight uppercase">{courseId}</h1>
+                            <h1 className="text-4xl font-black tracking-tight uppercase">{marks?.subject || courseId}</h1>
                             <p className="opacity-80 font-medium tracking-wide uppercase text-xs mt-1">Theory Subject Portal</p>
                         </div>
                         <div className="text-right">
@@ -123,7 +114,7 @@ export default function CourseDetailPage({ params }: { params: Promise<{ id: str
                                                 </div>
                                                 <p className="font-bold text-gray-800">{note.title}</p>
                                             </div>
-                                            <a href={note.file_link} target="_blank" rel="noopener noreferrer" className="flex items-center gap-2 text-blue-900 text-[10px] font-black border-2 border-blue-900 px-4 py-2 rounded-lg hover:bg-blue-900 hover:text-white transition uppercase tracking-widest">
+                                            <a href={`${API_URL}/materials/${note.id}/download`} target="_blank" rel="noopener noreferrer" className="flex items-center gap-2 text-blue-900 text-[10px] font-black border-2 border-blue-900 px-4 py-2 rounded-lg hover:bg-blue-900 hover:text-white transition uppercase tracking-widest">
                                                 <Download size={14} /> View PDF
                                             </a>
                                         </div>
@@ -143,7 +134,7 @@ export default function CourseDetailPage({ params }: { params: Promise<{ id: str
                                         materials.filter(m => m.type === 'Question Bank').map((q, i) => (
                                             <div key={i} className="p-5 border rounded-xl hover:shadow-lg flex justify-between items-center bg-gray-50 border-gray-100 transition-all group">
                                                 <span className="font-bold text-gray-800 text-sm uppercase tracking-tighter">{q.title}</span>
-                                                <a href={q.file_link} target="_blank" rel="noopener noreferrer" className="text-white bg-teal-600 px-4 py-2 rounded-lg text-[10px] font-bold hover:bg-teal-700 shadow-md transition uppercase tracking-widest">
+                                                <a href={`${API_URL}/materials/${q.id}/download`} target="_blank" rel="noopener noreferrer" className="text-white bg-teal-600 px-4 py-2 rounded-lg text-[10px] font-bold hover:bg-teal-700 shadow-md transition uppercase tracking-widest">
                                                     Download QB
                                                 </a>
                                             </div>
@@ -198,7 +189,7 @@ export default function CourseDetailPage({ params }: { params: Promise<{ id: str
                                                 <p className="font-bold text-gray-800 text-lg uppercase tracking-tighter">{assn.title}</p>
                                                 <p className="text-[10px] text-gray-400 font-bold uppercase">Course: {courseId}</p>
                                             </div>
-                                            <a href={assn.file_link} target="_blank" rel="noopener noreferrer" className="bg-orange-500 text-white px-5 py-2 rounded-lg text-[10px] font-bold hover:bg-orange-600 uppercase tracking-widest transition shadow-sm">
+                                            <a href={`${API_URL}/materials/${assn.id}/download`} target="_blank" rel="noopener noreferrer" className="bg-orange-500 text-white px-5 py-2 rounded-lg text-[10px] font-bold hover:bg-orange-600 uppercase tracking-widest transition shadow-sm">
                                                 Get Assignment
                                             </a>
                                         </div>
@@ -246,7 +237,7 @@ export default function CourseDetailPage({ params }: { params: Promise<{ id: str
                                         <span className="text-[10px] font-bold text-gray-400 uppercase tracking-widest">Present</span>
                                     </div>
                                 </div>
-                                <p className="text-gray-500 font-medium italic text-sm">*Attendance for {courseId} is managed by the assigned faculty.</p>
+                                <p className="text-gray-500 font-medium italic text-sm">*Attendance for {marks?.subject || courseId} is managed by the assigned faculty.</p>
                                 
                                 {(marks?.subject_attendance || 0) < 75 && (
                                     <div className="mt-8 p-4 bg-red-50 border-2 border-red-100 rounded-xl text-red-600 text-[10px] font-black uppercase tracking-[0.2em] shadow-sm inline-block">
@@ -10,13 +10,14 @@ import { Book, Megaphone, CheckCircle, ArrowLeft, Download, Clock, FileText } fr
 export default function LabDetails({ params }: { params: Promise<{ id: string }> }) {
     const router = useRouter();
     const resolvedParams = use(params);
-    // Decode the ID from the URL (e.g., "CS3401%20(Lab)" -> "CS3401 (Lab)")
+    // Course code from the URL; the lab's subject title comes back with the marks
     const labId = decodeURIComponent(resolvedParams.id);
 
     const [manuals, setManuals] = useState<any[]>([]);
     const [announcements, setAnnouncements] = useState<any[]>([]);
     const [studentProfile, setStudentProfile] = useState<any>(null);
     const [attendance, setAttendance] = useState(0);
+    const [subject, setSubject] = useState('');
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
@@ -25,27 +26,13 @@ export default function LabDetails({ params }: { params: Promise<{ id: string }>
 
         const fetchLabData = async () => {
             try {
-                // 1. Fetch Student Profile to identify Section
-                const stuRes = await axios.get(`${API_URL}/student/${userId}`);
-                setStudentProfile(stuRes.data);
-
-                // 2. Fetch Materials (Filtered by type "Lab Manual")
-                // We use the full labId (with suffix) to match the database record
-                const matRes = await axios.get(`${API_URL}/materials/${labId}`);
-                setManuals(matRes.data.filter((m: any) => m.type === "Lab Manual"));
-
-                // 3. Fetch Lab-Specific Announcements
-                const annRes = await axios.get(`${API_URL}/announcements?student_id=${userId}`);
-                const labOnlyNotices = annRes.data.filter((a: any) => 
-                    a.course_code === labId || (a.course_code === "Global" && a.type === "Student")
-                );
-                setAnnouncements(labOnlyNotices);
-
-                // 4. Fetch Attendance for this Lab
-                const attRes = await axios.get(`${API_URL}/marks/cia?student_id=${userId}`);
-                // Find the subject that exactly matches the Lab ID (including suffix)
-                const currentLab = attRes.data.find((l: any) => l.subject === labId);
-                setAttendance(currentLab?.subject_attendance || 0);
+                // Profile section, manuals, lab notices and attendance in one request
+                const res = await axios.get(`${API_URL}/student/${userId}/course/${encodeURIComponent(labId)}`);
+                setStudentProfile(res.data.student);
+                setManuals(res.data.materials.filter((m: any) => m.type === "Lab Manual"));
+                setAnnouncements(res.data.announcements);
+                setAttendance(res.data.marks?.subject_attendance || 0);
+                setSubject(res.data.marks?.subject || '');
 
             } catch (err) { 
                 console.error("Error loading lab data:", err); 
@@ -80,7 +67,7 @@ export default function LabDetails({ params }: { params: Promise<{ id: string }>
                     <div className="flex justify-between items-center">
                         <h1 className="text-3xl font-black text-blue-900 border-l-8 border-teal-500 pl-4 uppercase tracking-tighter">
                             {/* Remove (Lab) suffix for display purposes only */}
-                            {labId.replace(' (Lab)', '')} <span className="text-gray-400 font-light">Laboratory</span>
+                            {(subject || labId).replace(' (Lab)', '')} <span className="text-gray-400 font-light">Laboratory</span>
                         </h1>
                         <span className="bg-teal-600 text-white px-4 py-1 rounded-full font-black text-[10px] uppercase tracking-widest shadow-md">
                             Section {studentProfile?.section || 'N/A'}
@@ -102,7 +89,7 @@ export default function LabDetails({ params }: { params: Promise<{ id: string }>
                                         <span className="font-bold text-gray-700 text-xs uppercase">{m.title}</span>
                                     </div>
                                     <a 
-                                        href={m.file_link} 
+                                        href={`${API_URL}/materials/${m.id}/download`} 
                                         target="_blank" 
                                         rel="noopener noreferrer"
                                         className="p-2 bg-white rounded-full text-teal-600 hover:bg-teal-600 hover:text-white transition-all shadow-sm group-hover:scale-110"
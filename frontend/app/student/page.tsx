@@ -56,6 +56,7 @@ export default function StudentDashboard() {
                     .filter((m: any) => !m.subject.toLowerCase().includes('(lab)'))
                     .map((m: any) => ({ 
                         code: m.subject, 
+                        course_code: m.course_code,
                         title: "Course Content", 
                         credits: 3 
                     }));
@@ -65,6 +66,7 @@ export default function StudentDashboard() {
                     .filter((m: any) => m.subject.toLowerCase().includes('(lab)'))
                     .map((l: any) => ({ 
                         code: l.subject, 
+                        course_code: l.course_code,
                         title: "Practical Session", 
                         next_session: "Refer Timetable" 
                     }));
@@ -211,7 +213,7 @@ export default function StudentDashboard() {
                             {activeTab === 'courses' && (
                                 <div className="grid grid-cols-1 sm:grid-cols-2 gap-4 animate-in fade-in duration-300">
                                     {courses.length > 0 ? courses.map((course: any) => (
-                                        <div key={course.code} onClick={() => router.push(`/student/course/${course.code}`)} className="bg-white border border-gray-100 p-5 rounded-xl hover:shadow-lg transition border-t-4 border-t-blue-500 cursor-pointer group">
+                                        <div key={course.code} onClick={() => router.push(`/student/course/${encodeURIComponent(course.course_code || course.code)}`)} className="bg-white border border-gray-100 p-5 rounded-xl hover:shadow-lg transition border-t-4 border-t-blue-500 cursor-pointer group">
                                             <h4 className="font-bold text-gray-800 flex justify-between items-center text-md">{course.code} <ChevronRight size={16} className="text-blue-500" /></h4>
                                             <p className="text-xs text-gray-500 mt-1 font-medium">{course.title}</p>
                                             <div className="mt-4 text-[9px] text-blue-600 bg-blue-50 inline-block px-3 py-1 rounded font-bold uppercase tracking-widest">View Materials</div>
@@ -223,7 +225,7 @@ export default function StudentDashboard() {
                             {activeTab === 'labs' && (
                                 <div className="grid grid-cols-1 sm:grid-cols-2 gap-4 animate-in fade-in duration-300">
                                     {labs.length > 0 ? labs.map((lab: any) => (
-                                        <div key={lab.code} onClick={() => router.push(`/student/lab/${lab.code}`)} className="p-5 border rounded-xl bg-teal-50/30 border-teal-100 cursor-pointer flex justify-between items-center group border-t-4 border-t-teal-500 hover:shadow-lg transition">
+                                        <div key={lab.code} onClick={() => router.push(`/student/lab/${encodeURIComponent(lab.course_code || lab.code)}`)} className="p-5 border rounded-xl bg-teal-50/30 border-teal-100 cursor-pointer flex justify-between items-center group border-t-4 border-t-teal-500 hover:shadow-lg transition">
                                             <div className="flex items-center gap-4">
                                                 <div className="bg-teal-100 p-3 rounded-lg text-teal-600 group-hover:bg-teal-600 group-hover:text-white transition-colors">
                                                     <Beaker size={20} />